@@ -0,0 +1,43 @@
+"""
+Microbenchmark: fast_literal_eval vs ast.literal_eval on typical cell and reply shapes.
+
+Usage (from the repository root):
+    python benchmarks/bench_literal_eval.py [--number N]
+"""
+import argparse
+import ast
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING)
+
+from main import fast_literal_eval
+
+SAMPLES = ["A", "['A', 'C']", "True", "4", "{'A': 'x', 'B': 'y', 'C': 'z'}", "3.14", "Some text answer"]
+
+
+def per_call_us(parse, text: str, number: int) -> float:
+    def call():
+        try:
+            parse(text)
+        except Exception:
+            pass # Bare identifiers and free text raise, as in the real parser's fallback path
+    return timeit.timeit(call, number=number) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000, help="Calls per sample and parser.")
+    args = parser.parse_args()
+    print(f"{'input':40} {'literal_eval':>14} {'fast':>10} {'speedup':>8}")
+    for text in SAMPLES:
+        slow = per_call_us(ast.literal_eval, text, args.number)
+        fast = per_call_us(fast_literal_eval, text, args.number)
+        print(f"{text!r:40} {slow:12.2f}us {fast:8.2f}us {slow / fast:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: columnar DataTransformer.transform vs the per-row path on synthetic sheets.
+
+Usage (from the repository root):
+    python benchmarks/bench_transform.py [--rows N [N ...]] [--skip-per-row]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING)
+
+import pandas as pd
+
+from main import DataTransformer
+
+ANSWERS = ["['A', 'C']", "A", "True", "False", "4", "3.5", None, "B", "['B']"]
+OPTIONS = ["{'A': 'x', 'B': 'y', 'C': 'z'}", "{'True': 'Yes', 'False': 'No'}", "{}", "{'A': Correct", None]
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A sheet with the six task columns, repeated answer/option strings and some blanks."""
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        'id': [f"task_{i}" for i in range(rows)],
+        'instruction': [rnd.choice(["Pick one.", "Answer True/False", None]) for _ in range(rows)],
+        'text': [rnd.choice(["ctx1", "ctx2 long context", None]) for _ in range(rows)],
+        'question': [f"Q{i}?" for i in range(rows)],
+        'options': [rnd.choice(OPTIONS) for _ in range(rows)],
+        'answer': [rnd.choice(ANSWERS) for _ in range(rows)],
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs='+', default=[10000, 100000, 1000000], help="Sheet sizes to time.")
+    parser.add_argument("--skip-per-row", action='store_true', help="Only time the columnar path (per-row is slow at 1M rows).")
+    args = parser.parse_args()
+    print(f"{'rows':>9} {'per-row':>10} {'columnar':>10} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        columnar, fast = timed(DataTransformer().transform, df)
+        if args.skip_per_row:
+            print(f"{rows:9d} {'-':>10} {fast:9.2f}s {'-':>8}")
+            continue
+        records = df.to_dict('records')
+        per_row, slow = timed(lambda: list(DataTransformer().transform_stream(records)))
+        if [task.to_dict() for task in per_row] != [task.to_dict() for task in columnar]:
+            sys.exit(f"Per-row and columnar outputs differ at {rows} rows.")
+        print(f"{rows:9d} {slow:9.2f}s {fast:9.2f}s {slow / fast:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,35 @@ import pandas as pd
 import ast
 import logging
 import asyncio
-from openai import AsyncOpenAI, APIError, RateLimitError
+import itertools
+import collections
+import concurrent.futures
+import hashlib
+import keyword
+import re
+import pickle
+import argparse
+import contextlib
+import copy
+import functools
+import random
+import time
+import email.utils
+import sqlite3
+import signal
+import threading
+import weakref
+import importlib.util
+import httpx
+import openpyxl
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIError, APIStatusError, APIConnectionError, APITimeoutError, RateLimitError
+from openai.types.chat import ChatCompletion
 import os
+import sys
 import json # For JSON input/output
 from tqdm.asyncio import tqdm as async_tqdm # For progress bar
 import datetime # For timestamped output files
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set, Iterable, Iterator, Sequence, Union, Callable, Awaitable, Deque
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,29 +41,299 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 # --- 1. Data Loading ---
 
+# Columns that make up a task. Columnar readers (Parquet) only read these.
+TASK_COLUMNS = ['id', 'instruction', 'text', 'question', 'options', 'answer']
+# Optional per-task overrides of the generation parameters (see AsyncLLMClient._generation_params)
+GENERATION_COLUMNS = ['max_tokens', 'temperature']
+
+
+class ExcelReader:
+    """Reads tasks from Excel workbooks (.xlsx), one row per task."""
+
+    def sheet_names(self, file_path: str) -> List[str]:
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    def read_frame(self, file_path: str, sheet_name: Union[str, int, None] = None) -> pd.DataFrame:
+        return pd.read_excel(file_path, sheet_name=0 if sheet_name is None else sheet_name)
+
+    def iter_rows(self, file_path: str, chunk_size: int, sheet_name: Union[str, int, None] = None) -> Iterator[Dict[str, Any]]:
+        """Streams rows using openpyxl's read-only mode, skipping fully empty rows."""
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            if isinstance(sheet_name, str):
+                worksheet = workbook[sheet_name]
+            else:
+                worksheet = workbook.worksheets[sheet_name or 0]
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                logging.warning(f"No header row found in {file_path}.")
+                return
+            # Mirror pandas' naming for blank header cells
+            columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            for values in rows:
+                if all(value is None for value in values):
+                    continue
+                yield dict(zip(columns, values))
+        finally:
+            workbook.close()
+
+
+class LegacyExcelReader(ExcelReader):
+    """
+    Reads tasks from legacy Excel 97-2003 workbooks (.xls), which openpyxl cannot open.
+
+    Uses pandas with the xlrd engine. The format caps a sheet at 65,536 rows, so rows
+    are served from the loaded sheet instead of being streamed.
+    """
+
+    def sheet_names(self, file_path: str) -> List[str]:
+        with pd.ExcelFile(file_path, engine=self._engine()) as workbook:
+            return list(workbook.sheet_names)
+
+    def read_frame(self, file_path: str, sheet_name: Union[str, int, None] = None) -> pd.DataFrame:
+        return pd.read_excel(file_path, sheet_name=0 if sheet_name is None else sheet_name, engine=self._engine())
+
+    def iter_rows(self, file_path: str, chunk_size: int, sheet_name: Union[str, int, None] = None) -> Iterator[Dict[str, Any]]:
+        yield from self.read_frame(file_path, sheet_name).dropna(how='all').to_dict('records')
+
+    @staticmethod
+    def _engine() -> str:
+        if importlib.util.find_spec('xlrd') is None:
+            raise ImportError("Reading .xls files requires the 'xlrd' package (pip install xlrd).")
+        return 'xlrd'
+
+
+class CsvReader:
+    """
+    Reads tasks from CSV files (header row first), streaming in chunks.
+
+    Task columns are read as strings: pandas infers dtypes per chunk, so a column could
+    otherwise come out as int in one chunk and float or str in the next. The transformer
+    parses 'answer' and 'options' from their text either way.
+    """
+    DTYPES = {column: str for column in TASK_COLUMNS}
+
+    def read_frame(self, file_path: str) -> pd.DataFrame:
+        return pd.read_csv(file_path, dtype=self.DTYPES)
+
+    def iter_rows(self, file_path: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+        with pd.read_csv(file_path, chunksize=chunk_size, dtype=self.DTYPES) as chunks:
+            for chunk in chunks:
+                yield from chunk.to_dict('records')
+
+
+class JsonlReader:
+    """Reads tasks from JSON Lines files, one JSON object per line."""
+
+    def read_frame(self, file_path: str) -> pd.DataFrame:
+        return pd.DataFrame.from_records(list(self.iter_rows(file_path, chunk_size=0)))
+
+    def iter_rows(self, file_path: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+        # Lines are decoded one at a time; the file object already reads in buffered chunks
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    logging.warning(f"Skipping line {line_number} of {file_path}: expected a JSON object.")
+                    continue
+                yield record
+
+
+class ParquetReader:
+    """Reads tasks from Parquet files with pyarrow, loading only the task columns."""
+
+    def _task_columns(self, parquet_file) -> List[str]:
+        return [name for name in parquet_file.schema_arrow.names if name in TASK_COLUMNS or name in GENERATION_COLUMNS]
+
+    def read_frame(self, file_path: str) -> pd.DataFrame:
+        parquet_file = self._open(file_path)
+        return parquet_file.read(columns=self._task_columns(parquet_file)).to_pandas()
+
+    def iter_rows(self, file_path: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+        parquet_file = self._open(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=self._task_columns(parquet_file)):
+            yield from batch.to_pylist()
+
+    def _open(self, file_path: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires the 'pyarrow' package (pip install pyarrow).")
+        return pq.ParquetFile(file_path)
+
+
+def _load_source_tasks(loader: 'DataLoader', data_transformer: 'DataTransformer') -> Optional[List['Task']]:
+    """Process-pool entry point: loads one file/sheet. Module-level so it can be pickled."""
+    return loader.load_tasks(data_transformer)
+
+
 class DataLoader:
-    """Loads evaluation tasks from an Excel file."""
+    """
+    Loads evaluation tasks from tabular files (Excel, CSV, JSONL or Parquet).
+
+    A loader can cover several files and/or several sheets of a workbook. Their tasks
+    are parsed in parallel worker processes and merged into one list, with ids prefixed
+    by their source so they stay unique.
+    """
+
+    # Reader used for each file extension; extend with register_reader()
+    READERS: Dict[str, Any] = {
+        '.xlsx': ExcelReader,
+        '.xls': LegacyExcelReader,
+        '.csv': CsvReader,
+        '.jsonl': JsonlReader,
+        '.parquet': ParquetReader,
+    }
 
-    def __init__(self, file_path: str):
+    @classmethod
+    def register_reader(cls, extension: str, reader_class: Any):
+        """Registers a reader class (with read_frame and iter_rows) for a file extension."""
+        cls.READERS[extension.lower()] = reader_class
+
+    def __init__(self, file_path: Union[str, Sequence[str]], cache_dir: Optional[str] = None,
+                 chunk_size: int = 1000, sheet_names: Union[str, int, List[Union[str, int]], None] = None,
+                 max_workers: Optional[int] = None):
         """
         Initializes the DataLoader.
 
         Args:
-            file_path (str): The path to the input Excel file (.xlsx).
+            file_path (Union[str, Sequence[str]]): Path to the input file, or a list of
+                             paths. The reader is chosen by extension
+                             (.xlsx, .xls, .csv, .jsonl, .parquet).
+            cache_dir (Optional[str]): Directory for the parsed-dataset cache. When set,
+                                       transformed tasks are stored keyed by the file's
+                                       content hash and reused on later runs.
+            chunk_size (int): Rows per chunk for readers that stream in chunks.
+            sheet_names: Excel sheets to read. None reads the first sheet, a name or
+                         index reads that sheet, a list reads several sheets and '*'
+                         reads every sheet. Ignored for non-Excel files.
+            max_workers (Optional[int]): Worker processes used when loading several
+                                         files/sheets. Defaults to the CPU count.
+        """
+        self.file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+        if not self.file_paths:
+            raise ValueError("At least one input file must be specified.")
+        self.file_path = self.file_paths[0]
+        self.cache_dir = cache_dir
+        self.chunk_size = max(1, chunk_size)
+        self.sheet_names = sheet_names
+        self.max_workers = max_workers
+        extension = os.path.splitext(self.file_path)[1].lower()
+        reader_class = self.READERS.get(extension)
+        self.reader = reader_class() if reader_class else None
+        if self.reader is None:
+            logging.error(f"Unsupported file type '{extension}' for {self.file_path}. Supported: {', '.join(sorted(self.READERS))}")
+        logging.info(f"DataLoader initialized for file(s): {', '.join(self.file_paths)}")
+
+    # --- Multiple files / sheets ---
+    def _is_multi_source(self) -> bool:
+        return len(self.file_paths) > 1 or self.sheet_names == '*' or isinstance(self.sheet_names, (list, tuple))
+
+    def _source_names(self) -> Dict[str, str]:
         """
-        self.file_path = file_path
-        logging.info(f"DataLoader initialized for file: {self.file_path}")
+        Maps each input file to the name used in its id prefix: its path relative to the
+        common parent directory of all inputs, so files in one directory keep their base
+        name and same-named files in different directories stay distinct.
+        """
+        absolute = [os.path.abspath(path) for path in self.file_paths]
+        parent = os.path.commonpath([os.path.dirname(path) for path in absolute])
+        return {path: os.path.relpath(full, parent).replace(os.sep, '/') for path, full in zip(self.file_paths, absolute)}
+
+    def _source_loaders(self) -> List[Tuple[str, 'DataLoader']]:
+        """
+        Expands the configured files and sheets into (id prefix, single-source loader) pairs.
+
+        Raises:
+            ValueError: If two sources map to the same prefix (the same file or sheet
+                listed twice), since their task ids would collide.
+        """
+        sources = []
+        names = self._source_names()
+        for path in self.file_paths:
+            reader_class = self.READERS.get(os.path.splitext(path)[1].lower())
+            sheets: List[Union[str, int, None]] = [None]
+            if reader_class is not None and issubclass(reader_class, ExcelReader) and self.sheet_names is not None:
+                if self.sheet_names == '*':
+                    try:
+                        sheets = reader_class().sheet_names(path)
+                    except Exception as e:
+                        logging.error(f"Could not list sheets of {path}: {e}")
+                        continue
+                elif isinstance(self.sheet_names, (list, tuple)):
+                    sheets = list(self.sheet_names)
+                else:
+                    sheets = [self.sheet_names]
+            for sheet in sheets:
+                prefix = names[path] if sheet is None else f"{names[path]}#{sheet}"
+                sources.append((prefix, DataLoader(path, cache_dir=self.cache_dir, chunk_size=self.chunk_size, sheet_names=sheet)))
+        duplicates = sorted(prefix for prefix, count in collections.Counter(prefix for prefix, _ in sources).items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Input sources listed more than once (task ids would collide): {', '.join(duplicates)}")
+        return sources
+
+    @staticmethod
+    def _namespace_task(task: 'Task', prefix: str) -> 'Task':
+        task.id = f"{prefix}:{task.id}"
+        return task
+
+    def _load_sources_parallel(self, data_transformer: 'DataTransformer') -> Optional[List['Task']]:
+        """Loads every file/sheet in a process pool and merges the tasks in source order."""
+        sources = self._source_loaders()
+        if not sources:
+            return None
+        max_workers = min(len(sources), self.max_workers or os.cpu_count() or 1)
+        logging.info(f"Loading {len(sources)} sources with {max_workers} worker process(es)")
+        merged: List[Task] = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_load_source_tasks, loader, data_transformer) for _, loader in sources]
+            for (prefix, loader), future in zip(sources, futures):
+                try:
+                    tasks = future.result()
+                except Exception as e:
+                    logging.error(f"Error loading source {prefix}: {type(e).__name__} - {e}")
+                    continue
+                if not tasks:
+                    logging.warning(f"Source {prefix} produced no tasks. Skipping.")
+                    continue
+                merged.extend(self._namespace_task(task, prefix) for task in tasks)
+        logging.info(f"Merged {len(merged)} tasks from {len(sources)} sources.")
+        return merged or None
+
+    def _sheet_kwargs(self) -> Dict[str, Any]:
+        # Only Excel readers take a sheet; other (and custom) readers keep the plain signature
+        if self.sheet_names is not None and isinstance(self.reader, ExcelReader):
+            return {'sheet_name': self.sheet_names}
+        return {}
 
     def load_data(self) -> Optional[pd.DataFrame]:
         """
-        Reads the Excel file into a pandas DataFrame.
+        Reads the input file into a pandas DataFrame.
+
+        With several files/sheets, the frames are concatenated and ids are prefixed
+        with their source.
 
         Returns:
             Optional[pd.DataFrame]: DataFrame containing the tasks, or None if loading fails.
-            The first row of the Excel sheet is expected to be the header.
+            The first row of the sheet (or CSV) is expected to be the header.
         """
+        if self._is_multi_source():
+            frames = []
+            for prefix, loader in self._source_loaders():
+                df = loader.load_data()
+                if df is not None and 'id' in df.columns:
+                    frames.append(df.assign(id=prefix + ':' + df['id'].astype(str)))
+            return pd.concat(frames, ignore_index=True) if frames else None
+        if self.reader is None:
+            return None
         try:
-            df = pd.read_excel(self.file_path)
+            df = self.reader.read_frame(self.file_path, **self._sheet_kwargs())
             logging.info(f"Successfully loaded data from {self.file_path}. Shape: {df.shape}")
             # Basic validation: Check if essential columns might be missing (can be expanded)
             if not df.empty and 'id' not in df.columns:
@@ -53,19 +346,312 @@ class DataLoader:
             logging.error(f"Error loading data from {self.file_path}: {e}")
             return None
 
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the input file row by row without materializing a DataFrame.
+
+        Memory stays bounded regardless of the number of rows.
+
+        Yields:
+            Dict[str, Any]: Mapping of column name to raw value for each data row.
+        """
+        if self.reader is None:
+            return
+        logging.info(f"Streaming rows from {self.file_path}")
+        row_count = 0
+        try:
+            for row in self.reader.iter_rows(self.file_path, self.chunk_size, **self._sheet_kwargs()):
+                if row_count == 0 and 'id' not in row:
+                    logging.warning("Column 'id' not found in the header. Ensure headers match required keys.")
+                row_count += 1
+                yield row
+        except FileNotFoundError:
+            logging.error(f"Error: File not found at {self.file_path}")
+            return
+        except Exception as e:
+            logging.error(f"Error streaming data from {self.file_path} after {row_count} rows: {e}")
+            return
+        logging.info(f"Finished streaming {row_count} rows from {self.file_path}")
+
+    # --- Parsed-dataset cache ---
+    def _cache_path(self, data_transformer: 'DataTransformer') -> Optional[str]:
+        """Returns the cache file path for the current file contents, or None if caching is off."""
+        if not self.cache_dir:
+            return None
+        try:
+            digest = hashlib.sha256()
+            with open(self.file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError as e:
+            logging.warning(f"Could not hash {self.file_path} for caching: {e}. Cache disabled for this load.")
+            return None
+        if self.sheet_names is not None:
+            digest.update(f"\0sheet={self.sheet_names}".encode('utf-8'))
+        # Bumping DataTransformer.VERSION invalidates entries produced by older parsing logic
+        key = f"{digest.hexdigest()}.v{data_transformer.VERSION}.pkl"
+        return os.path.join(self.cache_dir, key)
+
+    def _read_cache(self, cache_path: Optional[str]) -> Optional[List['Task']]:
+        """Loads cached tasks, or returns None on a miss or unreadable entry."""
+        if not cache_path or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                tasks = pickle.load(f)
+            logging.info(f"Loaded {len(tasks)} tasks from dataset cache {cache_path}")
+            return tasks
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable dataset cache entry {cache_path}: {e}")
+            return None
+
+    def _write_cache(self, cache_path: Optional[str], tasks: List['Task']):
+        """Writes tasks to the cache atomically (temp file + rename)."""
+        if not cache_path:
+            return
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(tasks, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+            logging.info(f"Stored {len(tasks)} tasks in dataset cache {cache_path}")
+        except Exception as e:
+            logging.warning(f"Could not write dataset cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load_tasks(self, data_transformer: 'DataTransformer') -> Optional[List['Task']]:
+        """
+        Loads and transforms all tasks, using the parsed-dataset cache when enabled.
+
+        A cache hit skips Excel parsing and transformation entirely. Since entries are keyed
+        by the file's content hash, editing the file automatically causes a miss.
+
+        Args:
+            data_transformer (DataTransformer): Transformer used on a cache miss.
+
+        Returns:
+            Optional[List[Task]]: The tasks, or None if the file
+            could not be loaded or has no 'id' column.
+        """
+        if self._is_multi_source():
+            return self._load_sources_parallel(data_transformer)
+        cache_path = self._cache_path(data_transformer)
+        tasks = self._read_cache(cache_path)
+        if tasks is not None:
+            return tasks
+
+        raw_data = self.load_data()
+        if raw_data is None or 'id' not in raw_data.columns:
+            return None
+        tasks = data_transformer.transform(raw_data)
+        if tasks:
+            self._write_cache(cache_path, tasks)
+        return tasks
+
+    def iter_tasks(self, data_transformer: 'DataTransformer') -> Iterator['Task']:
+        """
+        Yields tasks one at a time for streaming mode.
+
+        Serves them from the parsed-dataset cache on a hit; otherwise streams and transforms
+        rows from the file. Streaming never fills the cache, since that would require
+        holding every task in memory. Several files/sheets are streamed one after
+        another (not in parallel), so memory stays bounded. A source without an 'id'
+        column yields no tasks, as load_tasks rejects it.
+        """
+        if self._is_multi_source():
+            return (self._namespace_task(task, prefix)
+                    for prefix, loader in self._source_loaders()
+                    for task in loader.iter_tasks(data_transformer))
+        tasks = self._read_cache(self._cache_path(data_transformer))
+        if tasks is not None:
+            return iter(tasks)
+        rows = self.iter_rows()
+        first_row = next(rows, None)
+        # Like load_tasks, require an 'id' column (the first row's keys serve as the header)
+        if first_row is None or 'id' not in first_row:
+            return iter(())
+        return data_transformer.transform_stream(itertools.chain([first_row], rows))
+
+# --- 1.5 Fast Literal Parsing ---
+
+# One scalar literal: a quoted string without escapes/newlines, a float, an int,
+# or True/False/None. Anything fancier (escapes, exponents, underscores,
+# nesting, tuples, sets) is left to ast.literal_eval.
+_LITERAL_TOKEN = re.compile(r"""
+      (?P<str>'[^'\\\r\n\x00\ud800-\udfff]*'|"[^"\\\r\n\x00\ud800-\udfff]*")
+    | (?P<float>-?(?:[0-9]+\.[0-9]*|\.[0-9]+))(?![\w.])
+    | (?P<int>-?(?:0|[1-9][0-9]{0,99}))(?![\w.])
+    | (?P<const>True|False|None)(?!\w)
+""", re.VERBOSE)
+_LITERAL_SPACE = re.compile(r"[ \t]*")
+_LITERAL_CONSTANTS = {'True': True, 'False': False, 'None': None}
+_NO_FAST_PATH = object() # Sentinel: shape not recognized, use ast.literal_eval
+
+
+def _scan_literal(text: str, pos: int) -> Tuple[Any, int]:
+    """Reads one scalar token at pos. Returns (value, end) or (_NO_FAST_PATH, pos)."""
+    match = _LITERAL_TOKEN.match(text, pos)
+    if match is None:
+        return _NO_FAST_PATH, pos
+    kind, token = match.lastgroup, match.group()
+    if kind == 'str':
+        return token[1:-1], match.end()
+    if kind == 'float':
+        return float(token), match.end()
+    if kind == 'int':
+        return int(token), match.end()
+    return _LITERAL_CONSTANTS[token], match.end()
+
+
+def _scan_container(text: str, is_dict: bool) -> Any:
+    """Parses a flat list or dict of scalars spanning all of text, or returns _NO_FAST_PATH."""
+    closing = '}' if is_dict else ']'
+    items = []
+    pos = _LITERAL_SPACE.match(text, 1).end()
+    while text[pos:pos + 1] != closing:
+        value, pos = _scan_literal(text, pos)
+        if value is _NO_FAST_PATH:
+            return _NO_FAST_PATH
+        pos = _LITERAL_SPACE.match(text, pos).end()
+        if is_dict:
+            if text[pos:pos + 1] != ':':
+                return _NO_FAST_PATH
+            key = value
+            value, pos = _scan_literal(text, _LITERAL_SPACE.match(text, pos + 1).end())
+            if value is _NO_FAST_PATH:
+                return _NO_FAST_PATH
+            value = (key, value)
+            pos = _LITERAL_SPACE.match(text, pos).end()
+        items.append(value)
+        if text[pos:pos + 1] == ',':
+            pos = _LITERAL_SPACE.match(text, pos + 1).end()
+        elif text[pos:pos + 1] != closing:
+            return _NO_FAST_PATH
+    if pos + 1 != len(text):
+        return _NO_FAST_PATH
+    return dict(items) if is_dict else items
+
+
+def fast_literal_eval(text: Any) -> Any:
+    """
+    Drop-in replacement for ast.literal_eval, tuned for spreadsheet cells and model replies.
+
+    Recognizes the common shapes without building an AST: quoted strings, ints, floats,
+    True/False/None, flat lists of those (e.g. "['A', 'C']") and flat dicts of those
+    (e.g. "{'A': 'x'}"). Bare identifiers such as "A" fail fast with ValueError, like
+    literal_eval does. Everything else is delegated to ast.literal_eval, so results and
+    exception types are the same as calling it directly.
+    """
+    if not isinstance(text, str):
+        return ast.literal_eval(text)
+    stripped = text.strip(' \t')
+    if stripped:
+        first = stripped[0]
+        if first == '[' or first == '{':
+            if stripped[-1] == (']' if first == '[' else '}'):
+                value = _scan_container(stripped, first == '{')
+                if value is not _NO_FAST_PATH:
+                    return value
+        else:
+            value, end = _scan_literal(stripped, 0)
+            if value is not _NO_FAST_PATH and end == len(stripped):
+                return value
+            if stripped.isidentifier() and not keyword.iskeyword(stripped):
+                raise ValueError(f"malformed node or string: {stripped!r}")
+    return ast.literal_eval(text)
+
 # --- 2. Data Transformation ---
 
+class Task:
+    """
+    A single evaluation task.
+
+    Slotted to keep the per-task footprint small on large datasets: the standard
+    columns are attributes, any other columns live in `extra`. Supports dict-style
+    access (get, [], in, keys) so code written against the old row dictionaries keeps
+    working.
+    """
+    FIELDS = ('id', 'instruction', 'text', 'question', 'options', 'answer')
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, id: Any = None, instruction: Any = None, text: Any = None, question: Any = None,
+                 options: Optional[Dict] = None, answer: Any = None, extra: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.instruction = instruction
+        self.text = text
+        self.question = question
+        self.options = options
+        self.answer = answer
+        self.extra = extra # None unless the dataset has non-standard columns
+
+    def __getstate__(self):
+        # Plain dict state, so task caches written by earlier versions still load
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'Task':
+        """Builds a Task from a column -> value mapping."""
+        extra = {key: value for key, value in record.items() if key not in cls.FIELDS}
+        return cls(*(record.get(field) for field in cls.FIELDS), extra=extra or None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the task as a plain dictionary (standard columns first)."""
+        record = {field: getattr(self, field) for field in self.FIELDS}
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS or bool(self.extra and key in self.extra)
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Task):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Task({self.to_dict()!r})"
+
+# Parsed cell values that rows may share without copying
+_IMMUTABLE_TYPES = (str, int, float, bool, complex, bytes, type(None))
+
 class DataTransformer:
-    """Transforms raw data from DataFrame rows into structured task dictionaries."""
+    """Transforms raw data from DataFrame rows into structured Task records."""
+
+    # Increment whenever parsing (or the pickled Task layout) changes the produced tasks; invalidates the dataset cache
+    VERSION = 6
 
     def _parse_options(self, options_str: Any) -> Optional[Dict]:
         """Safely parses the options string into a dictionary."""
+        if isinstance(options_str, dict):
+            return options_str # Already structured (e.g. a JSONL object)
         if not isinstance(options_str, str):
             logging.warning(f"Options field is not a string: {options_str}. Returning None.")
             return None
         try:
-            # Use ast.literal_eval for safe evaluation of Python literals
-            options_dict = ast.literal_eval(options_str)
+            # Safe evaluation of Python literals (fast path for flat dicts, else ast.literal_eval)
+            options_dict = fast_literal_eval(options_str)
             if not isinstance(options_dict, dict):
                  logging.warning(f"Parsed options is not a dictionary: {options_dict}. Returning None.")
                  return None
@@ -81,7 +667,7 @@ class DataTransformer:
         """
         if not isinstance(answer_str, str):
              # If it's already a non-string type (e.g., boolean read directly by pandas), return it
-             if isinstance(answer_str, (bool, int, float)):
+             if isinstance(answer_str, (bool, int, float, list)):
                  return answer_str
              logging.warning(f"Answer field is not a string: {answer_str}. Trying to treat as raw value.")
              # Attempt to return as is, might be NaN or other non-string type from pandas
@@ -90,7 +676,7 @@ class DataTransformer:
         answer_str = answer_str.strip()
         # Try parsing as a Python literal first (handles lists, dicts, numbers, booleans, None)
         try:
-            parsed_value = ast.literal_eval(answer_str)
+            parsed_value = fast_literal_eval(answer_str)
             # Ensure booleans represented as strings like "True" are parsed correctly
             if isinstance(parsed_value, bool):
                 return parsed_value
@@ -128,77 +714,883 @@ class DataTransformer:
              return answer_str # Fallback to raw string on unexpected error
 
 
-    def transform(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _transform_row(self, row: Any, columns: List[str], index: Any) -> Optional[Task]:
         """
-        Transforms the DataFrame into a list of structured task dictionaries.
+        Transforms a single raw row into a Task.
+
+        Args:
+            row: Mapping of column name to raw value (a DataFrame row or a plain dict).
+            columns (List[str]): The column names to carry into the task.
+            index: Row index, used for logging context only.
+
+        Returns:
+            Optional[Task]: The task, or None if the row is invalid.
+        """
+        task_dict = {}
+        valid_task = True
+        for col in columns:
+            raw_value = row.get(col)
+            # Handle potential pandas NaN values (lists/dicts from JSONL are never missing)
+            if pd.api.types.is_scalar(raw_value) and pd.isna(raw_value):
+               value = None # Or choose another default like empty string ''
+               logging.debug(f"Found NaN in row {index}, column '{col}'. Setting value to None.")
+            else:
+               value = raw_value
+
+            if col == 'options':
+                parsed_options = self._parse_options(value)
+                if parsed_options is None and value is not None:
+                     logging.warning(f"Failed to parse 'options' for row {index} (ID: {row.get('id', 'N/A')}). Skipping this task or using raw value if needed.")
+                     # Decide if a task is invalid without parseable options
+                     # valid_task = False # Option 1: Skip task if options are critical and unparseable
+                     task_dict[col] = None # Option 2: Keep task but with None options
+                else:
+                    task_dict[col] = parsed_options
+
+            elif col == 'answer':
+                task_dict[col] = self._parse_answer(value)
+            elif col == 'id':
+                task_dict[col] = self._normalize_id(value)
+            else:
+                # Directly assign other columns, ensure basic types if needed
+                if isinstance(value, (int, float, bool, str)) or value is None:
+                     task_dict[col] = value
+                else:
+                     # Attempt to convert other types to string, or handle as needed
+                     task_dict[col] = str(value)
+                     logging.debug(f"Converted non-standard type {type(value)} to string for column '{col}' in row {index}.")
+
+        # Return the processed dictionary if it's considered valid
+        if not valid_task:
+            return None
+        # Ensure all expected keys are present, even if parsing failed (value might be None)
+        for expected_key in columns:
+            if expected_key not in task_dict:
+                task_dict[expected_key] = None # Add missing keys with None value
+        logging.debug(f"Successfully transformed row {index} (ID: {task_dict.get('id', 'N/A')})")
+        return Task.from_dict(task_dict)
+
+    def transform_stream(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Task]:
+        """
+        Lazily transforms raw row dictionaries (e.g. from DataLoader.iter_rows) into tasks.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Raw rows keyed by column name.
+
+        Yields:
+            Task: One structured task per valid row.
+        """
+        task_count = 0
+        for index, row in enumerate(rows):
+            task_dict = self._transform_row(row, list(row.keys()), index)
+            if task_dict is not None:
+                task_count += 1
+                yield task_dict
+        logging.info(f"Streaming transformation complete. Processed {task_count} tasks.")
+
+    @staticmethod
+    def _normalize_id(value: Any) -> Optional[str]:
+        """
+        Task ids as text, independent of how the file was read.
+
+        pandas turns a numeric id column with a blank cell into floats while streamed
+        rows keep the cell's int, so int-valued floats are written without the '.0'
+        (1.0 -> '1'). Blank ids stay None.
+        """
+        if value is None:
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    @staticmethod
+    def _parse_column(values: pd.Series, parse_func) -> List[Any]:
+        """
+        Applies parse_func once per distinct value of a column.
+
+        Spreadsheet columns like 'answer' or 'options' repeat a handful of strings many
+        times, so results are memoized by value. Immutable results are shared between
+        rows; lists and dicts are copied per row, so changing one task's options never
+        changes another's.
+        """
+        memo: Dict[Tuple[type, Any], Tuple[Any, Optional[Callable[[Any], Any]]]] = {}
+        parsed = []
+        for value in values:
+            # Key on the type too, since True == 1 == 1.0 would otherwise share an entry
+            key = (type(value), value)
+            try:
+                entry = memo.get(key)
+                if entry is None:
+                    result = parse_func(value)
+                    entry = memo[key] = (result, DataTransformer._copier(result))
+            except TypeError: # Unhashable cell value, parse without memoizing
+                parsed.append(parse_func(value))
+                continue
+            result, copier = entry
+            parsed.append(result if copier is None else copier(result))
+        logging.debug(f"Parsed {len(parsed)} values using {len(memo)} distinct parses.")
+        return parsed
+
+    @staticmethod
+    def _copier(value: Any) -> Optional[Callable[[Any], Any]]:
+        """How to copy a parsed value for another row: None if immutable, a shallow copy if flat, else deepcopy."""
+        if isinstance(value, (list, dict, set)):
+            items = value.values() if isinstance(value, dict) else value
+            if all(isinstance(item, _IMMUTABLE_TYPES) for item in items):
+                return copy.copy
+            return copy.deepcopy
+        return None if isinstance(value, _IMMUTABLE_TYPES) else copy.deepcopy
+
+    def _parse_options_value(self, value: Any) -> Optional[Dict]:
+        """Parses an options cell, logging when a non-empty value cannot be parsed."""
+        parsed_options = self._parse_options(value)
+        if parsed_options is None and value is not None:
+            logging.warning(f"Failed to parse 'options' value '{value}'. Using None for affected tasks.")
+        return parsed_options
+
+    def transform(self, df: pd.DataFrame) -> List[Task]:
+        """
+        Transforms the DataFrame into a list of structured Task records.
+
+        Works column by column: missing values are replaced with None for the whole frame
+        at once, 'options' and 'answer' are parsed once per distinct string, and other
+        columns are only coerced when their dtype can hold non-basic values. Task records
+        are built at the end.
 
         Args:
             df (pd.DataFrame): The input DataFrame loaded by DataLoader.
 
         Returns:
-            List[Dict[str, Any]]: A list where each dictionary represents a task
-                                  in the desired format. Returns empty list on failure.
+            List[Task]: One Task per row, in the desired format.
+                        Returns empty list on failure.
         """
         if df is None or df.empty:
             logging.warning("Input DataFrame is empty or None. Cannot transform data.")
             return []
 
-        processed_tasks = []
         required_columns = df.columns.tolist() # Assume headers match keys directly
+        # Object dtype keeps native Python values and lets None replace NaN
+        frame = df.astype(object).where(df.notna(), None)
+
+        columns: Dict[str, List[Any]] = {}
+        for col in required_columns:
+            if col == 'options':
+                columns[col] = self._parse_column(frame[col], self._parse_options_value)
+            elif col == 'answer':
+                columns[col] = self._parse_column(frame[col], self._parse_answer)
+            elif col == 'id':
+                columns[col] = [self._normalize_id(value) for value in frame[col]]
+            elif df[col].dtype.kind in 'biuf':
+                # Numeric and bool columns only contain basic types (or None) already
+                columns[col] = frame[col].tolist()
+            else:
+                # Attempt to convert other types (dates, etc.) to string
+                columns[col] = [value if value is None or isinstance(value, (int, float, bool, str)) else str(value)
+                                for value in frame[col]]
 
-        for index, row in df.iterrows():
-            task_dict = {}
-            valid_task = True
-            for col in required_columns:
-                raw_value = row[col]
-                # Handle potential pandas NaN values
-                if pd.isna(raw_value):
-                   value = None # Or choose another default like empty string ''
-                   logging.debug(f"Found NaN in row {index}, column '{col}'. Setting value to None.")
-                else:
-                   value = raw_value
-
-                if col == 'options':
-                    parsed_options = self._parse_options(value)
-                    if parsed_options is None and value is not None:
-                         logging.warning(f"Failed to parse 'options' for row {index} (ID: {row.get('id', 'N/A')}). Skipping this task or using raw value if needed.")
-                         # Decide if a task is invalid without parseable options
-                         # valid_task = False # Option 1: Skip task if options are critical and unparseable
-                         task_dict[col] = None # Option 2: Keep task but with None options
-                    else:
-                        task_dict[col] = parsed_options
-
-                elif col == 'answer':
-                    task_dict[col] = self._parse_answer(value)
-                else:
-                    # Directly assign other columns, ensure basic types if needed
-                    if isinstance(value, (int, float, bool, str)) or value is None:
-                         task_dict[col] = value
-                    else:
-                         # Attempt to convert other types to string, or handle as needed
-                         task_dict[col] = str(value)
-                         logging.debug(f"Converted non-standard type {type(value)} to string for column '{col}' in row {index}.")
-
-            # Add the processed dictionary to the list if it's considered valid
-            if valid_task:
-                 # Ensure all expected keys are present, even if parsing failed (value might be None)
-                 for expected_key in required_columns:
-                     if expected_key not in task_dict:
-                         task_dict[expected_key] = None # Add missing keys with None value
-                 processed_tasks.append(task_dict)
-                 logging.debug(f"Successfully transformed row {index} (ID: {task_dict.get('id', 'N/A')})")
-
+        processed_tasks = [Task.from_dict(dict(zip(required_columns, values))) for values in zip(*columns.values())]
         logging.info(f"Transformation complete. Processed {len(processed_tasks)} tasks.")
         return processed_tasks
 
 # --- 3. LLM Interaction ---
 
+class RetryPolicy:
+    """
+    Decides whether a failed API call is retried and how long to wait first.
+
+    Rate limits (429), timeouts, connection errors, 408/409 and 5xx responses are
+    transient and retried with capped exponential backoff and full jitter; a
+    Retry-After (or retry-after-ms) header from the server takes precedence over the
+    computed delay. Other 4xx responses and unexpected errors are permanent and fail
+    immediately.
+    """
+    TRANSIENT_STATUS_CODES = frozenset({408, 409, 429})
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 30.0,
+                 max_retry_after: float = 120.0):
+        """
+        Args:
+            max_attempts (int): Total attempts per request, including the first one.
+            base_delay (float): Backoff ceiling in seconds for the first retry; doubles per retry.
+            max_delay (float): Upper bound in seconds for the computed backoff.
+            max_retry_after (float): Upper bound in seconds for a server-provided Retry-After.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def is_transient(self, error: Exception) -> bool:
+        """True if the error is worth retrying."""
+        if isinstance(error, APIConnectionError): # Includes APITimeoutError
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in self.TRANSIENT_STATUS_CODES or error.status_code >= 500
+        return isinstance(error, asyncio.TimeoutError)
+
+    def delay_for(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before the retry that follows failed attempt number `attempt` (1-based)."""
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            # Small jitter so clients told the same deadline do not all return at once
+            return min(retry_after, self.max_retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Parses Retry-After / retry-after-ms from the error response, if any."""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if (value := headers.get('retry-after-ms')) is not None:
+                return max(0.0, float(value) / 1000)
+            if (value := headers.get('retry-after')) is not None:
+                try:
+                    return max(0.0, float(value))
+                except ValueError: # HTTP-date form
+                    retry_at = email.utils.parsedate_to_datetime(value)
+                    return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+        return None
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `rate` units per second.
+
+    Holds at most `capacity` units. A request larger than the capacity waits for a full
+    bucket and drives the level negative, so the long-run rate is still respected.
+    Waiters are served in arrival order.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """Takes `amount` units, waiting for the bucket to refill if needed. Returns seconds waited."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.level >= needed:
+                    self.level -= amount
+                    return waited
+                delay = (needed - self.level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, amount: float):
+        """Returns (positive) or takes (negative) units without waiting."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one provider.
+
+    Each request is charged up front for its estimated prompt tokens plus max_tokens.
+    Once the response arrives, settle() corrects the charge to the actual usage.
+    Buckets hold `burst_seconds` worth of budget, so short bursts stay well below
+    what a provider enforcing its limit over sub-minute windows would reject.
+    """
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, burst_seconds: float = 10.0):
+        """
+        Args:
+            rpm (Optional[float]): Requests per minute, or None for no request limit.
+            tpm (Optional[float]): Tokens (prompt + completion) per minute, or None for no token limit.
+            burst_seconds (float): Seconds of budget that may be spent at once.
+        """
+        self.requests = TokenBucket(rpm / 60, max(1.0, rpm * burst_seconds / 60)) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, max(1.0, tpm * burst_seconds / 60)) if tpm else None
+        self.wait_seconds = 0.0 # Total time requests were held back locally
+
+    async def acquire(self, estimated_tokens: int):
+        """Waits until the request and its estimated tokens fit the budgets, then charges them."""
+        if self.requests:
+            self.wait_seconds += await self.requests.acquire(1)
+        if self.tokens:
+            self.wait_seconds += await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, charged_tokens: int, used_tokens: int):
+        """Corrects an earlier charge of charged_tokens to the tokens actually used."""
+        if self.tokens and charged_tokens != used_tokens:
+            self.tokens.adjust(charged_tokens - used_tokens)
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of raw LLM responses in a SQLite file.
+
+    Entries are keyed by a hash of everything that determines the answer: model,
+    base_url, the formatted messages, temperature and max_tokens. The raw response
+    text is stored, so parsing changes apply to cached answers too. When the file
+    grows beyond `max_bytes`, the least recently used entries are evicted.
+
+    Modes:
+        'read-write': serve hits and store new responses (default).
+        'read-only':  serve hits, never write (e.g. a shared cache file).
+        'bypass':     neither read nor write; every call goes to the API.
+    """
+    MODES = ('read-write', 'read-only', 'bypass')
+
+    def __init__(self, path: str, mode: str = 'read-write', max_bytes: int = 512 * 1024 * 1024):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid response cache mode '{mode}'. Expected one of {self.MODES}.")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0 # Original latency of the calls that hits replaced
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock() # The connection may be used from several threads
+        self._size = 0
+        if mode == 'bypass':
+            return
+        if mode == 'read-only':
+            if not os.path.exists(path):
+                logging.warning(f"Response cache {path} does not exist; read-only cache will be empty.")
+                return
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Used from the client loop thread, not only the thread that created the cache
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                           "latency REAL NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, base_url: Optional[str], messages: List[Dict[str, str]],
+                 temperature: float, max_tokens: int) -> str:
+        payload = json.dumps([model, base_url, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def early_stop_key(key: str) -> str:
+        """Key for the answer of an early-stopped stream, kept apart from full responses stored under key."""
+        return hashlib.sha256(f"{key}:early-stop".encode('utf-8')).hexdigest()
+
+    def get(self, key: str, fallback: Optional[str] = None) -> Optional[str]:
+        """Returns the cached raw response for key (else for fallback, if given), or None (counted as a miss)."""
+        row = None
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    for candidate in (key, fallback):
+                        if candidate is not None and row is None:
+                            row = self._conn.execute("SELECT response, latency FROM responses WHERE key = ?", (candidate,)).fetchone()
+                            if row is not None:
+                                key = candidate
+                except sqlite3.Error as e: # e.g. a read-only cache that was never written
+                    logging.debug(f"Response cache lookup failed: {e}")
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+            if self.mode == 'read-write':
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str, latency: float):
+        """Stores a raw response (read-write mode only) and evicts old entries if over max_bytes."""
+        if self.mode != 'read-write' or self._conn is None:
+            return
+        size = len(key) + len(response.encode('utf-8'))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, response, latency, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                               (key, response, latency, size, time.time()))
+            self._size += size - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache is at 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if self._size <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+            evicted += 1
+        logging.info(f"Response cache {self.path}: evicted {evicted} entries to stay under {self.max_bytes} bytes.")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class Completion:
+    """Outcome of one completion request, including retries."""
+    __slots__ = ('response', 'attempts', 'error', 'cached', 'latency', 'ttfb', 'early_stop',
+                 'max_tokens', 'temperature', 'tokens', 'cached_tokens', 'packed', 'hedged')
+
+    def __init__(self, response: Any, attempts: int, error: Optional[str] = None, cached: bool = False,
+                 latency: Optional[float] = None, ttfb: Optional[float] = None, early_stop: bool = False,
+                 max_tokens: Optional[int] = None, temperature: Optional[float] = None, tokens: Optional[int] = None,
+                 cached_tokens: Optional[int] = None, packed: int = 0, hedged: Optional[str] = None):
+        self.response = response # Parsed LLM response
+        self.attempts = attempts # API calls made, including the first (0 for a cache hit)
+        self.error = error # Set if the request failed after all allowed attempts
+        self.cached = cached # Served from the response cache
+        self.latency = latency # Seconds for the successful call, request to last byte read
+        self.ttfb = ttfb # Seconds to the first streamed chunk (streaming only)
+        self.early_stop = early_stop # Stream closed as soon as the answer was complete
+        self.max_tokens = max_tokens # Generation parameters the request was made with
+        self.temperature = temperature
+        self.tokens = tokens # Total tokens reported by the API, if any
+        self.cached_tokens = cached_tokens # Prompt tokens served from the provider's prompt cache, if reported
+        self.packed = packed # Number of tasks in the packed request that answered this one (0: sent alone)
+        self.hedged = hedged # None if no duplicate was sent, else which request answered: 'primary' or 'hedge'
+
+class IncrementalAnswerParser:
+    """
+    Detects, while a response streams in, that it already holds a complete answer.
+
+    The expected answer type is that of the ground truth: a list is complete at a
+    closing bracket where the text parses as a list, a bool or number once its first
+    token is followed by whitespace, a string at the end of its first non-empty line.
+    Only a candidate that parses to the expected type ends the stream; otherwise the
+    whole response is read and parsed as usual.
+
+    Full responses go through the same detection (extract), so an answer is scored the
+    same whether it was streamed and cut short or received whole.
+    """
+    _WHITESPACE = re.compile(r'\s')
+
+    def __init__(self, expected: Any, parse: Callable[[str], Any]):
+        """
+        Args:
+            expected (Any): The ground truth; only its type is used. None disables detection.
+            parse (Callable[[str], Any]): The response parser (AsyncLLMClient._parse_llm_response).
+        """
+        if isinstance(expected, list): self.kind = list
+        elif isinstance(expected, bool): self.kind = bool
+        elif isinstance(expected, (int, float)): self.kind = float
+        elif isinstance(expected, str): self.kind = str
+        else: self.kind = None
+        self.parse = parse
+        self.text = ''
+        self.answer_text: Optional[str] = None # The complete answer, once detected
+        self._scanned = 0 # List answers: text already searched for closing brackets
+        self._gave_up = self.kind is None
+
+    @classmethod
+    def extract(cls, text: str, expected: Any, parse: Callable[[str], Any]) -> str:
+        """The answer a stream of `text` would have stopped at, or the whole text if none is detected."""
+        parser = cls(expected, parse)
+        return parser.answer_text if parser.feed(text) else text
+
+    def feed(self, delta: str) -> bool:
+        """Adds streamed text; returns True once a complete answer of the expected type is available."""
+        self.text += delta
+        if self._gave_up:
+            return False
+        text = self.text
+        start = len(text) - len(text.lstrip())
+        if start == len(text):
+            return False # Only whitespace so far
+        if self.kind is list:
+            if text[start] != '[':
+                self._gave_up = True
+                return False
+            end = text.find(']', max(self._scanned, start))
+            while end != -1:
+                if self._accept(text[start:end + 1]):
+                    return True
+                end = text.find(']', end + 1)
+            self._scanned = len(text)
+            return False
+        if self.kind is str:
+            end = text.find('\n', start)
+        else:
+            match = self._WHITESPACE.search(text, start)
+            end = match.start() if match else -1
+        if end == -1:
+            return False # First token or line not finished yet
+        if self._accept(text[start:end]):
+            return True
+        self._gave_up = True # The answer does not start with the expected type
+        return False
+
+    def _accept(self, candidate: str) -> bool:
+        parsed = self.parse(candidate)
+        if self.kind is float:
+            matches = isinstance(parsed, (int, float)) and not isinstance(parsed, bool)
+        else:
+            matches = isinstance(parsed, self.kind)
+        if matches:
+            self.answer_text = candidate
+        return matches
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Per-provider concurrency limit tuned by AIMD (additive increase, multiplicative decrease).
+
+    Each successful request raises the limit by `increase / limit` (about +`increase` per
+    round of `limit` requests) while the smoothed latency stays within `latency_tolerance`
+    times the provider's baseline. Slower responses hold the limit. Rate limits (429) and
+    timeouts multiply it by `decrease_factor`, at most once per round: failures of
+    requests that started before the last cut do not cut again.
+    """
+    def __init__(self, name: str, initial_limit: int = 10, min_limit: int = 1, max_limit: int = 100,
+                 increase: float = 1.0, decrease_factor: float = 0.5, latency_tolerance: float = 2.0):
+        """
+        Args:
+            name (str): Label for logs (usually the provider identifier).
+            initial_limit (int): Concurrent requests allowed at start.
+            min_limit (int), max_limit (int): Bounds for the limit.
+            increase (float): Additive step per round of successful requests.
+            decrease_factor (float): Multiplier applied on rate limits and timeouts.
+            latency_tolerance (float): Latency, relative to the baseline, above which the limit stops growing.
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0 # Rate limits and timeouts
+        self.errors = 0 # Other failures
+        self.total_latency = 0.0 # Summed latency of successful requests (s)
+        self.latency_ewma: Optional[float] = None # Smoothed latency of successful requests (s)
+        self.baseline_latency: Optional[float] = None # Lowest smoothed latency, drifts up slowly
+        self._last_decrease = float('-inf')
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Holds one unit of concurrency for a single request and learns from its outcome."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._on_failure(e, started)
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify(max(0, self.current_limit - self.in_flight))
+
+    def _on_success(self, latency: float):
+        self.successes += 1
+        self.total_latency += latency
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.baseline_latency is None or self.latency_ewma < self.baseline_latency:
+            self.baseline_latency = self.latency_ewma
+        else:
+            # Follow a provider that got permanently slower, but only gradually
+            self.baseline_latency += (self.latency_ewma - self.baseline_latency) * 0.01
+        if self.latency_ewma <= self.baseline_latency * self.latency_tolerance:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def _on_failure(self, error: Exception, started: float):
+        if not isinstance(error, (RateLimitError, APITimeoutError, asyncio.TimeoutError)):
+            self.errors += 1
+            return
+        self.throttled += 1
+        if started < self._last_decrease:
+            return # Already cut for this round of requests
+        previous = self.current_limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._last_decrease = time.monotonic()
+        logging.info(f"{self.name}: {type(error).__name__}, concurrency limit {previous} -> {self.current_limit}")
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot of the controller for monitoring."""
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "mean_latency": self.total_latency / self.successes if self.successes else None,
+            "latency_ewma": self.latency_ewma,
+            "baseline_latency": self.baseline_latency,
+        }
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit has stayed open for longer than the breaker's max_wait."""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker driven by the error rate of recent requests.
+
+    closed: requests flow and their outcomes are recorded. Once at least
+    `min_requests` of the last `window` outcomes are known and `failure_rate` of them
+    are failures (connection errors, timeouts, 5xx), the circuit opens.
+    open: new requests wait instead of being sent, so they are deferred rather than
+    failed and hold no concurrency slot. After `open_seconds` the circuit goes
+    half-open.
+    half-open: a single probe request is let through. Success closes the circuit
+    and releases the waiting requests; failure re-opens it with the open period
+    doubled (up to `max_open_seconds`).
+    If the circuit stays open for more than `max_wait` seconds in total, waiting
+    requests fail with CircuitOpenError so a dead provider cannot stall a run forever.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20, min_requests: int = 10,
+                 open_seconds: float = 10.0, max_open_seconds: float = 120.0, max_wait: float = 600.0):
+        """
+        Args:
+            name (str): Label for logs (usually the provider identifier).
+            failure_rate (float): Fraction of failed recent requests that opens the circuit.
+            window (int): Number of recent request outcomes considered.
+            min_requests (int): Outcomes needed before the circuit can open.
+            open_seconds (float): Initial time the circuit stays open before a probe.
+            max_open_seconds (float): Upper bound for the (doubling) open period.
+            max_wait (float): Seconds of continuous outage after which waiting requests fail.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = max(1, min_requests)
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.max_wait = max_wait
+        self.state = self.CLOSED
+        self.trips = 0 # Times the circuit opened
+        self.deferred = 0 # Requests that had to wait for the circuit
+        self._outcomes: collections.deque = collections.deque(maxlen=max(1, window)) # True = failure
+        self._open_seconds = open_seconds
+        self._open_until = 0.0
+        self._outage_started: Optional[float] = None
+        self._probe_in_flight = False
+        # Replaced on every state change; waiters re-check the state when it is set
+        self._changed: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """True for errors that indicate the endpoint is unhealthy (not rate limits or bad requests)."""
+        if isinstance(error, APIConnectionError): # Includes APITimeoutError
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500
+        return isinstance(error, asyncio.TimeoutError)
+
+    @contextlib.asynccontextmanager
+    async def guard(self):
+        """Waits until the circuit lets a request through, then records the request's outcome."""
+        probe = await self._admit()
+        try:
+            yield
+        except Exception as e:
+            self._record(self.is_failure(e), probe)
+            raise
+        except BaseException:
+            if probe: # Cancelled probe: let another request probe instead
+                self._probe_in_flight = False
+                self._notify()
+            raise
+        else:
+            self._record(False, probe)
+
+    async def _admit(self) -> bool:
+        """Returns once a request may be sent; True if it is the half-open probe."""
+        waited = False
+        while True:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return False
+            if now - self._outage_started > self.max_wait:
+                raise CircuitOpenError(f"Circuit for {self.name} open for more than {self.max_wait:.0f}s")
+            if self.state == self.OPEN and now >= self._open_until:
+                self.state = self.HALF_OPEN
+                logging.info(f"Circuit breaker {self.name}: half-open, sending a probe request.")
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            if not waited:
+                waited = True
+                self.deferred += 1
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            timeout = self._open_until - now if self.state == self.OPEN else None
+            deadline = self._outage_started + self.max_wait - now
+            timeout = max(0.0, min(timeout, deadline) if timeout is not None else deadline)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _record(self, failure: bool, probe: bool):
+        if probe:
+            self._probe_in_flight = False
+            self._trip() if failure else self._close()
+            return
+        self._outcomes.append(failure)
+        if (self.state == self.CLOSED and len(self._outcomes) >= self.min_requests
+                and sum(self._outcomes) >= self.failure_rate * len(self._outcomes)):
+            self._trip()
+
+    def _trip(self):
+        now = time.monotonic()
+        if self._outage_started is None:
+            self._outage_started = now
+            self._open_seconds = self.base_open_seconds
+        else: # A failed probe: back off further
+            self._open_seconds = min(self._open_seconds * 2, self.max_open_seconds)
+        self.state = self.OPEN
+        self._open_until = now + self._open_seconds
+        self.trips += 1
+        logging.warning(f"Circuit breaker {self.name}: open for {self._open_seconds:.1f}s "
+                        f"({sum(self._outcomes)}/{len(self._outcomes)} recent requests failed); deferring its requests.")
+        self._notify()
+
+    def _close(self):
+        if self.state != self.CLOSED:
+            logging.info(f"Circuit breaker {self.name}: closed, resuming deferred requests.")
+        self.state = self.CLOSED
+        self._outcomes.clear()
+        self._outage_started = None
+        self._notify()
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of AsyncOpenAI clients, one per (base_url, api_key).
+
+    Clients sharing an endpoint and key share one tuned httpx connection pool with
+    HTTP/2 (when the optional `h2` package is installed) and long keep-alive. Pools
+    are bound to an event loop, so the registry also owns one long-lived loop in a
+    background thread. EvaluationRunner executes every run on it via run(), which
+    keeps warm connections (and finished TLS handshakes) across runs in the same
+    process, e.g. successive evaluations started from the web app. Coroutines
+    running on any other loop get clients private to that loop.
+    """
+    def __init__(self, max_connections: int = 1000, max_keepalive_connections: int = 200,
+                 keepalive_expiry: float = 60.0, http2: Optional[bool] = None):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = importlib.util.find_spec('h2') is not None if http2 is None else http2
+        # loop -> {(base_url, api_key): (AsyncOpenAI, httpx.AsyncClient)}
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The shared event loop, started on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="lmeval-client-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Runs a coroutine on the shared loop and waits for its result (like asyncio.run)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel() # e.g. KeyboardInterrupt in the calling thread
+            raise
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedules a coroutine on the shared loop without waiting for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _entry(self, base_url: Optional[str], api_key: str) -> Tuple[AsyncOpenAI, httpx.AsyncClient]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError: # Not in a coroutine: clients are created for the shared loop
+            loop = self.loop
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            entry = clients.get((base_url, api_key))
+            if entry is None:
+                http_client = DefaultAsyncHttpxClient(http2=self.http2, limits=self.limits)
+                # Retries are handled by AsyncLLMClient.complete(), not the SDK
+                client_args = {"api_key": api_key, "max_retries": 0, "http_client": http_client}
+                if base_url:
+                    client_args["base_url"] = base_url
+                entry = clients[(base_url, api_key)] = (AsyncOpenAI(**client_args), http_client)
+            return entry
+
+    def get(self, base_url: Optional[str], api_key: str) -> AsyncOpenAI:
+        """The shared client for this endpoint and key on the current (or shared) loop."""
+        return self._entry(base_url, api_key)[0]
+
+    async def prewarm(self, base_url: Optional[str], api_key: str, connections: int = 1):
+        """
+        Opens connections to the endpoint ahead of the first request.
+
+        Sends `connections` concurrent HEAD requests (one suffices for HTTP/2); the
+        status is irrelevant, only the established, kept-alive connections matter.
+        """
+        client, http_client = self._entry(base_url, api_key)
+        count = 1 if self.http2 else max(1, connections)
+        outcomes = await asyncio.gather(*(http_client.head(str(client.base_url)) for _ in range(count)),
+                                        return_exceptions=True)
+        failures = [o for o in outcomes if isinstance(o, Exception)]
+        if failures:
+            logging.debug(f"Pre-warming {client.base_url}: {len(failures)}/{count} connections failed ({failures[0]!r})")
+
+CLIENT_REGISTRY = ClientRegistry()
+
 class AsyncLLMClient:
     """
     ASYNC Client for interacting with an LLM API (OpenAI compatible).
     Handles prompt formatting, API calls, and basic response parsing asynchronously.
     """
-    def __init__(self, model_name: str, api_key: str, base_url: Optional[str] = None):
+    DEFAULT_TEMPERATURE = 0.1
+    DEFAULT_MAX_TOKENS = 250 # Adjust as needed
+    # Budgets for answers whose shape is known from the ground truth (see _generation_params)
+    CLOSED_ANSWER_TEMPERATURE = 0.0
+    BOOL_MAX_TOKENS = 5
+    NUMBER_MAX_TOKENS = 16
+    OPTION_KEY_MAX_TOKENS = 4 # Plus roughly one token per two characters of the longest key
+    LIST_BASE_MAX_TOKENS = 8
+    LIST_MAX_TOKENS_PER_OPTION = 4
+    # Compiled prompts shared by all clients: id(task) -> (task, messages). Holding the task
+    # keeps its id from being reused while cached. Bounded so finished tasks (which results
+    # keep alive) do not also keep their prompts alive.
+    PROMPT_CACHE_SIZE = 4096
+    _prompt_cache: 'collections.OrderedDict[int, Tuple[Task, List[Dict[str, str]]]]' = collections.OrderedDict()
+
+    def __init__(self, model_name: str, api_key: str, base_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 response_cache: Optional[ResponseCache] = None, stream_completions: bool = False,
+                 generation_budgets: bool = True, pack_size: int = 1, pack_linger: float = 0.05,
+                 hedge_percentile: Optional[float] = None, hedge_budget: float = 0.05,
+                 circuit_breaker: Optional[CircuitBreaker] = None, request_timeout: Optional[float] = 120.0):
         """
         Initializes the Async LLM client.
 
@@ -207,49 +1599,196 @@ class AsyncLLMClient:
             api_key (str): The API key for the service.
             base_url (Optional[str]): The base URL for the API (e.g., for DeepSeek or local models).
                                      If None, uses the default OpenAI URL.
+            retry_policy (Optional[RetryPolicy]): Retry behaviour for failed calls. Defaults to RetryPolicy().
+            rate_limiter (Optional[RateLimiter]): RPM/TPM budget every call must fit into.
+            response_cache (Optional[ResponseCache]): On-disk cache consulted before calling the API.
+            stream_completions (bool): Stream responses and close the stream as soon as a
+                                       complete answer of the ground-truth type has arrived.
+            generation_budgets (bool): Derive max_tokens and temperature from each task's
+                                       answer type. If False, every task uses the defaults
+                                       unless the dataset overrides them.
+            pack_size (int): Send up to this many tasks in one request (numbered questions,
+                             answered as a JSON object). Only tasks with a closed answer
+                             type (bool, number, option keys) and the same context are
+                             packed; answers that are missing or unparseable are
+                             re-requested one task at a time. 1 disables packing.
+            pack_linger (float): Seconds an incomplete pack waits for more tasks.
+            hedge_percentile (Optional[float]): Enables hedging. A request still running
+                             after this percentile (e.g. 95) of recent request latencies
+                             gets a duplicate; the first answer wins and the other
+                             request is cancelled. None disables hedging.
+            hedge_budget (float): Maximum fraction of requests that may be hedged.
+            circuit_breaker (Optional[CircuitBreaker]): Breaker every call passes through.
+                             While it is open, calls wait instead of failing.
+            request_timeout (Optional[float]): Deadline in seconds for a single API call,
+                             including reading a streamed response. Calls that miss it
+                             are cancelled and retried like other timeouts. None leaves
+                             only the HTTP client's own timeouts.
         """
         self.model_name = model_name
-        # Allow omitting base_url for default OpenAI
-        client_args = {"api_key": api_key}
-        if base_url:
-            client_args["base_url"] = base_url
+        self.base_url = base_url
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.request_timeout = request_timeout
+        self.api_key = api_key
+        self.stream_completions = stream_completions
+        self.generation_budgets = generation_budgets
+        self.pack_size = max(1, pack_size)
+        self.pack_linger = pack_linger
+        self._open_packs: Dict[Tuple[str, float], List[Tuple[Dict[str, Any], asyncio.Future, Any]]] = {}
+        self._pack_sends: Set[asyncio.Future] = set()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self._recent_latencies: collections.deque = collections.deque(maxlen=self.HEDGE_WINDOW)
+        # requests: calls eligible for hedging; hedged: duplicates sent; won: duplicates answering first
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'won': 0, 'saved_seconds': 0.0}
+        self.prompt_tokens = 0 # Prompt tokens reported by the API, and how many of them were cached
+        self.cached_prompt_tokens = 0
 
         try:
-            self.client = AsyncOpenAI(**client_args)
+            # Allow omitting base_url for default OpenAI; the client comes from the shared registry
+            CLIENT_REGISTRY.get(base_url, api_key)
             url_info = f"at {base_url}" if base_url else "at default OpenAI URL"
             logging.info(f"AsyncLLMClient initialized for model: {self.model_name} {url_info}")
         except Exception as e:
             logging.error(f"Failed to initialize AsyncOpenAI client: {e}")
             raise
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared AsyncOpenAI client (and connection pool) for this endpoint and key."""
+        return CLIENT_REGISTRY.get(self.base_url, self.api_key)
+
     # --- Prompt Formatting (Synchronous Helpers) ---
+    SYSTEM_MESSAGE = (
+        "You are an AI assistant evaluating language tasks. "
+        "Follow the instructions precisely. "
+        "Provide only the answer in the format requested. "
+        "Do not add explanations unless explicitly asked."
+        # Add specific format hints if useful
+    )
+
     def _format_options(self, options: Optional[Dict]) -> str:
         if not options or not isinstance(options, dict): return "No options provided."
         return "\n".join([f"{key}: {value}" for key, value in options.items()])
 
     def _format_prompt(self, task_data: Dict[str, Any]) -> List[Dict[str, str]]:
-        system_message = (
-            "You are an AI assistant evaluating language tasks. "
-            "Follow the instructions precisely. "
-            "Provide only the answer in the format requested. "
-            "Do not add explanations unless explicitly asked."
-            # Add specific format hints if useful
-        )
+        """
+        Returns the chat messages for a task.
+
+        Parts are ordered from most to least shared (system message, context,
+        instruction, then question and options), so tasks with the same context send
+        the same prompt prefix and can hit the provider's prompt cache. For Task
+        objects the messages of recently used tasks are kept in a small LRU shared by
+        all providers (a provider far behind the others just compiles again); callers
+        must not modify them.
+        """
+        if not isinstance(task_data, Task):
+            return self._compile_prompt(task_data)
+        cache = AsyncLLMClient._prompt_cache
+        key = id(task_data)
+        entry = cache.get(key)
+        if entry is None:
+            entry = cache[key] = (task_data, self._compile_prompt(task_data))
+            if len(cache) > self.PROMPT_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return entry[1]
+
+    def _compile_prompt(self, task_data: Dict[str, Any]) -> List[Dict[str, str]]:
         user_prompt_parts = []
-        if inst := task_data.get('instruction'): user_prompt_parts.append(f"Instruction: {inst}")
         if text := task_data.get('text'):
-            if str(text).strip(): user_prompt_parts.append("\n--- Context ---\n" + str(text))
+            if str(text).strip(): user_prompt_parts.append("--- Context ---\n" + str(text) + "\n")
+        if inst := task_data.get('instruction'): user_prompt_parts.append(f"Instruction: {inst}")
         if question := task_data.get('question'): user_prompt_parts.append("\n--- Question ---\n" + str(question))
         options = task_data.get('options')
         if options and isinstance(options, dict) and options:
             user_prompt_parts.append("\n--- Options ---\n" + self._format_options(options))
         user_prompt_parts.append("\n--- Answer ---")
         user_prompt = "\n".join(user_prompt_parts)
-        messages = [{"role": "system", "content": system_message}, {"role": "user", "content": user_prompt}]
+        messages = [{"role": "system", "content": self.SYSTEM_MESSAGE}, {"role": "user", "content": user_prompt}]
         # logging.debug(f"Formatted messages for LLM task {task_data.get('id', 'N/A')}: {messages}")
         return messages
 
+    @staticmethod
+    def _cached_tokens(usage: Any) -> Optional[int]:
+        """Prompt tokens served from the provider's prompt cache, if the API reports them."""
+        if usage is None:
+            return None
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) if details is not None else None
+        if cached is None:
+            cached = getattr(usage, 'prompt_cache_hit_tokens', None) # DeepSeek's field name
+        return cached
+
+    @staticmethod
+    def _estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        """
+        Cheap upper-leaning estimate of prompt tokens, used only for rate-limit charges.
+
+        One token per 3 UTF-8 bytes overestimates English slightly and is close for CJK
+        text; the charge is corrected against the reported usage afterwards.
+        """
+        return sum(len(message['content'].encode('utf-8')) // 3 + 4 for message in messages)
+
+    def _closed_answer_budget(self, task_data: Dict[str, Any]) -> Optional[int]:
+        """Token budget for a task whose answer shape is known from its ground truth, else None."""
+        answer = task_data.get('answer')
+        options = task_data.get('options')
+        options = options if isinstance(options, dict) else {}
+        if isinstance(answer, bool):
+            return self.BOOL_MAX_TOKENS
+        if isinstance(answer, (int, float)):
+            return self.NUMBER_MAX_TOKENS
+        if isinstance(answer, str) and answer in options:
+            return self.OPTION_KEY_MAX_TOKENS + max(len(str(key)) for key in options) // 2 + 1
+        if isinstance(answer, list) and options:
+            return self.LIST_BASE_MAX_TOKENS + self.LIST_MAX_TOKENS_PER_OPTION * len(options)
+        return None
+
+    def _generation_params(self, task_data: Dict[str, Any]) -> Tuple[int, float]:
+        """
+        Returns (max_tokens, temperature) for a task.
+
+        Closed answers get a budget sized to their shape and temperature 0: a bool a
+        few tokens, a number a few more, a single option key enough for the longest
+        key, a list of option keys a base plus a few tokens per option. Free-form
+        answers (and tasks without ground truth) keep the defaults. Non-empty
+        'max_tokens' / 'temperature' columns in the dataset override both.
+        """
+        max_tokens, temperature = self.DEFAULT_MAX_TOKENS, self.DEFAULT_TEMPERATURE
+        if self.generation_budgets and (budget := self._closed_answer_budget(task_data)) is not None:
+            max_tokens, temperature = budget, self.CLOSED_ANSWER_TEMPERATURE
+
+        if (override := task_data.get('max_tokens')) is not None:
+            try:
+                max_tokens = max(1, int(float(override)))
+            except (TypeError, ValueError):
+                logging.warning(f"Task {task_data.get('id', 'N/A')}: Ignoring invalid max_tokens '{override}'.")
+        if (override := task_data.get('temperature')) is not None:
+            try:
+                temperature = float(override)
+            except (TypeError, ValueError):
+                logging.warning(f"Task {task_data.get('id', 'N/A')}: Ignoring invalid temperature '{override}'.")
+        return max_tokens, temperature
+
     # --- Response Parsing (Synchronous Helper) ---
+    def _parse_answer(self, response_text: str, expected: Any, task_id: str = "N/A") -> Any:
+        """
+        Parses a response for a task whose ground truth is `expected`.
+
+        With stream_completions, only the answer at the start of the response is parsed
+        (see IncrementalAnswerParser), as an early-stopped stream would see it, so cache
+        hits, packed and batch answers score like streamed ones. Otherwise the whole
+        response is parsed, as before streaming existed.
+        """
+        if self.stream_completions:
+            response_text = IncrementalAnswerParser.extract(response_text, expected, self._parse_llm_response)
+        return self._parse_llm_response(response_text, task_id)
+
     def _parse_llm_response(self, response_text: str, task_id: str = "N/A") -> Any:
         cleaned_response = response_text.strip()
         if not cleaned_response:
@@ -259,12 +1798,12 @@ class AsyncLLMClient:
         try:
             if (cleaned_response.startswith('[') and cleaned_response.endswith(']')) or \
                (cleaned_response.startswith('{') and cleaned_response.endswith('}')):
-                parsed = ast.literal_eval(cleaned_response)
+                parsed = fast_literal_eval(cleaned_response)
                 if isinstance(parsed, list): return parsed # Primarily expect lists
                 logging.warning(f"Task {task_id} (Model {self.model_name}): Parsed non-list literal {type(parsed)}. Returning as is.")
                 return parsed # Return dicts, etc., but evaluator might not handle
             elif cleaned_response.lower() in ['true', 'false', 'none']:
-                return ast.literal_eval(cleaned_response.lower().capitalize())
+                return fast_literal_eval(cleaned_response.lower().capitalize())
             # Stricter number check
             elif (cleaned_response.startswith('-') and cleaned_response[1:].replace('.', '', 1).isdigit()) or \
                  (cleaned_response.replace('.', '', 1).isdigit()):
@@ -293,55 +1832,563 @@ class AsyncLLMClient:
             Any: The parsed response from the LLM, or None if the API call
                  fails or returns an empty/malformed response.
         """
+        return (await self.complete(task_data)).response
+
+    async def complete(self, task_data: Dict[str, Any],
+                       slot: Optional[Callable[[], contextlib.AbstractAsyncContextManager]] = None,
+                       pack: bool = True) -> Completion:
+        """
+        Requests a completion, retrying transient failures according to retry_policy.
+
+        Args:
+            task_data (Dict[str, Any]): The structured task dictionary.
+            slot: Optional factory of async context managers (e.g.
+                  AdaptiveConcurrencyLimiter.slot), entered once per attempt and held
+                  only while the request is in flight. It is released during backoff so
+                  other requests can use it.
+            pack (bool): Allow sending the task in a packed request when pack_size > 1.
+
+        Returns:
+            Completion: The parsed response and attempt count. `error` is set (and
+                        `response` is None) if the request failed permanently or ran
+                        out of attempts.
+        """
         task_id = str(task_data.get('id', 'N/A'))
         logging.debug(f"Task {task_id}: Requesting completion from {self.model_name}")
 
         messages = self._format_prompt(task_data)
+        max_tokens, temperature = self._generation_params(task_data)
+        cache_key = None
+        if self.response_cache:
+            cache_key = ResponseCache.make_key(self.model_name, self.base_url, messages, temperature, max_tokens)
+            # Streaming may also use an answer stored from an early-stopped stream
+            fallback = ResponseCache.early_stop_key(cache_key) if self.stream_completions else None
+            if (raw_response := self.response_cache.get(cache_key, fallback)) is not None:
+                logging.debug(f"Task {task_id} (Model {self.model_name}): Response cache hit.")
+                return Completion(self._parse_answer(raw_response, task_data.get('answer'), task_id), 0, cached=True,
+                                  max_tokens=max_tokens, temperature=temperature)
+        if pack and self.pack_size > 1 and self._closed_answer_budget(task_data) is not None:
+            return await self._enqueue_for_pack(task_data, (str(task_data.get('text') or ''), temperature), slot)
+
+        completion, raw_response = await self._send(messages, max_tokens, temperature, f"Task {task_id}", slot,
+                                                    expected=task_data.get('answer'), stream=self.stream_completions,
+                                                    cache_key=cache_key)
+        if raw_response:
+            completion.response = self._parse_answer(raw_response, task_data.get('answer'), task_id)
+            logging.debug(f"Task {task_id} (Model {self.model_name}): Parsed response: {completion.response} (Type: {type(completion.response)})")
+        return completion
+
+    async def _send(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float, label: str,
+                    slot: Optional[Callable[[], contextlib.AbstractAsyncContextManager]] = None, expected: Any = None,
+                    stream: bool = False, cache_key: Optional[str] = None, hedge: bool = True) -> Tuple[Completion, Optional[str]]:
+        """
+        Sends one request with retries (and hedging, if enabled and `hedge` is set).
+        Returns the Completion (without a parsed response) and the raw response text,
+        which is also stored under cache_key.
+        """
+        slot = slot or contextlib.nullcontext
+        policy = self.retry_policy
+        charged_tokens = self._estimate_prompt_tokens(messages) + max_tokens if self.rate_limiter else 0
+
+        attempt = 0
+        while attempt < policy.max_attempts:
+            attempt += 1
+            try:
+                # An open circuit holds the request here, before it takes budget or a concurrency slot
+                async with (self.circuit_breaker.guard() if self.circuit_breaker else contextlib.nullcontext()):
+                    if self.rate_limiter:
+                        # Waiting for budget happens before taking a concurrency slot
+                        await self.rate_limiter.acquire(charged_tokens)
+                    async with slot():
+                        started = time.monotonic()
+                        if stream:
+                            request = lambda: self._request_streaming(messages, max_tokens, temperature, expected, started)
+                        else:
+                            request = lambda: self._request(messages, max_tokens, temperature, label)
+                        if self.request_timeout:
+                            request = self._with_deadline(request)
+                        if hedge:
+                            (raw_response, usage, ttfb, early_stop), hedged = await self._request_hedged(request, charged_tokens)
+                        else:
+                            (raw_response, usage, ttfb, early_stop), hedged = await request(), None
+                        latency = time.monotonic() - started
+            except Exception as e:
+                if self.rate_limiter and isinstance(e, APIStatusError):
+                    # Rejected requests do not consume tokens (the request itself still counts)
+                    self.rate_limiter.settle(charged_tokens, 0)
+                error = self._describe_error(e)
+                if self.circuit_breaker and self.circuit_breaker.state != CircuitBreaker.CLOSED and policy.is_transient(e):
+                    # The provider looks down: defer until the circuit lets requests through, without using up an attempt
+                    logging.debug(f"{label} (Model {self.model_name}): {error}. Deferred while the circuit is {self.circuit_breaker.state}.")
+                    attempt -= 1
+                    continue
+                if not policy.is_transient(e):
+                    logging.error(f"{label} (Model {self.model_name}): Permanent error, not retrying. {error}")
+                    return Completion(None, attempt, error, max_tokens=max_tokens, temperature=temperature), None
+                if attempt == policy.max_attempts:
+                    logging.error(f"{label} (Model {self.model_name}): Giving up after {attempt} attempts. {error}")
+                    return Completion(None, attempt, error, max_tokens=max_tokens, temperature=temperature), None
+                delay = policy.delay_for(attempt, e)
+                logging.warning(f"{label} (Model {self.model_name}): {error}. Retrying in {delay:.1f}s (attempt {attempt}/{policy.max_attempts}).")
+                await asyncio.sleep(delay)
+                continue
+
+            if self.rate_limiter:
+                # An early-stopped stream reports no usage; its up-front charge stands
+                self.rate_limiter.settle(charged_tokens, usage.total_tokens if usage else charged_tokens)
+            cached_tokens = self._cached_tokens(usage)
+            if usage:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.cached_prompt_tokens += cached_tokens or 0
+            if raw_response:
+                logging.debug(f"{label} (Model {self.model_name}): Raw response: '{raw_response}'")
+                if cache_key:
+                    # A cut-short answer is only valid for streaming lookups, never for full responses
+                    self.response_cache.put(ResponseCache.early_stop_key(cache_key) if early_stop else cache_key,
+                                            raw_response, latency)
+            return Completion(None, attempt, latency=latency, ttfb=ttfb, early_stop=early_stop,
+                              max_tokens=max_tokens, temperature=temperature,
+                              tokens=usage.total_tokens if usage else None, cached_tokens=cached_tokens,
+                              hedged=hedged), raw_response
+
+    def _with_deadline(self, request: Callable[[], Any]) -> Callable[[], Any]:
+        """Wraps a request factory so each call is cancelled after request_timeout (raising asyncio.TimeoutError)."""
+        timeout = self.request_timeout
+        return lambda: asyncio.wait_for(request(), timeout)
+
+    def cancel_pending(self):
+        """Cancels queued and in-flight packed requests, e.g. when a run's time budget runs out."""
+        for entries in self._open_packs.values():
+            for _, future, _ in entries:
+                future.cancel()
+        self._open_packs.clear()
+        for send in list(self._pack_sends):
+            send.cancel()
+
+    # --- Request hedging ---
+    HEDGE_WINDOW = 500 # Recent request latencies the hedge threshold is computed from
+    HEDGE_MIN_SAMPLES = 20 # No hedging until this many latencies have been seen
+
+    def _hedge_threshold(self) -> Optional[float]:
+        """Seconds after which a request gets hedged, or None if hedging is off or over budget."""
+        if self.hedge_percentile is None or len(self._recent_latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        if self.hedge_stats['hedged'] >= self.hedge_budget * self.hedge_stats['requests']:
+            return None
+        return percentile(list(self._recent_latencies), self.hedge_percentile)
+
+    async def _request_hedged(self, request: Callable[[], Any], charged_tokens: int) -> Tuple[Any, Optional[str]]:
+        """
+        Runs request() and, if it outlasts the hedge threshold, a duplicate of it.
 
+        Returns the first successful result and which request produced it: None if no
+        duplicate was sent, else 'primary' or 'hedge'. The other request is cancelled.
+        If both fail, the primary's error is raised.
+        """
+        async def timed():
+            started = time.monotonic()
+            result = await request()
+            self._recent_latencies.append(time.monotonic() - started)
+            return result
+
+        if self.hedge_percentile is None:
+            return await request(), None
+        self.hedge_stats['requests'] += 1
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return await timed(), None
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(timed())
+        hedge = None
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=250, # Adjust as needed
-            )
-            if response.choices and response.choices[0].message and response.choices[0].message.content:
-                raw_response = response.choices[0].message.content
-                logging.debug(f"Task {task_id} (Model {self.model_name}): Raw response: '{raw_response}'")
-                parsed_response = self._parse_llm_response(raw_response, task_id)
-                logging.debug(f"Task {task_id} (Model {self.model_name}): Parsed response: {parsed_response} (Type: {type(parsed_response)})")
-                return parsed_response
-            else:
-                logging.warning(f"Task {task_id} (Model {self.model_name}): LLM API returned empty/malformed choices. Response: {response}")
-                return None
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done:
+                return primary.result(), None
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(charged_tokens)
+                if primary.done(): # Answered while waiting for budget; the duplicate is not needed
+                    self.rate_limiter.settle(charged_tokens, 0)
+                    return primary.result(), None
+            self.hedge_stats['hedged'] += 1
+            hedge = asyncio.ensure_future(timed())
+            pending = {primary, hedge}
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None and winner is None:
+                        winner = finished
+            if winner is None:
+                return primary.result(), None # Both failed; raises the primary's error
+            if winner is hedge:
+                # The primary's latency is only known to exceed `elapsed`; estimate it from recent latencies that did
+                elapsed = time.monotonic() - started
+                slower = [latency for latency in self._recent_latencies if latency > elapsed]
+                if slower:
+                    self.hedge_stats['saved_seconds'] += sum(slower) / len(slower) - elapsed
+                self.hedge_stats['won'] += 1
+                return hedge.result(), 'hedge'
+            return primary.result(), 'primary'
+        finally:
+            for request_future in (primary, hedge):
+                if request_future is not None and not request_future.done():
+                    request_future.cancel()
+
+    # --- Multi-question packing ---
+    PACK_BASE_MAX_TOKENS = 8
+    PACK_MAX_TOKENS_PER_ANSWER = 6 # JSON key, quotes and separators around each answer
+
+    async def _enqueue_for_pack(self, task_data: Dict[str, Any], pack_key: Tuple[str, float],
+                                slot: Optional[Callable[[], contextlib.AbstractAsyncContextManager]]) -> Completion:
+        """
+        Queues a task for a packed request with other tasks of the same context and
+        temperature. A pack is sent once it holds pack_size tasks, or pack_linger
+        seconds after its first task arrived.
+        """
+        future = asyncio.get_running_loop().create_future()
+        entries = self._open_packs.setdefault(pack_key, [])
+        entries.append((task_data, future, slot))
+        if len(entries) >= self.pack_size:
+            self._flush_pack(pack_key, entries)
+        elif len(entries) == 1:
+            asyncio.get_running_loop().call_later(self.pack_linger, self._flush_pack, pack_key, entries)
+        return await future
+
+    def _flush_pack(self, pack_key: Tuple[str, float], entries: List[Tuple[Dict[str, Any], asyncio.Future, Any]]):
+        """Sends an open pack unless it was already sent (timer and size trigger both call this)."""
+        if self._open_packs.get(pack_key) is not entries:
+            return
+        del self._open_packs[pack_key]
+        send = asyncio.ensure_future(self._send_pack(entries))
+        self._pack_sends.add(send) # Keep a reference until it finishes
+        send.add_done_callback(self._pack_sends.discard)
+
+    async def _send_pack(self, entries: List[Tuple[Dict[str, Any], asyncio.Future, Any]]):
+        """Sends a packed request and resolves each task's future with its own Completion."""
+        def resolve(future: asyncio.Future, completion: Completion):
+            if not future.done(): # The waiting request may have been cancelled
+                future.set_result(completion)
+
+        async def send_alone(task_data: Dict[str, Any], future: asyncio.Future, slot: Any):
+            try:
+                resolve(future, await self.complete(task_data, slot, pack=False))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+        if len(entries) == 1:
+            await send_alone(*entries[0])
+            return
+        tasks = [task_data for task_data, _, _ in entries]
+        label = f"Pack of {len(tasks)} from task {tasks[0].get('id', 'N/A')}"
+        messages = self._compile_pack_prompt(tasks)
+        max_tokens = self.PACK_BASE_MAX_TOKENS + sum(self._closed_answer_budget(task_data) + self.PACK_MAX_TOKENS_PER_ANSWER
+                                                     for task_data in tasks)
+        _, temperature = self._generation_params(tasks[0])
+        try:
+            # Packs take longer than single requests, so they would skew the hedge threshold
+            completion, raw_response = await self._send(messages, max_tokens, temperature, label, entries[0][2], hedge=False)
+            answers = self._split_packed_response(raw_response, len(tasks)) if raw_response else {}
+        except Exception as e:
+            logging.error(f"{label} (Model {self.model_name}): Unexpected error: {type(e).__name__} - {e}")
+            completion, answers = None, {}
+        if completion is not None and completion.error is None and len(answers) < len(tasks):
+            logging.warning(f"{label} (Model {self.model_name}): {len(tasks) - len(answers)} answers missing or "
+                            f"unparseable; re-sending those tasks individually.")
+
+        resend = []
+        for number, (task_data, future, slot) in enumerate(entries, start=1):
+            if number not in answers:
+                resend.append(send_alone(task_data, future, slot))
+                continue
+            answer = answers[number]
+            if isinstance(answer, str):
+                answer = self._parse_answer(answer, task_data.get('answer'), str(task_data.get('id', 'N/A')))
+            # Token usage is split evenly across the tasks in the pack
+            resolve(future, Completion(answer, completion.attempts, latency=completion.latency,
+                                       max_tokens=max_tokens, temperature=temperature,
+                                       tokens=completion.tokens // len(tasks) if completion.tokens is not None else None,
+                                       cached_tokens=completion.cached_tokens // len(tasks) if completion.cached_tokens is not None else None,
+                                       packed=len(tasks)))
+        if resend:
+            await asyncio.gather(*resend)
+
+    def _compile_pack_prompt(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Chat messages asking for the answers to several numbered questions as one JSON object."""
+        parts = []
+        if text := tasks[0].get('text'):
+            if str(text).strip(): parts.append("--- Context ---\n" + str(text) + "\n")
+        parts.append(f"Answer each of the {len(tasks)} numbered questions below. Reply with only a JSON object "
+                     f"that maps each question number to its answer in the format that question requests, "
+                     f'e.g. {{"1": "A", "2": ["A", "C"], "3": true, "4": 42}}.')
+        for number, task_data in enumerate(tasks, start=1):
+            parts.append(f"\n--- Question {number} ---")
+            if inst := task_data.get('instruction'): parts.append(f"Instruction: {inst}")
+            if question := task_data.get('question'): parts.append(str(question))
+            options = task_data.get('options')
+            if options and isinstance(options, dict):
+                parts.append("Options:\n" + self._format_options(options))
+        parts.append("\n--- Answers (JSON) ---")
+        return [{"role": "system", "content": self.SYSTEM_MESSAGE}, {"role": "user", "content": "\n".join(parts)}]
+
+    @staticmethod
+    def _split_packed_response(response_text: str, count: int) -> Dict[int, Any]:
+        """
+        Extracts {question number: answer} from a packed response. Numbers outside
+        1..count and empty answers are dropped; an unparseable response yields {}.
+        """
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            try:
+                data = ast.literal_eval(match.group(0))
+            except (ValueError, SyntaxError, TypeError, MemoryError):
+                return {}
+        if not isinstance(data, dict):
+            return {}
+        answers = {}
+        for key, value in data.items():
+            try:
+                number = int(str(key).strip().lstrip('Qq#').rstrip('.:'))
+            except ValueError:
+                continue
+            if 1 <= number <= count and value is not None and value != '':
+                answers[number] = value
+        return answers
+
+    async def _request(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                       label: str) -> Tuple[Optional[str], Any, None, bool]:
+        """One non-streaming call. Returns (response text, usage, ttfb=None, early_stop=False)."""
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        if response.choices and response.choices[0].message and response.choices[0].message.content:
+            return response.choices[0].message.content, getattr(response, 'usage', None), None, False
+        logging.warning(f"{label} (Model {self.model_name}): LLM API returned empty/malformed choices. Response: {response}")
+        return None, getattr(response, 'usage', None), None, False
 
-        except RateLimitError as e:
-            logging.error(f"Task {task_id} (Model {self.model_name}): Rate limit error. {e}. Consider adding delays or backoff.")
-            # TODO: Implement retry/backoff logic here if needed
-            await asyncio.sleep(5) # Simple delay as placeholder
-            return None # Indicate failure after potential delay/retry
-        except APIError as e:
-            logging.error(f"Task {task_id} (Model {self.model_name}): API Error (Status: {e.status_code}, Type: {e.type}): {e.message}")
-            return None
+    async def _request_streaming(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                                 expected: Any, started: float) -> Tuple[Optional[str], Any, Optional[float], bool]:
+        """
+        One streaming call, closed early once the answer is complete.
+
+        Returns (response text, usage, ttfb, early_stop). On an early stop the text is
+        just the detected answer, so text after it (e.g. an explanation) is never read.
+        """
+        stream = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}, # Usage arrives in a final chunk without choices
+        )
+        parser = IncrementalAnswerParser(expected, self._parse_llm_response)
+        ttfb = usage = None
+        try:
+            async for chunk in stream:
+                if ttfb is None:
+                    ttfb = time.monotonic() - started
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    if parser.feed(chunk.choices[0].delta.content):
+                        return parser.answer_text, usage, ttfb, True
+        finally:
+            await stream.close() # Stops generation server-side when exiting early
+        if not parser.text:
+            logging.warning(f"Model {self.model_name}: Streamed response contained no content.")
+        return parser.text or None, usage, ttfb, False
+
+    # --- Batch API ---
+    BATCH_ENDPOINT = "/v1/chat/completions"
+    BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+    async def complete_batch(self, tasks: Sequence[Dict[str, Any]], poll_interval: float = 30.0,
+                             max_requests: int = 50000, completion_window: str = "24h") -> List[Completion]:
+        """
+        Requests completions for many tasks through the Batch API instead of one call each.
+
+        The requests are written as JSONL, uploaded via /v1/files and submitted via
+        /v1/batches (one batch per max_requests tasks, submitted together). Batches are
+        polled every poll_interval seconds until they finish, then their output is
+        parsed like a normal response. Response cache hits are answered locally and
+        not submitted.
+
+        Returns:
+            List[Completion]: One per task, in order. `error` is set for requests the
+                              batch did not answer successfully.
+        """
+        completions: List[Optional[Completion]] = [None] * len(tasks)
+        requests = [] # (index, request line, cache key, max_tokens, temperature)
+        for index, task_data in enumerate(tasks):
+            messages = self._format_prompt(task_data)
+            max_tokens, temperature = self._generation_params(task_data)
+            cache_key = None
+            if self.response_cache:
+                cache_key = ResponseCache.make_key(self.model_name, self.base_url, messages, temperature, max_tokens)
+                if (raw_response := self.response_cache.get(cache_key)) is not None:
+                    completions[index] = Completion(self._parse_answer(raw_response, task_data.get('answer'), str(task_data.get('id', 'N/A'))), 0,
+                                                    cached=True, max_tokens=max_tokens, temperature=temperature)
+                    continue
+            line = {"custom_id": f"task-{index}", "method": "POST", "url": self.BATCH_ENDPOINT,
+                    "body": {"model": self.model_name, "messages": messages,
+                             "temperature": temperature, "max_tokens": max_tokens}}
+            requests.append((index, line, cache_key, max_tokens, temperature))
+
+        max_requests = max(1, max_requests)
+        chunks = [requests[start:start + max_requests] for start in range(0, len(requests), max_requests)]
+        await asyncio.gather(*(self._run_batch(chunk, tasks, completions, poll_interval, completion_window)
+                               for chunk in chunks))
+        return completions
+
+    async def _run_batch(self, chunk: List[Tuple[int, Dict[str, Any], Optional[str], int, float]],
+                         tasks: Sequence[Dict[str, Any]], completions: List[Optional[Completion]],
+                         poll_interval: float, completion_window: str):
+        """Submits one batch, waits for it and fills `completions` for its requests."""
+        payload = "".join(json.dumps(line, ensure_ascii=False) + "\n" for _, line, _, _, _ in chunk).encode('utf-8')
+        batch = None
+        try:
+            input_file = await self.client.files.create(file=(f"lmeval-{self.model_name}.jsonl", payload), purpose="batch")
+            batch = await self.client.batches.create(input_file_id=input_file.id, endpoint=self.BATCH_ENDPOINT,
+                                                     completion_window=completion_window)
+            logging.info(f"Model {self.model_name}: Submitted batch {batch.id} with {len(chunk)} requests.")
+            batch = await self._wait_for_batch(batch, poll_interval)
+            records: Dict[str, Dict[str, Any]] = {}
+            # Successful requests are in the output file, failed ones in the error file
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    content = await self.client.files.content(file_id)
+                    for raw_line in content.text.splitlines():
+                        if raw_line.strip():
+                            record = json.loads(raw_line)
+                            records[record.get('custom_id')] = record
+        except asyncio.CancelledError:
+            if batch is not None and batch.status not in self.BATCH_FINAL_STATUSES:
+                # The run was cut off; stop the batch server-side instead of leaving it to run (and bill)
+                try:
+                    await self.client.batches.cancel(batch.id)
+                    logging.warning(f"Model {self.model_name}: Cancelled batch {batch.id}.")
+                except Exception as e:
+                    logging.warning(f"Model {self.model_name}: Could not cancel batch {batch.id}. {self._describe_error(e)}")
+            raise
         except Exception as e:
-            logging.error(f"Task {task_id} (Model {self.model_name}): Unexpected error during API call: {type(e).__name__} - {e}")
-            return None
+            error = self._describe_error(e)
+            logging.error(f"Model {self.model_name}: Batch of {len(chunk)} requests failed. {error}")
+            for index, _, _, max_tokens, temperature in chunk:
+                completions[index] = Completion(None, 1, error, max_tokens=max_tokens, temperature=temperature)
+            return
+
+        if batch.status != 'completed':
+            logging.warning(f"Model {self.model_name}: Batch {batch.id} ended with status '{batch.status}'; "
+                            f"requests without output are left for the next run.")
+        for index, line, cache_key, max_tokens, temperature in chunk:
+            task_id = str(tasks[index].get('id', 'N/A'))
+            record = records.get(line['custom_id'])
+            response = (record or {}).get('response') or {}
+            if not record or record.get('error') or response.get('status_code') != 200:
+                error_info = (record or {}).get('error') or (response.get('body') or {}).get('error') or {}
+                error = (f"Batch request failed ({response.get('status_code', 'no response')}): "
+                         f"{error_info.get('message', f'batch {batch.status}')}")
+                logging.error(f"Task {task_id} (Model {self.model_name}): {error}")
+                completions[index] = Completion(None, 1, error, max_tokens=max_tokens, temperature=temperature)
+                continue
+            completion = ChatCompletion.model_validate(response['body'])
+            usage = completion.usage
+            cached_tokens = self._cached_tokens(usage)
+            if usage:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.cached_prompt_tokens += cached_tokens or 0
+            raw_response = (completion.choices[0].message.content
+                            if completion.choices and completion.choices[0].message else None)
+            parsed_response = None
+            if raw_response:
+                if cache_key:
+                    self.response_cache.put(cache_key, raw_response, 0.0)
+                parsed_response = self._parse_answer(raw_response, tasks[index].get('answer'), task_id)
+            else:
+                logging.warning(f"Task {task_id} (Model {self.model_name}): Batch output has empty/malformed choices.")
+            completions[index] = Completion(parsed_response, 1, max_tokens=max_tokens, temperature=temperature,
+                                            tokens=usage.total_tokens if usage else None, cached_tokens=cached_tokens)
+
+    async def _wait_for_batch(self, batch: Any, poll_interval: float) -> Any:
+        """Polls a batch until it reaches a final status; transient polling errors are retried."""
+        status, failures = None, 0
+        while batch.status not in self.BATCH_FINAL_STATUSES:
+            if batch.status != status:
+                status = batch.status
+                counts = batch.request_counts
+                progress = f" ({counts.completed + counts.failed}/{counts.total} done)" if counts else ""
+                logging.info(f"Model {self.model_name}: Batch {batch.id} is {status}{progress}.")
+            await asyncio.sleep(poll_interval)
+            try:
+                batch = await self.client.batches.retrieve(batch.id)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if not self.retry_policy.is_transient(e) or failures >= self.retry_policy.max_attempts:
+                    raise
+                logging.warning(f"Model {self.model_name}: Polling batch {batch.id} failed, will retry. {self._describe_error(e)}")
+        return batch
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """One-line description of an API call failure for logs and results."""
+        if isinstance(error, RateLimitError):
+            return f"Rate limit error: {error.message}"
+        if isinstance(error, APIStatusError):
+            return f"API Error (Status: {error.status_code}, Type: {error.type}): {error.message}"
+        if isinstance(error, APIError):
+            return f"{type(error).__name__}: {error.message}"
+        if isinstance(error, asyncio.TimeoutError):
+            return "Request timed out (request_timeout exceeded)"
+        if isinstance(error, CircuitOpenError):
+            return f"Provider unavailable: {error}"
+        return f"Unexpected error during API call: {type(error).__name__} - {error}"
 
 # --- 3.5 LLM Provider Management ---
 
 class LLMProvider:
     """Encapsulates information and the client for a specific LLM provider and model."""
-    def __init__(self, provider_name: str, model_name: str, api_key: str, base_url: Optional[str] = None):
-        self.provider_name = provider_name
-        self.model_name = model_name
+    def __init__(self, provider_name: str, model_name: str, api_key: str, base_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 rpm: Optional[float] = None, tpm: Optional[float] = None, # Contracted requests/tokens per minute
+                 response_cache: Optional[ResponseCache] = None, # May be shared by several providers
+                 stream_completions: bool = False, # Stream and stop once the answer is complete
+                 generation_budgets: bool = True, # Size max_tokens/temperature by answer type
+                 pack_size: int = 1, # Tasks per request for closed-answer tasks (1 = no packing)
+                 hedge_percentile: Optional[float] = None, # Hedge requests slower than this latency percentile
+                 hedge_budget: float = 0.05, # Maximum fraction of requests hedged
+                 circuit_breaker: Union[CircuitBreaker, bool] = True, # True: default breaker, False: none
+                 request_timeout: Optional[float] = 120.0): # Deadline per API call in seconds
+        # Interned so every result for this provider shares the same string objects
+        self.provider_name = sys.intern(provider_name)
+        self.model_name = sys.intern(model_name)
         self.api_key = api_key
         self.base_url = base_url
+        self.identifier = sys.intern(f"{self.provider_name}__{self.model_name}")
+        self.rate_limiter = RateLimiter(rpm, tpm) if (rpm or tpm) else None
+        if circuit_breaker is True:
+            circuit_breaker = CircuitBreaker(self.identifier)
+        self.circuit_breaker = circuit_breaker or None
         # Instantiate the async client specific to this provider config
-        self.client = AsyncLLMClient(model_name=model_name, api_key=api_key, base_url=base_url)
+        self.client = AsyncLLMClient(model_name=model_name, api_key=api_key, base_url=base_url,
+                                     retry_policy=retry_policy, rate_limiter=self.rate_limiter,
+                                     response_cache=response_cache, stream_completions=stream_completions,
+                                     generation_budgets=generation_budgets, pack_size=pack_size,
+                                     hedge_percentile=hedge_percentile, hedge_budget=hedge_budget,
+                                     circuit_breaker=self.circuit_breaker, request_timeout=request_timeout)
 
     def get_identifier(self) -> str:
         """Returns a unique string identifier for this provider/model config."""
-        return f"{self.provider_name}__{self.model_name}"
+        return self.identifier
 
 # --- 4. Evaluation ---
 
@@ -425,19 +2472,347 @@ class Evaluator:
             logging.debug(f"{log_prefix}: String comparison: '{llm_response_str}' == '{ground_truth_str}' -> {is_correct}")
             return is_correct
 
+class TaskResult:
+    """
+    The outcome of one task evaluated by one provider.
+
+    Slotted, and refers to its Task instead of copying instruction, question and
+    ground truth; provider identifiers are interned strings shared by all results of
+    that provider. Request metrics are slots too, left unset when a result has none
+    (e.g. loaded from an older file), so no per-result dict exists until to_dict()
+    rebuilds the JSON result shape.
+    """
+    # Extra per-result fields, written after the standard ones in this order
+    METRIC_FIELDS = ('attempts', 'retries', 'cached', 'latency', 'ttfb', 'early_stop', 'max_tokens',
+                     'temperature', 'tokens', 'cached_tokens', 'packed', 'hedged')
+    __slots__ = ('task', 'provider_identifier', 'provider_name', 'model_name',
+                 'llm_response', 'is_correct', 'extra') + METRIC_FIELDS
+    # Keys of the JSON result shape that map onto slots (or the task) rather than metrics
+    STANDARD_KEYS = ('task_id', 'provider_identifier', 'provider_name', 'model_name', 'llm_response',
+                     'ground_truth', 'is_correct', 'task_instruction', 'task_question')
+
+    def __init__(self, task: Task, provider_identifier: str, provider_name: str, model_name: str,
+                 llm_response: Any, is_correct: Optional[bool], **metrics: Any):
+        self.task = task
+        self.provider_identifier = sys.intern(provider_identifier)
+        self.provider_name = sys.intern(provider_name) if isinstance(provider_name, str) else provider_name
+        self.model_name = sys.intern(model_name) if isinstance(model_name, str) else model_name
+        self.llm_response = llm_response
+        self.is_correct = is_correct
+        self.extra = None # Unknown fields of a loaded result, kept so rewriting the file preserves them
+        for key, value in metrics.items():
+            if key in self.METRIC_FIELDS:
+                setattr(self, key, value)
+            else:
+                self.extra = self.extra or {}
+                self.extra[key] = value
+
+    def metric(self, name: str) -> Any:
+        """A metric's value, or None if this result does not have it."""
+        return getattr(self, name, None)
+
+    @property
+    def task_id(self) -> str:
+        return str(self.task.id)
+
+    @property
+    def ground_truth(self) -> Any:
+        return self.task.answer
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the result in the JSON output format."""
+        result = {
+            "task_id": self.task_id,
+            "provider_identifier": self.provider_identifier, # Store combined ID
+            "provider_name": self.provider_name,
+            "model_name": self.model_name,
+            "llm_response": self.llm_response,
+            "ground_truth": self.task.answer,
+            "is_correct": self.is_correct,
+            "task_instruction": self.task.instruction, # Include key parts of task for context
+            "task_question": self.task.question,
+        }
+        for key in self.METRIC_FIELDS:
+            value = getattr(self, key, result) # The dict itself marks an unset slot
+            if value is not result:
+                result[key] = value
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    @classmethod
+    def from_dict(cls, result: Dict[str, Any], task: Optional[Task] = None) -> 'TaskResult':
+        """
+        Rebuilds a result loaded from a results file.
+
+        Args:
+            result (Dict[str, Any]): One object from the results JSON.
+            task (Optional[Task]): The matching dataset task. It is shared only if its
+                                   instruction, question and answer match the stored
+                                   ones; otherwise a minimal Task is built from the result.
+        """
+        if task is None or (task.instruction, task.question, task.answer) != \
+                (result.get('task_instruction'), result.get('task_question'), result.get('ground_truth')):
+            task = Task(id=str(result.get('task_id')), instruction=result.get('task_instruction'),
+                        question=result.get('task_question'), answer=result.get('ground_truth'))
+        metrics = {key: value for key, value in result.items() if key not in cls.STANDARD_KEYS}
+        return cls(task, str(result.get('provider_identifier')), result.get('provider_name'),
+                   result.get('model_name'), result.get('llm_response'), result.get('is_correct'),
+                   **metrics)
+
 # --- 5. Orchestration ---
 
+class ResultLog:
+    """
+    Append-only JSON Lines log of results, kept next to the results JSON file.
+
+    Results are appended one line each as they complete and fsync'ed in batches
+    (flush), so a checkpoint only writes the new results instead of the whole file.
+    After a crash the log is replayed on top of the JSON file; a torn last line from
+    an interrupted write is cut off. EvaluationRunner._save_results_to_json compacts
+    the results into the JSON array and then clears the log.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self.unflushed = 0 # Records appended since the last fsync
+
+    @staticmethod
+    def path_for(json_path: str) -> str:
+        """Log path for a results file: results.json -> results.jsonl."""
+        base, ext = os.path.splitext(json_path)
+        return (base if ext.lower() == '.json' else json_path) + '.jsonl'
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self, truncate: bool = True) -> List[Dict[str, Any]]:
+        """
+        Returns the logged records, oldest first.
+
+        An incomplete last line (no trailing newline, i.e. a write cut short by a crash)
+        is dropped and truncated from the file, so new records append after the last
+        complete one. Complete lines that do not parse are skipped with a warning.
+
+        Args:
+            truncate (bool): Set to False to only read, e.g. a log another process may
+                still be appending to; its incomplete last line is then skipped but left
+                in place.
+        """
+        records = []
+        if not self.exists():
+            return records
+        good_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                good_size += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Skipping unreadable line in result log {self.path}: {line[:80]!r}")
+            size = f.seek(0, os.SEEK_END)
+        if good_size < size and truncate:
+            logging.warning(f"Dropping {size - good_size} bytes of an incomplete last record from {self.path}.")
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_size)
+        elif good_size < size:
+            logging.info(f"Skipping {size - good_size} bytes of an incomplete last record in {self.path}.")
+        return records
+
+    def append(self, record: Dict[str, Any]):
+        """Appends one record; it is durable after the next flush()."""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.unflushed += 1
+
+    def flush(self):
+        """Writes buffered records through to disk (one fsync for the whole batch)."""
+        if self._file is None or not self.unflushed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.unflushed = 0
+
+    def clear(self):
+        """Closes and removes the log, once its records are safely in the JSON file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.unflushed = 0
+        if self.exists():
+            os.remove(self.path)
+
+
+class ResultStore:
+    """
+    Results in a SQLite file (WAL mode), an alternative to the JSON results file for large runs.
+
+    One row per (task_id, provider_identifier), enforced by a unique index, holding
+    the result's JSON plus is_correct for aggregation. Resuming loads no rows:
+    `key in store` is one indexed lookup. add() buffers results and flush() inserts
+    them in a single transaction; accuracy is computed with a GROUP BY.
+
+    flush() may run on another thread than add() and lookups: it writes through its
+    own connection, and WAL lets the lookup connection read while it does.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Written from the result writer thread, read from the client loop and the caller's thread
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY, task_id TEXT NOT NULL, "
+                           "provider_identifier TEXT NOT NULL, is_correct INTEGER, data TEXT NOT NULL)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS results_key ON results (task_id, provider_identifier)")
+        self._conn.commit()
+        self._read_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._lock = threading.Lock() # Guards the two buffers below
+        self._pending: Dict[Tuple[str, str], TaskResult] = {} # Added, not yet handed to flush()
+        self._writing: Dict[Tuple[str, str], TaskResult] = {} # Being inserted by flush()
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        """True if a result for (task_id, provider_identifier) is stored or about to be."""
+        with self._lock:
+            if key in self._pending or key in self._writing:
+                return True
+        with self._read_lock:
+            return self._read_conn.execute("SELECT 1 FROM results WHERE task_id = ? AND provider_identifier = ?",
+                                           key).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._read_lock:
+            stored = self._read_conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        with self._lock:
+            return stored + len(self._pending) + len(self._writing)
+
+    def add(self, result: TaskResult):
+        """Buffers a result; it is written by the next flush()."""
+        with self._lock:
+            self._pending[(result.task_id, result.provider_identifier)] = result
+
+    def flush(self):
+        """Inserts the buffered results in one transaction. Keys already stored are kept as they are."""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._writing, self._pending = self._pending, {}
+            rows = [(result.task_id, result.provider_identifier,
+                     None if result.is_correct is None else int(result.is_correct),
+                     json.dumps(result.to_dict(), ensure_ascii=False))
+                    for result in self._writing.values()]
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO results (task_id, provider_identifier, is_correct, data) "
+                                       "VALUES (?, ?, ?, ?)", rows)
+                self._conn.commit()
+            except sqlite3.Error:
+                with self._lock: # Keep the batch for the next flush
+                    self._pending = {**self._writing, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._writing = {}
+
+    def accuracy_counts(self, provider_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """{'correct', 'evaluated'} counts per provider identifier, aggregated by SQLite."""
+        provider_stats = {provider_id: {'correct': 0, 'evaluated': 0} for provider_id in provider_ids}
+        with self._read_lock:
+            rows = self._read_conn.execute("SELECT provider_identifier, COALESCE(SUM(is_correct), 0), COUNT(is_correct) "
+                                           "FROM results GROUP BY provider_identifier").fetchall()
+        for provider_id, correct, evaluated in rows:
+            if provider_id in provider_stats:
+                provider_stats[provider_id] = {'correct': correct, 'evaluated': evaluated}
+        return provider_stats
+
+    def iter_results(self, tasks_by_id: Optional[Dict[str, Task]] = None) -> Iterator[TaskResult]:
+        """Yields the stored results in insertion order."""
+        tasks_by_id = tasks_by_id or {}
+        with self._read_lock:
+            rows = self._read_conn.execute("SELECT task_id, data FROM results ORDER BY id").fetchall()
+        for task_id, data in rows:
+            yield TaskResult.from_dict(json.loads(data), tasks_by_id.get(task_id))
+
+    def close(self):
+        for conn in (self._conn, self._read_conn):
+            conn.close()
+
+
+class ResultWriter:
+    """
+    Runs result writes (serialization, file I/O, fsync) on a dedicated thread, off the event loop.
+
+    Jobs run one at a time in submission order. At most `max_pending` may be queued
+    or running: wait_for_room() lets a coroutine wait, without blocking the loop, while
+    the writer is behind. drain() blocks until everything submitted has been written.
+    """
+    def __init__(self, max_pending: int = 4):
+        self.max_pending = max(1, max_pending)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='result-writer')
+        self._pending: Deque[concurrent.futures.Future] = collections.deque()
+        self.stalls = 0 # Times a coroutine had to wait for the writer
+
+    def submit(self, job: Callable[[], None]):
+        self._pending.append(self._executor.submit(self._run, job))
+
+    @staticmethod
+    def _run(job: Callable[[], None]):
+        try:
+            job()
+        except Exception as e:
+            logging.error(f"Error writing results: {type(e).__name__} - {e}")
+
+    def _discard_done(self):
+        while self._pending and self._pending[0].done():
+            self._pending.popleft()
+
+    async def wait_for_room(self):
+        """Waits until fewer than max_pending writes are outstanding (backpressure)."""
+        self._discard_done()
+        if len(self._pending) >= self.max_pending:
+            self.stalls += 1
+        while len(self._pending) >= self.max_pending:
+            await asyncio.wrap_future(self._pending[0])
+            self._discard_done()
+
+    def drain(self):
+        """Blocks until every submitted write has finished."""
+        concurrent.futures.wait(list(self._pending))
+        self._discard_done()
+
+
 class EvaluationRunner:
     """
     Orchestrates async evaluation using multiple LLM providers,
     with checkpointing and results persistence.
     """
+    LAG_SAMPLE_INTERVAL = 0.05 # Seconds between event-loop lag samples
+    LAG_WINDOW = 12000 # Lag samples kept for the percentiles (10 minutes at the interval above)
+    STREAM_BACKLOG_BATCHES = 10 # Streaming: read batches a provider may fall behind before reading pauses
     def __init__(self, data_loader: DataLoader, data_transformer: DataTransformer,
                  providers: List[LLMProvider], # Accepts list of providers
                  evaluator: Evaluator,
                  output_json_path: Optional[str] = None,
                  checkpoint_interval: int = 20, # Checkpoint frequency
-                 concurrency_limit: int = 10): # Max parallel requests
+                 concurrency_limit: int = 10, # Initial parallel requests per provider
+                 max_concurrency: Optional[int] = None, # Upper bound per provider (default 4x initial)
+                 streaming: bool = False, # Overlap file parsing with API dispatch
+                 stream_batch_size: int = 100, # Rows read per batch in streaming mode
+                 shard: Optional[Tuple[int, int]] = None, # (index, count): evaluate one shard only
+                 prewarm_connections: bool = True, # Open connections while the dataset loads
+                 batch_mode: bool = False, # Submit requests through the Batch API
+                 batch_poll_interval: float = 30.0, # Seconds between batch status checks
+                 batch_max_requests: int = 50000, # Requests per submitted batch
+                 time_budget: Optional[float] = None, # Wall-clock seconds for the whole run
+                 results_db: Optional[str] = None): # SQLite results store instead of the JSON file
         """
         Initializes the Async EvaluationRunner.
 
@@ -447,18 +2822,72 @@ class EvaluationRunner:
             providers: List of configured LLMProvider instances.
             evaluator: Instance of Evaluator.
             output_json_path (Optional[str]): Path to save the results JSON file.
-            checkpoint_interval (int): Save after every N completed results.
-            concurrency_limit (int): Max number of concurrent API calls.
+            checkpoint_interval (int): Make results durable after every N completed results.
+                              Results are appended to a JSON Lines log next to the output
+                              file (results.jsonl) and fsync'ed every N; the JSON file itself
+                              is rewritten once, at the end of the run.
+            concurrency_limit (int): Initial number of concurrent API calls per provider. Each
+                              provider's limit then adapts (AIMD): it grows while responses
+                              stay fast and halves on rate limits or timeouts.
+            max_concurrency (Optional[int]): Upper bound for each provider's limit. Defaults to
+                              4 x concurrency_limit; pass concurrency_limit to never exceed it.
+            streaming (bool): If True, tasks are read and transformed row by row while
+                              requests for earlier rows are already in flight, instead of
+                              loading the whole file up front.
+            stream_batch_size (int): Number of rows read per batch in streaming mode.
+            shard (Optional[Tuple[int, int]]): (index, count) to evaluate only the tasks whose
+                              id hashes to shard `index` of `count` (0-based). Hosts running
+                              the other shards of the same file cover the rest of the dataset.
+            prewarm_connections (bool): Open connections to every provider endpoint in the
+                              background at the start of run_evaluation, so the first
+                              requests do not pay for connection setup and TLS handshakes.
+            batch_mode (bool): Send all pending requests through each provider's Batch API
+                              (/v1/files + /v1/batches) instead of the chat endpoint, and
+                              wait for the batches to finish. The whole dataset is loaded
+                              first, so this cannot be combined with streaming.
+            batch_poll_interval (float): Seconds between batch status checks.
+            batch_max_requests (int): Maximum requests per batch; larger runs are split
+                              into several batches.
+            time_budget (Optional[float]): Wall-clock seconds run_evaluation may take,
+                              counted from its start. When it runs out, requests still in
+                              flight are cancelled (freeing their slots) and unsent ones are
+                              dropped; none of them is recorded, so the next run picks them
+                              up. None means no limit.
+            results_db (Optional[str]): Path of a SQLite file (ResultStore) to keep results in
+                              instead of output_json_path. Resuming then checks each
+                              task/provider combination with an indexed lookup instead of
+                              loading all previous results, results are inserted in one
+                              transaction per checkpoint and accuracy is computed in SQL.
+                              The JSON file and result log are not written.
         """
         if not providers:
             raise ValueError("At least one LLMProvider must be specified.")
+        if batch_mode and streaming:
+            raise ValueError("batch_mode needs the whole dataset up front and cannot be combined with streaming.")
 
         self.data_loader = data_loader
         self.data_transformer = data_transformer
         self.providers = providers
         self.evaluator = evaluator
         self.checkpoint_interval = max(1, checkpoint_interval) # Ensure at least 1
-        self.semaphore = asyncio.Semaphore(concurrency_limit) # Control concurrency
+        # Control concurrency, one adaptive limit per provider
+        max_concurrency = max_concurrency or max(1, concurrency_limit) * 4
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {
+            provider.get_identifier(): AdaptiveConcurrencyLimiter(provider.get_identifier(), initial_limit=concurrency_limit,
+                                                                  max_limit=max_concurrency)
+            for provider in providers}
+        self.streaming = streaming
+        self.stream_batch_size = max(1, stream_batch_size)
+        # Tasks read ahead per provider in streaming mode, so a stalled provider's backlog stays bounded
+        self.stream_backlog = self.stream_batch_size * self.STREAM_BACKLOG_BATCHES
+        if shard is not None:
+            _check_shard(*shard)
+        self.shard = shard
+        self.prewarm_connections = prewarm_connections
+        self.batch_mode = batch_mode
+        self.batch_poll_interval = batch_poll_interval
+        self.batch_max_requests = batch_max_requests
+        self.time_budget = time_budget
 
         # Determine output path
         if output_json_path:
@@ -467,138 +2896,561 @@ class EvaluationRunner:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             # Include provider names in default filename if multiple, keep simple if one
             provider_slug = providers[0].get_identifier() if len(providers) == 1 else f"{len(providers)}providers"
-            self.output_json_path = f"evaluation_results_{provider_slug}_{timestamp}.json"
+            shard_slug = f"_shard{shard[0]}of{shard[1]}" if shard else ""
+            self.output_json_path = f"evaluation_results_{provider_slug}{shard_slug}_{timestamp}.json"
             logging.info(f"No output path specified, using default: {self.output_json_path}")
+        self.result_log = ResultLog(ResultLog.path_for(self.output_json_path))
+        self.result_store = ResultStore(results_db) if results_db else None
+        self.result_writer = ResultWriter()
+        self._unwritten: List[TaskResult] = [] # Recorded, not yet handed to the writer (result log only)
+        self._unwritten_lock = threading.Lock() # Also taken by the signal handler, on the main thread
+        self._signal_handlers: Dict[int, Any] = {} # Handlers replaced while run_evaluation runs
+
+        self.all_tasks_data: List[Task] = [] # All tasks from the input file
+        self.task_count = 0 # Number of tasks in the dataset or shard (also known in streaming mode)
+        self.results: List[TaskResult] = [] # Holds results (loaded + new; only new with a result store)
+        # Tracks completed (task_id, provider_identifier) tuples; the ResultStore itself when one is used
+        self.processed_combinations: Union[Set[Tuple[str, str]], ResultStore] = set()
+        self._new_results_count = 0 # Results completed in the current run, drives checkpointing
+        self.failed_count = 0 # Requests that failed in the current run (not recorded)
+        self.cut_off_count = 0 # Combinations left unfinished because the time budget ran out
+        self._run_started = 0.0
+        self.time_to_first_result: Optional[float] = None # Seconds from run start to the first new result
+        self.loop_lag: Deque[float] = collections.deque(maxlen=self.LAG_WINDOW) # Seconds the loop woke up late
+        self.max_loop_lag = 0.0
+
+    def _prewarm(self):
+        """
+        Starts opening a connection to each distinct endpoint on the shared client loop.
 
-        self.all_tasks_data: List[Dict[str, Any]] = [] # All tasks from Excel
-        self.results: List[Dict[str, Any]] = [] # Holds results (loaded + new)
-        # Tracks completed (task_id, provider_identifier) tuples
-        self.processed_combinations: Set[Tuple[str, str]] = set()
+        One connection per endpoint: it covers HTTP/2 entirely and the DNS, TCP and TLS
+        setup of the first request otherwise. Opening more up front only competes with
+        the first real requests when the dataset loads quickly.
+        """
+        for base_url, api_key in {(provider.base_url, provider.api_key) for provider in self.providers}:
+            CLIENT_REGISTRY.submit(CLIENT_REGISTRY.prewarm(base_url, api_key))
+
+    def concurrency_state(self) -> Dict[str, Dict[str, Any]]:
+        """Current adaptive concurrency state per provider identifier, for monitoring."""
+        return {provider_id: limiter.state() for provider_id, limiter in self.limiters.items()}
+
+    def _concurrency_postfix(self) -> str:
+        """Current concurrency limit per provider (and circuit state unless closed), shown next to the progress bar."""
+        parts = []
+        for provider in self.providers:
+            provider_id = provider.get_identifier()
+            breaker = provider.circuit_breaker
+            circuit = f"[{breaker.state}]" if breaker and breaker.state != CircuitBreaker.CLOSED else ""
+            parts.append(f"{provider_id}={self.limiters[provider_id].current_limit}{circuit}")
+        return " ".join(parts)
+
+    def _run_on_loop(self, coro: Awaitable[Any]) -> Any:
+        """
+        Runs a processing coroutine on the shared client loop and returns its result.
 
+        While it runs, SIGINT and SIGTERM first write every recorded result (see
+        _flush_on_signal). Handlers can only be set from the main thread; elsewhere
+        (e.g. a web worker) the run goes ahead without them.
+        """
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                self._signal_handlers[signum] = signal.signal(signum, self._flush_on_signal)
+        try:
+            return CLIENT_REGISTRY.run(self._measure_loop_lag(coro))
+        finally:
+            while self._signal_handlers:
+                signum, handler = self._signal_handlers.popitem()
+                signal.signal(signum, handler)
+
+    def _flush_on_signal(self, signum: int, frame):
+        """
+        Writes the results recorded so far, then lets the signal take its usual course.
+
+        The previous handler is restored and called, so SIGINT still raises
+        KeyboardInterrupt and SIGTERM still terminates. Results are on disk first, so
+        the next run resumes after them.
+        """
+        logging.warning(f"Received {signal.Signals(signum).name}: writing recorded results before stopping.")
+        self._checkpoint()
+        self.result_writer.drain()
+        previous = self._signal_handlers.pop(signum, None)
+        if previous is None:
+            previous = signal.SIG_DFL
+        signal.signal(signum, previous)
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            signal.raise_signal(signum)
+
+    async def _measure_loop_lag(self, coro: Awaitable[Any]) -> Any:
+        """
+        Awaits coro while sampling event-loop lag: how late a short sleep wakes up.
+
+        Lag is time in which no request could be sent or answer handled, e.g. because
+        something blocked the loop; it is reported in the run summary.
+        """
+        async def sample():
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.LAG_SAMPLE_INTERVAL)
+                lag = max(0.0, time.monotonic() - started - self.LAG_SAMPLE_INTERVAL)
+                self.loop_lag.append(lag)
+                self.max_loop_lag = max(self.max_loop_lag, lag)
+
+        self.loop_lag.clear()
+        self.max_loop_lag = 0.0
+        sampler = asyncio.create_task(sample())
+        try:
+            return await coro
+        finally:
+            sampler.cancel()
+
+    def _budget_remaining(self) -> Optional[float]:
+        """Seconds left of the run's time budget (may be negative), or None without a budget."""
+        if self.time_budget is None:
+            return None
+        return self._run_started + self.time_budget - time.monotonic()
+
+    def _out_of_time(self) -> bool:
+        remaining = self._budget_remaining()
+        return remaining is not None and remaining <= 0
+
+    async def _cancel_stragglers(self, pending: Iterable[asyncio.Future]) -> int:
+        """Cancels unfinished requests, waits for them to release their slots and returns how many there were."""
+        stragglers = [future for future in pending if not future.done()]
+        for future in stragglers:
+            future.cancel()
+        for provider in self.providers:
+            provider.client.cancel_pending()
+        if stragglers:
+            await asyncio.gather(*stragglers, return_exceptions=True)
+        return len(stragglers)
+
+    @staticmethod
+    def _group_by_context(tasks: Iterable[Task]) -> List[Task]:
+        """
+        Orders tasks so that those sharing a prompt prefix are adjacent.
+
+        Tasks are grouped by context, then by instruction within a context (the order
+        of the prompt layout). Groups appear in order of their first task and keep
+        the dataset order inside.
+        """
+        groups: Dict[str, Dict[str, List[Task]]] = {}
+        for task_data in tasks:
+            by_instruction = groups.setdefault(str(task_data.get('text') or ''), {})
+            by_instruction.setdefault(str(task_data.get('instruction') or ''), []).append(task_data)
+        return [task_data for by_instruction in groups.values()
+                for group in by_instruction.values() for task_data in group]
+
+    def _in_shard(self, task_data: Task) -> bool:
+        """True if the task belongs to this runner's shard (always True when not sharded)."""
+        return self.shard is None or shard_of(task_data.id, self.shard[1]) == self.shard[0]
 
     def _load_previous_results(self):
-        """Loads results and populates processed_combinations set."""
+        """
+        Loads results and populates processed_combinations set.
+
+        Reads the results JSON file, then replays the result log on top of it: the log
+        holds results checkpointed after the JSON file was last written (by a run that
+        crashed or was killed). Results already in the JSON file are not added twice,
+        and the recovered results are compacted into the JSON file straight away.
+        """
         self.results = []
+        if self.result_store is not None:
+            # Membership checks go to the store's unique index; no rows are loaded
+            self.processed_combinations = self.result_store
+            logging.info(f"Results database {self.result_store.path} holds {len(self.result_store)} previous results.")
+            return
         self.processed_combinations = set()
+        loaded_data = []
         if os.path.exists(self.output_json_path):
             logging.info(f"Found existing results file: {self.output_json_path}. Loading.")
             try:
                 with open(self.output_json_path, 'r', encoding='utf-8') as f:
                     loaded_data = json.load(f)
-                if isinstance(loaded_data, list):
-                     valid_results = []
-                     for res in loaded_data:
-                         # Validate essential keys for resumption
-                         task_id = res.get('task_id')
-                         provider_id = res.get('provider_identifier') # Use combined identifier
-                         if task_id and provider_id:
-                             valid_results.append(res)
-                             self.processed_combinations.add((str(task_id), str(provider_id)))
-                         else:
-                             logging.warning(f"Skipping loaded result due to missing 'task_id' or 'provider_identifier': {res}")
-                     self.results = valid_results
-                     logging.info(f"Loaded {len(self.results)} valid previous results covering {len(self.processed_combinations)} task/provider combinations.")
-                else:
+                if not isinstance(loaded_data, list):
                      logging.warning(f"Loaded data from {self.output_json_path} is not a list. Starting fresh.")
+                     loaded_data = []
             except Exception as e:
                 logging.error(f"Error loading/parsing results file {self.output_json_path}: {e}. Starting fresh.")
-                self.results = []
-                self.processed_combinations = set()
+                loaded_data = []
         else:
             logging.info("No previous results file found. Starting fresh.")
+        logged_data = []
+        if self.result_log.exists():
+            try:
+                logged_data = self.result_log.read()
+                logging.info(f"Replaying {len(logged_data)} results from result log {self.result_log.path}.")
+            except OSError as e:
+                logging.error(f"Error reading result log {self.result_log.path}: {e}. Ignoring it.")
+
+        # Share Task objects with the dataset where possible (empty in streaming mode)
+        tasks_by_id = {str(task.id): task for task in self.all_tasks_data}
+        for res in itertools.chain(loaded_data, logged_data):
+            # Validate essential keys for resumption
+            task_id = res.get('task_id') if isinstance(res, dict) else None
+            provider_id = res.get('provider_identifier') if isinstance(res, dict) else None # Use combined identifier
+            if not (task_id and provider_id):
+                logging.warning(f"Skipping loaded result due to missing 'task_id' or 'provider_identifier': {res}")
+                continue
+            key = (str(task_id), str(provider_id))
+            if key in self.processed_combinations:
+                continue # Logged again after a crash between compaction and clearing the log
+            self.results.append(TaskResult.from_dict(res, tasks_by_id.get(str(task_id))))
+            self.processed_combinations.add(key)
+        if self.results:
+            logging.info(f"Loaded {len(self.results)} valid previous results covering {len(self.processed_combinations)} task/provider combinations.")
+        if self.result_log.exists():
+            # Fold the recovered results into the JSON file before this run appends its own
+            self._save_results_to_json()
+
+    def _checkpoint(self):
+        """
+        Hands the results recorded since the last checkpoint to the writer thread.
+
+        They are written as one batch: one fsync of the result log, or one store
+        transaction. Safe to call from any thread.
+        """
+        if self.result_store is not None:
+            self.result_writer.submit(self.result_store.flush)
+            return
+        with self._unwritten_lock:
+            batch, self._unwritten = self._unwritten, []
+        if batch:
+            self.result_writer.submit(functools.partial(self._write_log_batch, batch))
+
+    def _write_log_batch(self, batch: List[TaskResult]):
+        """Appends a batch of results to the result log and fsyncs it (runs on the writer thread)."""
+        for result in batch:
+            self.result_log.append(result.to_dict())
+        self.result_log.flush()
 
     def _save_results_to_json(self):
-        """Saves the current cumulative results list to the output JSON file."""
+        """
+        Compacts all results into the output JSON file and clears the result log.
+
+        The file is written to a temporary file and renamed over the old one, so
+        readers and a crash mid-write only ever see a complete file. The log is removed
+        only after the rename; if that never happens, the next run replays it.
+        """
+        self._checkpoint()
+        self.result_writer.drain()
+        if self.result_store is not None:
+            return
         logging.debug(f"Saving {len(self.results)} results to {self.output_json_path}")
         try:
             os.makedirs(os.path.dirname(self.output_json_path) or '.', exist_ok=True)
-            with open(self.output_json_path, 'w', encoding='utf-8') as f:
-                json.dump(self.results, f, ensure_ascii=False, indent=4)
+            tmp_path = f"{self.output_json_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                self._write_results_json(f, self.results)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.output_json_path)
+            self.result_log.clear()
             logging.debug(f"Progress saved successfully to {self.output_json_path}")
         except Exception as e:
             logging.error(f"Error saving results to {self.output_json_path}: {e}")
 
-    async def _get_completion_and_evaluate(self, provider: LLMProvider, task_data: Dict[str, Any]):
-        """Coroutine wrapper to get completion, evaluate, and return structured result."""
+    @staticmethod
+    def _write_results_json(f, results: Iterable[TaskResult]):
+        """
+        Writes results as a JSON list, byte-identical to json.dump(list, indent=4).
+
+        Each result is converted to a dict only while it is being written, so no full
+        list of result dicts is built.
+        """
+        f.write('[')
+        separator = '\n    '
+        for result in results:
+            f.write(separator)
+            f.write(json.dumps(result.to_dict(), ensure_ascii=False, indent=4).replace('\n', '\n    '))
+            separator = ',\n    '
+        f.write('\n]' if separator != '\n    ' else ']')
+
+    async def _get_completion_and_evaluate(self, provider: LLMProvider, task_data: Task) -> Optional[TaskResult]:
+        """
+        Coroutine wrapper to get completion, evaluate, and return structured result.
+
+        Returns None if the request failed; the combination is then left unprocessed so
+        a later run retries it instead of recording it as a wrong answer.
+        """
+        # The provider's limiter bounds concurrency; a slot is only held while a request is in flight
+        completion = await provider.client.complete(task_data, slot=self.limiters[provider.get_identifier()].slot)
+        return self._build_result(provider, task_data, completion)
+
+    def _build_result(self, provider: LLMProvider, task_data: Task, completion: Completion) -> Optional[TaskResult]:
+        """Evaluates a completion into a TaskResult; returns None (and counts a failure) if it failed."""
+        if completion.error is not None:
+            self.failed_count += 1
+            return None
         task_id = str(task_data.get('id'))
         provider_id = provider.get_identifier()
+        llm_response = completion.response
 
-        # Acquire semaphore to limit concurrency
-        async with self.semaphore:
-            llm_response = await provider.client.get_completion(task_data)
-
-        # Evaluation happens outside the semaphore lock
+        # Evaluation happens outside the concurrency slot
         ground_truth = task_data.get('answer')
         is_correct = None
         if ground_truth is not None:
             is_correct = self.evaluator.evaluate(llm_response, ground_truth, task_id, provider_id)
 
-        result = {
-            "task_id": task_id,
-            "provider_identifier": provider_id, # Store combined ID
-            "provider_name": provider.provider_name,
-            "model_name": provider.model_name,
-            "llm_response": llm_response,
-            "ground_truth": ground_truth,
-            "is_correct": is_correct,
-            "task_instruction": task_data.get('instruction'), # Include key parts of task for context
-            "task_question": task_data.get('question'),
-             # Optionally include full task_data if needed, but makes JSON large
-             # "full_task_data": task_data,
-        }
-        return result
-
-
-    async def _process_tasks_async(self) -> List[Dict[str, Any]]:
-        """The core async task processing loop."""
+        return TaskResult(task_data, provider_id, provider.provider_name, provider.model_name,
+                          llm_response, is_correct,
+                          attempts=completion.attempts, retries=max(0, completion.attempts - 1),
+                          cached=completion.cached,
+                          latency=round(completion.latency, 4) if completion.latency is not None else None,
+                          ttfb=round(completion.ttfb, 4) if completion.ttfb is not None else None,
+                          early_stop=completion.early_stop,
+                          max_tokens=completion.max_tokens,
+                          temperature=completion.temperature,
+                          tokens=completion.tokens,
+                          cached_tokens=completion.cached_tokens,
+                          packed=completion.packed,
+                          hedged=completion.hedged)
+
+
+    def _pending_tasks(self, tasks: Iterable[Task]) -> Dict[str, List[Task]]:
+        """
+        Tasks still to send per provider identifier, in prompt-prefix order.
 
-        tasks_to_create = []
-        # Identify which (task, provider) combinations need processing
-        for task_data in self.all_tasks_data:
+        Walks the resume filter once; with a result store every check is a database
+        lookup, so callers run this in a thread rather than on the event loop.
+        """
+        pending: Dict[str, List[Task]] = {provider.get_identifier(): [] for provider in self.providers}
+        for task_data in self._group_by_context(tasks):
             task_id = str(task_data.get('id'))
-            for provider in self.providers:
-                provider_id = provider.get_identifier()
+            for provider_id, provider_tasks in pending.items():
                 if (task_id, provider_id) not in self.processed_combinations:
-                    # Create the coroutine object, but don't await yet
-                    # Pass provider and task_data needed by the wrapper
-                    coro = self._get_completion_and_evaluate(provider, task_data)
-                    tasks_to_create.append(coro)
+                    provider_tasks.append(task_data)
+        return pending
+
+    async def _run_workers(self, queues: Dict[str, asyncio.Queue], feeders: List[Awaitable[None]],
+                           progress_bar: async_tqdm, progress: Optional[asyncio.Event] = None) -> int:
+        """
+        Sends the tasks put in `queues` from a pool of worker coroutines per provider and records the results.
 
-        if not tasks_to_create:
+        Each provider has its own queue and limiter.max_limit workers taking tasks from
+        it, so a provider that is slow, throttled or behind an open circuit only ties up
+        its own workers. The feeders fill the queues and end each with one None per
+        worker. When the time budget runs out, requests in flight are cancelled and the
+        rest is left for the next run. `progress`, if given, is set whenever a worker
+        takes a task, for feeders that wait for room.
+
+        Returns:
+            int: Number of tasks finished (recorded or failed).
+        """
+        finished = 0
+
+        async def worker(provider: LLMProvider, queue: asyncio.Queue):
+            nonlocal finished
+            while (task_data := await queue.get()) is not None:
+                if progress is not None:
+                    progress.set()
+                try:
+                    await self._record_result(await self._get_completion_and_evaluate(provider, task_data))
+                except Exception as e:
+                    logging.error(f"Error processing task {task_data.id} ({provider.get_identifier()}): {type(e).__name__} - {e}")
+                finished += 1
+                progress_bar.update(1)
+                progress_bar.set_postfix_str(self._concurrency_postfix(), refresh=False)
+
+        workers = [asyncio.create_task(worker(provider, queues[provider.get_identifier()]))
+                   for provider in self.providers for _ in range(self.limiters[provider.get_identifier()].max_limit)]
+        everything = [asyncio.ensure_future(feeder) for feeder in feeders] + workers
+        remaining = self._budget_remaining()
+        done, pending = await asyncio.wait(everything, timeout=max(0.0, remaining) if remaining is not None else None,
+                                           return_when=asyncio.FIRST_EXCEPTION)
+        if pending:
+            # Budget ran out (or a feeder failed): free the slots of the requests in flight
+            await self._cancel_stragglers(pending)
+        for future in done:
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+        return finished
+
+    async def _process_tasks_async(self) -> List[TaskResult]:
+        """The core async task processing loop."""
+
+        # Identify which (task, provider) combinations need processing, sending tasks that share a prompt prefix together
+        pending = await asyncio.to_thread(self._pending_tasks, self.all_tasks_data)
+        total = sum(len(provider_tasks) for provider_tasks in pending.values())
+        if not total:
             logging.info("No new task/provider combinations to process based on loaded results.")
             return self.results # Return existing results
 
-        logging.info(f"Creating {len(tasks_to_create)} new API call/evaluation tasks...")
+        logging.info(f"Sending {total} new API call/evaluation tasks...")
 
-        new_results_count = 0
-        # Use asyncio.as_completed for progress tracking as tasks finish
-        # Wrap with async_tqdm for the progress bar
-        future_iterator = asyncio.as_completed(tasks_to_create)
-        progress_bar = async_tqdm(future_iterator, total=len(tasks_to_create), desc="Evaluating Tasks", unit="task")
+        self._new_results_count = 0
+        self.failed_count = 0
+        queues = {provider_id: asyncio.Queue(maxsize=limiter.max_limit) for provider_id, limiter in self.limiters.items()}
 
-        for future in progress_bar:
-            try:
-                # Result is the dictionary returned by _get_completion_and_evaluate
-                result_detail = await future
-                if result_detail: # Ensure result is not None
-                     self.results.append(result_detail)
-                     # Add to processed set immediately after successful completion
-                     self.processed_combinations.add((result_detail['task_id'], result_detail['provider_identifier']))
-                     new_results_count += 1
-
-                     # Checkpoint saving based on count of *newly completed* results
-                     if new_results_count % self.checkpoint_interval == 0:
-                         self._save_results_to_json()
+        async def feed(provider_id: str):
+            # One feeder per provider, so a full queue only holds back its own provider
+            for task_data in pending[provider_id]:
+                await queues[provider_id].put(task_data)
+            for _ in range(self.limiters[provider_id].max_limit):
+                await queues[provider_id].put(None) # One stop marker per worker
 
-            except Exception as e:
-                # Exceptions from _get_completion_and_evaluate (should be rare if handled internally)
-                logging.error(f"Error processing completed task future: {type(e).__name__} - {e}")
-                # Optionally: Add more robust error tracking here
+        # Requests are sent in work order, so they queue for concurrency slots grouped by context
+        progress_bar = async_tqdm(total=total, desc="Evaluating Tasks", unit="task")
+        finished = await self._run_workers(queues, [feed(provider_id) for provider_id in queues], progress_bar)
+        self.cut_off_count = total - finished
+        progress_bar.close()
 
         # Final save after the loop
-        if new_results_count > 0:
+        if self._new_results_count > 0:
              logging.info("Saving final results...")
-             self._save_results_to_json()
+             await asyncio.to_thread(self._save_results_to_json)
+
+        return self.results
+
+    async def _process_tasks_batch_async(self) -> List[TaskResult]:
+        """
+        Batch API variant of _process_tasks_async.
+
+        Each provider's pending requests go out as one batch (split at
+        batch_max_requests), with all providers' batches running at the same time.
+        When a provider's batches finish, its results are evaluated and recorded like
+        any other, so checkpointing and resuming work unchanged. Requests a batch did
+        not answer are not recorded and are retried by the next run.
+        """
+        self._new_results_count = 0
+        self.failed_count = 0
+        ordered_tasks = self._group_by_context(self.all_tasks_data)
+        work = []
+        for provider in self.providers:
+            provider_id = provider.get_identifier()
+            pending = [task_data for task_data in ordered_tasks
+                       if (str(task_data.get('id')), provider_id) not in self.processed_combinations]
+            if pending:
+                work.append((provider, pending))
+        if not work:
+            logging.info("No new task/provider combinations to process based on loaded results.")
+            return self.results
+
+        total = sum(len(pending) for _, pending in work)
+        logging.info(f"Submitting {total} requests through the Batch API for {len(work)} provider(s)...")
+        progress_bar = async_tqdm(total=total, desc="Evaluating Tasks (batch)", unit="task")
+
+        finished: Dict[str, int] = {provider.get_identifier(): 0 for provider, _ in work}
+
+        async def run_provider(provider: LLMProvider, pending: List[Task]):
+            completions = await provider.client.complete_batch(pending, poll_interval=self.batch_poll_interval,
+                                                               max_requests=self.batch_max_requests)
+            for task_data, completion in zip(pending, completions):
+                await self._record_result(self._build_result(provider, task_data, completion))
+                finished[provider.get_identifier()] += 1
+                progress_bar.update(1)
+
+        self.cut_off_count = 0
+        runs = {asyncio.create_task(run_provider(provider, pending)): (provider, pending) for provider, pending in work}
+        remaining = self._budget_remaining()
+        done, unfinished = await asyncio.wait(runs, timeout=max(0.0, remaining) if remaining is not None else None)
+        if unfinished:
+            # Cancelling a provider's run also cancels its submitted batches server-side
+            await self._cancel_stragglers(unfinished)
+            self.cut_off_count = sum(len(runs[run][1]) - finished[runs[run][0].get_identifier()] for run in unfinished)
+        for run in done:
+            if run.exception() is not None:
+                # One provider's crash must not lose the others' results; its unrecorded requests are retried next run
+                provider, pending = runs[run]
+                provider_id = provider.get_identifier()
+                self.failed_count += len(pending) - finished[provider_id]
+                logging.error(f"Batch run for {provider_id} failed: {type(run.exception()).__name__} - {run.exception()}",
+                              exc_info=run.exception())
+        progress_bar.close()
+
+        if self._new_results_count > 0:
+             logging.info("Saving final results...")
+             await asyncio.to_thread(self._save_results_to_json)
+        return self.results
+
+    async def _record_result(self, result_detail: Optional[TaskResult]):
+        """
+        Stores a completed result, marks it processed and checkpoints periodically.
+
+        Writing happens on the writer thread; this only waits (without blocking the
+        loop) when the writer has fallen max_pending checkpoints behind.
+        """
+        if not result_detail: # Ensure result is not None
+            return
+        self.results.append(result_detail)
+        if self.time_to_first_result is None:
+            self.time_to_first_result = time.monotonic() - self._run_started
+        # Add to processed set immediately after successful completion
+        self._new_results_count += 1
+        if self.result_store is not None:
+            self.result_store.add(result_detail)
+        else:
+            self.processed_combinations.add((result_detail.task_id, result_detail.provider_identifier))
+            with self._unwritten_lock:
+                self._unwritten.append(result_detail)
+
+        # Checkpoint based on count of *newly completed* results
+        if self._new_results_count % self.checkpoint_interval == 0:
+            self._checkpoint()
+            await self.result_writer.wait_for_room()
+
+    async def _process_task_stream_async(self, task_iterator: Iterator[Task]) -> List[TaskResult]:
+        """
+        Streaming variant of _process_tasks_async.
+
+        Batches of tasks are pulled from task_iterator in a worker thread (file parsing is
+        blocking), and the tasks of each batch are queued for every provider immediately, so
+        API calls for the first rows overlap with reading the rest of the file. Reading
+        pauses while every provider has work queued, or while one provider has fallen
+        stream_backlog tasks behind; a stalled provider can thus hold back the others only
+        once its backlog is full, which keeps memory bounded.
+        """
+        self._new_results_count = 0
+        self.failed_count = 0
+        self.task_count = 0
+        # Total is unknown until the whole file has been read
+        progress_bar = async_tqdm(desc="Evaluating Tasks", unit="task")
+        input_done = False
+        fed = 0
+        queues: Dict[str, asyncio.Queue] = {provider_id: asyncio.Queue() for provider_id in self.limiters}
+        progress = asyncio.Event()
+
+        def read_batch() -> Tuple[int, Dict[str, List[Task]]]:
+            # Parsing and resume checks run in a worker thread
+            batch = list(itertools.islice(task_iterator, self.stream_batch_size))
+            return len(batch), self._pending_tasks(batch)
+
+        def has_room() -> bool:
+            backlogs = {provider_id: queue.qsize() for provider_id, queue in queues.items()}
+            return (max(backlogs.values()) < self.stream_backlog and
+                    any(backlogs[provider_id] < limiter.max_limit for provider_id, limiter in self.limiters.items()))
+
+        async def feed():
+            nonlocal input_done, fed
+            while not self._out_of_time():
+                while not has_room():
+                    progress.clear()
+                    await progress.wait()
+                read, pending = await asyncio.to_thread(read_batch)
+                if not read:
+                    input_done = True
+                    break
+                self.task_count += read
+                for provider_id, provider_tasks in pending.items():
+                    for task_data in provider_tasks:
+                        queues[provider_id].put_nowait(task_data)
+                    fed += len(provider_tasks)
+            for provider_id, queue in queues.items():
+                for _ in range(self.limiters[provider_id].max_limit):
+                    queue.put_nowait(None) # One stop marker per worker
+
+        finished = await self._run_workers(queues, [feed()], progress_bar, progress)
+        self.cut_off_count = fed - finished
+        if not input_done:
+            logging.warning("Time budget ran out before the whole input was read; unread tasks are left for the next run.")
+        progress_bar.close()
+
+        if self._new_results_count > 0:
+             logging.info("Saving final results...")
+             await asyncio.to_thread(self._save_results_to_json)
+        else:
+             logging.info("No new task/provider combinations to process based on loaded results.")
 
         return self.results
 
@@ -612,56 +3464,284 @@ class EvaluationRunner:
                 - Dictionary of accuracy per provider identifier, or None.
                 - The final list of detailed results.
         """
-        # 1. Load & Transform Data
-        raw_data = self.data_loader.load_data()
-        if raw_data is None or 'id' not in raw_data.columns: return None, []
-        self.all_tasks_data = self.data_transformer.transform(raw_data)
-        if not self.all_tasks_data: return None, []
-
-        # 2. Load Previous Results
-        self._load_previous_results()
-
-        # 3. Run Async Processing Loop
-        # asyncio.run() starts the event loop and executes the coroutine
-        final_results = asyncio.run(self._process_tasks_async())
-        self.results = final_results # Update self.results with the final list
+        self._run_started = time.monotonic()
+        self.time_to_first_result = None
+        if self.prewarm_connections:
+            # Runs on the client loop thread, overlapping with data loading below
+            self._prewarm()
+
+        if self.streaming:
+            # 1+2+3. Load previous results first, then read, transform and dispatch rows as they stream in
+            self._load_previous_results()
+            task_stream = self.data_loader.iter_tasks(self.data_transformer)
+            first_task = next(task_stream, None)
+            if first_task is None: return None, []
+            task_stream = itertools.chain([first_task], task_stream)
+            if self.shard:
+                task_stream = filter(self._in_shard, task_stream)
+            final_results = self._run_on_loop(self._process_task_stream_async(task_stream))
+            self.results = final_results
+        else:
+            # 1. Load & Transform Data
+            self.all_tasks_data = self.data_loader.load_tasks(self.data_transformer)
+            if not self.all_tasks_data: return None, []
+            if self.shard:
+                total_tasks = len(self.all_tasks_data)
+                self.all_tasks_data = [task for task in self.all_tasks_data if self._in_shard(task)]
+                logging.info(f"Shard {self.shard[0]}/{self.shard[1]}: selected {len(self.all_tasks_data)} of {total_tasks} tasks.")
+            self.task_count = len(self.all_tasks_data)
+
+            # 2. Load Previous Results
+            self._load_previous_results()
+
+            # 3. Run Async Processing Loop
+            # Executes the coroutine on the shared client loop, where warm connections live
+            process = self._process_tasks_batch_async if self.batch_mode else self._process_tasks_async
+            final_results = self._run_on_loop(process())
+            self.results = final_results # Update self.results with the final list
 
         # 4. Calculate Final Accuracy (Per Provider)
-        provider_stats = {provider.get_identifier(): {'correct': 0, 'evaluated': 0} for provider in self.providers}
-        for result in self.results:
-             provider_id = result.get('provider_identifier')
-             if provider_id in provider_stats:
-                 # Only count if evaluation happened (is_correct is not None)
-                 if result.get('is_correct') is not None:
-                     provider_stats[provider_id]['evaluated'] += 1
-                     if result.get('is_correct') is True:
-                         provider_stats[provider_id]['correct'] += 1
-
-        accuracies = {}
         logging.info(f"--- Evaluation Summary ---")
-        logging.info(f"Total unique tasks in dataset: {len(self.all_tasks_data)}")
-        logging.info(f"Total results generated (cumulative): {len(self.results)}")
-
-        for provider_id, stats in provider_stats.items():
-            evaluated_count = stats['evaluated']
-            correct_count = stats['correct']
-            accuracy = None
-            if evaluated_count > 0:
-                accuracy = correct_count / evaluated_count
-                accuracies[provider_id] = accuracy
-                logging.info(f"  Provider {provider_id}: Accuracy = {accuracy:.4f} ({correct_count}/{evaluated_count} evaluated tasks)")
-            else:
-                 logging.info(f"  Provider {provider_id}: No tasks evaluated.")
+        scope = f"shard {self.shard[0]}/{self.shard[1]}" if self.shard else "dataset"
+        logging.info(f"Total unique tasks in {scope}: {self.task_count}")
+        logging.info(f"Total results generated (cumulative): {len(self.result_store) if self.result_store is not None else len(self.results)}")
+        if self.failed_count:
+            logging.warning(f"Failed requests (not recorded, retried on the next run): {self.failed_count}")
+        if self.cut_off_count:
+            logging.warning(f"Time budget of {self.time_budget:.0f}s ran out: {self.cut_off_count} task/provider "
+                            f"combinations cut off (not recorded, retried on the next run)")
+        if self.time_to_first_result is not None:
+            logging.info(f"Time to first result: {self.time_to_first_result:.2f}s")
+        if self.loop_lag:
+            lags = list(self.loop_lag)
+            logging.info(f"Event loop lag: p50 {percentile(lags, 50) * 1000:.1f}ms, p99 {percentile(lags, 99) * 1000:.1f}ms, "
+                         f"max {self.max_loop_lag * 1000:.1f}ms over {len(lags)} samples")
+        if self.result_writer.stalls:
+            logging.warning(f"Result writer fell behind {self.result_writer.stalls} times; requests waited for it to catch up.")
+        for provider_id, state in ({} if self.batch_mode else self.concurrency_state()).items():
+            mean_latency = f"{state['mean_latency']:.3f}s" if state['mean_latency'] is not None else "n/a"
+            logging.info(f"  Provider {provider_id}: Concurrency limit settled at {state['limit']} "
+                         f"({state['throttled']} throttled, {state['errors']} other errors), mean request latency {mean_latency}")
+        # A cache may be shared by several providers; report each file once
+        caches = {id(provider.client.response_cache): provider.client.response_cache
+                  for provider in self.providers if provider.client.response_cache}
+        for cache in caches.values():
+            logging.info(f"Response cache {cache.path} ({cache.mode}): {cache.hits} hits, {cache.misses} misses; "
+                         f"saved {cache.hits} API calls and ~{cache.saved_seconds:.1f}s of request time")
+        for provider in self.providers:
+            provider_id = provider.get_identifier()
+            latencies = [result.metric('latency') for result in self.results if result.provider_identifier == provider_id
+                         and result.metric('latency') is not None]
+            if latencies:
+                tokens = sum(result.metric('tokens') or 0 for result in self.results
+                             if result.provider_identifier == provider_id)
+                logging.info(f"  Provider {provider_id}: Request latency p50 {percentile(latencies, 50):.3f}s, "
+                             f"p99 {percentile(latencies, 99):.3f}s over {len(latencies)} calls; {tokens} tokens reported")
+            if provider.circuit_breaker and provider.circuit_breaker.trips:
+                logging.warning(f"  Provider {provider_id}: Circuit opened {provider.circuit_breaker.trips} times, "
+                                f"{provider.circuit_breaker.deferred} requests deferred (now {provider.circuit_breaker.state})")
+            hedge_stats = provider.client.hedge_stats
+            if hedge_stats['hedged']:
+                logging.info(f"  Provider {provider_id}: Hedged {hedge_stats['hedged']}/{hedge_stats['requests']} requests "
+                             f"({hedge_stats['hedged'] / hedge_stats['requests']:.1%}), the duplicate answered first "
+                             f"{hedge_stats['won']} times; ~{hedge_stats['saved_seconds']:.1f}s of tail latency saved (estimated)")
+            packed = sum(1 for result in self.results if result.provider_identifier == provider_id
+                         and result.metric('packed'))
+            if packed:
+                logging.info(f"  Provider {provider_id}: {packed} results answered in packed requests "
+                             f"(up to {provider.client.pack_size} tasks each)")
+            if provider.client.prompt_tokens:
+                logging.info(f"  Provider {provider_id}: {provider.client.cached_prompt_tokens}/{provider.client.prompt_tokens} prompt tokens "
+                             f"({provider.client.cached_prompt_tokens / provider.client.prompt_tokens:.0%}) served from the provider's prompt cache")
+            if provider.client.stream_completions:
+                provider_id = provider.get_identifier()
+                timed = [result for result in self.results if result.provider_identifier == provider_id
+                         and result.metric('ttfb') is not None]
+                if timed:
+                    logging.info(f"  Provider {provider_id}: Streaming mean TTFB {sum(r.ttfb for r in timed) / len(timed):.3f}s, "
+                                 f"mean latency {sum(r.latency for r in timed) / len(timed):.3f}s, "
+                                 f"{sum(1 for r in timed if r.metric('early_stop'))}/{len(timed)} stopped early")
+            if provider.rate_limiter:
+                logging.info(f"  Provider {provider.get_identifier()}: Waited {provider.rate_limiter.wait_seconds:.1f}s for RPM/TPM budget")
+        provider_ids = [provider.get_identifier() for provider in self.providers]
+        if self.result_store is not None:
+            accuracies = report_accuracies(self.result_store.accuracy_counts(provider_ids))
+            logging.info(f"Detailed results saved to: {self.result_store.path}")
+            # Previous runs' results are only read here, for callers that want the full list
+            tasks_by_id = {str(task.id): task for task in self.all_tasks_data}
+            return accuracies, [result.to_dict() for result in self.result_store.iter_results(tasks_by_id)]
+        accuracies = summarize_accuracies(self.results, provider_ids)
 
         logging.info(f"Detailed results saved to: {self.output_json_path}")
 
-        return accuracies if accuracies else None, self.results
-    
+        # Callers get the JSON result shape; records are only expanded here
+        return accuracies if accuracies else None, [result.to_dict() for result in self.results]
+
+
+# --- 6. Sharding & Result Merging ---
+
+def _check_shard(index: int, count: int):
+    """Raises ValueError unless 0 <= index < count."""
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {index}/{count}: expected 0 <= index < count.")
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """Parses an 'I/N' shard spec (I is 0-based, e.g. '0/4') into (index, count)."""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec '{spec}': expected I/N, e.g. 0/4.") from None
+    _check_shard(index, count)
+    return index, count
+
+def shard_of(task_id: Any, num_shards: int) -> int:
+    """
+    Returns the shard (0 .. num_shards - 1) a task id belongs to.
+
+    Uses a content hash of str(task_id) rather than hash(), which is salted per
+    process, so every host assigns a task to the same shard.
+    """
+    digest = hashlib.blake2b(str(task_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % num_shards
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank q-th percentile (0 < q <= 100) of a non-empty list."""
+    ordered = sorted(values)
+    rank = int(-(-len(ordered) * q // 100)) # ceil(n * q / 100)
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+def summarize_accuracies(results: Iterable[TaskResult], provider_ids: Iterable[str]) -> Optional[Dict[str, float]]:
+    """
+    Logs and returns the accuracy per provider identifier.
+
+    Only results for the given providers are counted, and only those that were
+    evaluated (is_correct is not None). Returns None if no provider had any.
+    """
+    provider_stats = {provider_id: {'correct': 0, 'evaluated': 0} for provider_id in provider_ids}
+    for result in results:
+         stats = provider_stats.get(result.provider_identifier)
+         # Only count if evaluation happened (is_correct is not None)
+         if stats is not None and result.is_correct is not None:
+             stats['evaluated'] += 1
+             if result.is_correct is True:
+                 stats['correct'] += 1
+    return report_accuracies(provider_stats)
+
+def report_accuracies(provider_stats: Dict[str, Dict[str, int]]) -> Optional[Dict[str, float]]:
+    """Logs and returns the accuracy per provider from {'correct', 'evaluated'} counts (None if nothing was evaluated)."""
+    accuracies = {}
+    for provider_id, stats in provider_stats.items():
+        evaluated_count = stats['evaluated']
+        correct_count = stats['correct']
+        if evaluated_count > 0:
+            accuracy = correct_count / evaluated_count
+            accuracies[provider_id] = accuracy
+            logging.info(f"  Provider {provider_id}: Accuracy = {accuracy:.4f} ({correct_count}/{evaluated_count} evaluated tasks)")
+        else:
+             logging.info(f"  Provider {provider_id}: No tasks evaluated.")
+    return accuracies if accuracies else None
+
+def merge_result_files(input_paths: Sequence[str], output_json_path: str) -> Optional[Dict[str, float]]:
+    """
+    Combines the result files of sharded runs into one results file.
+
+    Results are deduplicated on (task_id, provider_identifier), keeping the first
+    occurrence in input order, so overlapping shards or re-runs are never counted
+    twice. The merged file has the same format as a single run's output. Results
+    still in a shard's result log (a run that did not finish) are merged as well.
+    Shard files are only read, so a shard that is still running can be merged.
+
+    Returns:
+        Optional[Dict[str, float]]: Combined accuracy per provider identifier, as
+        reported by EvaluationRunner.run_evaluation, or None if nothing was evaluated.
+    """
+    merged: List[TaskResult] = []
+    seen: Set[Tuple[str, str]] = set()
+    provider_ids: Dict[str, None] = {} # Ordered set, in order of first appearance
+    duplicates = 0
+    for path in input_paths:
+        result_log = ResultLog(ResultLog.path_for(path))
+        loaded_data = []
+        if os.path.exists(path) or not result_log.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                loaded_data = json.load(f)
+            if not isinstance(loaded_data, list):
+                raise ValueError(f"Results file {path} does not contain a JSON list.")
+        # Read-only: the shard may still be running and about to finish its last line
+        for res in itertools.chain(loaded_data, result_log.read(truncate=False)):
+            task_id = res.get('task_id')
+            provider_id = res.get('provider_identifier')
+            if not (task_id and provider_id):
+                logging.warning(f"Skipping result in {path} due to missing 'task_id' or 'provider_identifier': {res}")
+                continue
+            key = (str(task_id), str(provider_id))
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            provider_ids.setdefault(key[1])
+            merged.append(TaskResult.from_dict(res))
+
+    os.makedirs(os.path.dirname(output_json_path) or '.', exist_ok=True)
+    tmp_path = f"{output_json_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        EvaluationRunner._write_results_json(f, merged)
+    os.replace(tmp_path, output_json_path)
+
+    logging.info("--- Merged Evaluation Summary ---")
+    logging.info(f"Merged {len(input_paths)} result files into {output_json_path} ({duplicates} duplicates dropped).")
+    logging.info(f"Total unique tasks: {len({task_id for task_id, _ in seen})}")
+    logging.info(f"Total results: {len(merged)}")
+    return summarize_accuracies(merged, provider_ids)
+
 # --- Example Usage ---
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate LLM providers on a task file.")
+    parser.add_argument("--input", help="Task file to evaluate (default: a generated demo Excel file).")
+    parser.add_argument("--output", help="Results JSON file (default: multi_provider_evaluation.json, suffixed with the shard).")
+    parser.add_argument("--results-db", metavar="PATH",
+                        help="Keep results in this SQLite file instead of the results JSON file (faster resume for large runs).")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="Evaluate only shard I of N (0-based, e.g. 0/4); tasks are assigned by a hash of their id.")
+    parser.add_argument("--stream-completions", action="store_true",
+                        help="Stream LLM responses and stop reading once the answer is complete.")
+    parser.add_argument("--response-cache", metavar="PATH",
+                        help="SQLite file caching LLM responses across runs (e.g. .lmeval_cache/responses.sqlite).")
+    parser.add_argument("--response-cache-mode", choices=ResponseCache.MODES, default="read-write",
+                        help="How the response cache is used (default: read-write).")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS",
+                        help="Stop after this many seconds; unfinished tasks are left for the next run.")
+    parser.add_argument("--request-timeout", type=float, default=120.0, metavar="SECONDS",
+                        help="Deadline for a single API call (default: 120).")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit requests through the providers' Batch API and wait for the batches to finish.")
+    parser.add_argument("--batch-poll-interval", type=float, default=30.0,
+                        help="Seconds between batch status checks (default: 30).")
+    subparsers = parser.add_subparsers(dest="command")
+    merge_parser = subparsers.add_parser("merge", help="Merge shard result files and report combined accuracy.")
+    merge_parser.add_argument("inputs", nargs="+", help="Result JSON files written by the shard runs.")
+    merge_parser.add_argument("--output", required=True, help="Path of the merged results JSON file.")
+    args = parser.parse_args()
+    if args.shard:
+        try:
+            args.shard = parse_shard_spec(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.command == "merge":
+        merged_accuracies = merge_result_files(args.inputs, args.output)
+        print("\n--- Combined Accuracy Summary ---")
+        if merged_accuracies:
+            for provider_id, acc in merged_accuracies.items():
+                print(f"  Provider {provider_id}: {acc:.2%}")
+        else:
+            print("  Accuracy could not be calculated (no tasks evaluated).")
+        print(f"\nMerged results saved in: {args.output}")
+        sys.exit(0)
+
     # Create Dummy Excel
-    excel_file_path = "llm_eval_tasks_async.xlsx"
+    excel_file_path = args.input or "llm_eval_tasks_async.xlsx"
     # (Use the same data structure as the previous example, ensuring unique IDs)
     data = {
         'id': [f"task_{i:02d}" for i in range(1, 9)], # Generate unique IDs
@@ -671,12 +3751,13 @@ if __name__ == "__main__":
         'options': [ "{'A': 'A', 'B': 'B', 'C': 'E', 'D': 'F'}", "{'A': 'Paris', 'B': 'London'}", "{'True': 'Yes', 'False': 'No'}", "{'A': 'Red', 'B': 'Green', 'C': 'Blue', 'D': 'Yellow'}", "{'A': Correct", "{'A': 'Option A'}", "{}", "{'X': 'orange', 'Y': 'apple'}" ],
         'answer': [ "['A', 'C']", "A", "True", "['A', 'C', 'D']", "A", None, "4", 'Y' ]
     }
-    try:
-        pd.DataFrame(data).to_excel(excel_file_path, index=False)
-        logging.info(f"Created/Overwritten dummy Excel file: {excel_file_path}")
-    except Exception as e:
-        logging.error(f"Could not create dummy excel file: {e}")
-        exit()
+    if not args.input:
+        try:
+            pd.DataFrame(data).to_excel(excel_file_path, index=False)
+            logging.info(f"Created/Overwritten dummy Excel file: {excel_file_path}")
+        except Exception as e:
+            logging.error(f"Could not create dummy excel file: {e}")
+            exit()
 
     # --- Configure Providers ---
     # Ensure API keys are set as environment variables
@@ -685,13 +3766,18 @@ if __name__ == "__main__":
     # Provider 2: Example - Qwen (replace with actual key if using)
     qwen_api_key = os.getenv("QWEN_API_KEY")
 
+    response_cache = ResponseCache(args.response_cache, args.response_cache_mode) if args.response_cache else None
+
     providers_to_run = []
     if deepseek_api_key:
          try:
              providers_to_run.append(LLMProvider(provider_name="DeepSeek",
                                                 model_name="deepseek-chat",
                                                 api_key=deepseek_api_key,
-                                                base_url="https://api.deepseek.com")) # Specify base URL
+                                                base_url="https://api.deepseek.com", # Specify base URL
+                                                response_cache=response_cache,
+                                                stream_completions=args.stream_completions,
+                                                request_timeout=args.request_timeout))
          except Exception as e:
               logging.error(f"Failed to initialize DeepSeek provider: {e}")
     else:
@@ -702,7 +3788,10 @@ if __name__ == "__main__":
              providers_to_run.append(LLMProvider(provider_name="Qwen",
                                                 model_name="qwen-plus", # Example model
                                                 api_key=qwen_api_key,
-                                                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1")) # Default OpenAI URL
+                                                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1", # Default OpenAI URL
+                                                response_cache=response_cache,
+                                                stream_completions=args.stream_completions,
+                                                request_timeout=args.request_timeout))
          except Exception as e:
               logging.error(f"Failed to initialize Qwen provider: {e}")
     else:
@@ -721,14 +3810,20 @@ if __name__ == "__main__":
     evaluator = Evaluator()
 
     # --- Configure and Run Evaluation ---
-    results_output_file = "multi_provider_evaluation.json"
+    results_output_file = args.output or (f"multi_provider_evaluation.shard{args.shard[0]}of{args.shard[1]}.json"
+                                          if args.shard else "multi_provider_evaluation.json")
     save_interval = 10 # Save results every 10 completed task/provider pairs
     max_concurrent_requests = 5 # Limit concurrent requests per provider endpoint rules
 
     runner = EvaluationRunner(data_loader, data_transformer, providers_to_run, evaluator,
                               output_json_path=results_output_file,
                               checkpoint_interval=save_interval,
-                              concurrency_limit=max_concurrent_requests)
+                              concurrency_limit=max_concurrent_requests,
+                              shard=args.shard,
+                              batch_mode=args.batch,
+                              batch_poll_interval=args.batch_poll_interval,
+                              time_budget=args.time_budget,
+                              results_db=args.results_db)
 
     # Run the evaluation (synchronous call that manages async internally)
     provider_accuracies, detailed_results = runner.run_evaluation()
@@ -0,0 +1,164 @@
+"""
+In-process stand-in for the parts of AsyncOpenAI that main.py uses: chat
+completions (plain and streamed), files and batches. Tests patch it in with
+use_fake(), so no HTTP server or network is needed.
+
+`respond(body)` decides each reply from the request body: return the answer text,
+or an exception instance to raise it (see status_error for API errors).
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import sys
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Union
+from unittest import mock
+
+import httpx
+from openai import APIStatusError, BadRequestError, InternalServerError, RateLimitError
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import AsyncLLMClient
+
+USAGE = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+
+
+def completion_body(text: str, model: str = "m") -> Dict[str, Any]:
+    return {"id": "c", "object": "chat.completion", "created": 0, "model": model, "usage": USAGE,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}]}
+
+
+def status_error(status: int, headers: Optional[Dict[str, str]] = None) -> APIStatusError:
+    """An APIStatusError subclass instance for `status`, as the SDK raises it."""
+    request = httpx.Request("POST", "http://fake/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    error_class = {400: BadRequestError, 429: RateLimitError}.get(status, InternalServerError if status >= 500 else APIStatusError)
+    return error_class(f"Error code: {status}", response=response, body=None)
+
+
+class FakeStream:
+    """Async iterator of chat.completion.chunk objects, one per piece of text, then a usage chunk."""
+
+    def __init__(self, pieces: List[str]):
+        self.pieces = pieces
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for piece in self.pieces:
+            await asyncio.sleep(0)
+            self.sent += 1
+            yield ChatCompletionChunk.model_validate({
+                "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        yield ChatCompletionChunk.model_validate({"id": "c", "object": "chat.completion.chunk", "created": 0,
+                                                  "model": "m", "choices": [], "usage": USAGE})
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeOpenAI:
+    """
+    Records every chat request in `calls` and answers it with `respond`.
+
+    `delay` is seconds per request, or a function of the request's index (0-based) for
+    requests of different speed. Streamed replies are split into `stream_piece`-character
+    chunks. Batches complete on the first retrieve() and answer each line with `respond`;
+    `batch_output` can rewrite the output records before they are served.
+    """
+
+    def __init__(self, respond: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 delay: Union[float, Callable[[int], float]] = 0.0,
+                 stream_piece: int = 2, batch_output: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None):
+        self.respond = respond or (lambda body: "A")
+        self.delay = delay
+        self.stream_piece = stream_piece
+        self.batch_output = batch_output
+        self.calls: List[Dict[str, Any]] = []
+        self.streams: List[FakeStream] = []
+        self.batches_created = 0
+        self.batches_cancelled: List[str] = []
+        self._files: Dict[str, str] = {}
+        self._batches: Dict[str, SimpleNamespace] = {}
+        self._ids = itertools.count()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.files = SimpleNamespace(create=self._file_create, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._batch_create, retrieve=self._batch_retrieve,
+                                       cancel=self._batch_cancel)
+
+    async def _create(self, **body):
+        self.calls.append(body)
+        delay = self.delay(len(self.calls) - 1) if callable(self.delay) else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        reply = self.respond(body)
+        if isinstance(reply, BaseException):
+            raise reply
+        if body.get('stream'):
+            stream = FakeStream([reply[i:i + self.stream_piece] for i in range(0, len(reply), self.stream_piece)])
+            self.streams.append(stream)
+            return stream
+        return ChatCompletion.model_validate(completion_body(reply, body.get('model', 'm')))
+
+    # --- Files and batches ---
+    async def _file_create(self, file, purpose):
+        file_id = f"file-{next(self._ids)}"
+        self._files[file_id] = file[1].decode('utf-8')
+        return SimpleNamespace(id=file_id)
+
+    async def _file_content(self, file_id):
+        return SimpleNamespace(text=self._files[file_id])
+
+    async def _batch_create(self, input_file_id, endpoint, completion_window):
+        self.batches_created += 1
+        batch = SimpleNamespace(id=f"batch-{next(self._ids)}", status='in_progress', input_file_id=input_file_id,
+                                output_file_id=None, error_file_id=None, request_counts=None)
+        self._batches[batch.id] = batch
+        return batch
+
+    async def _batch_retrieve(self, batch_id):
+        batch = self._batches[batch_id]
+        if batch.status == 'in_progress':
+            records = []
+            for line in self._files[batch.input_file_id].splitlines():
+                request = json.loads(line)
+                self.calls.append(request['body'])
+                reply = self.respond(request['body'])
+                if isinstance(reply, BaseException):
+                    records.append({"custom_id": request['custom_id'], "response": {"status_code": 500, "body": {
+                        "error": {"message": str(reply)}}}})
+                else:
+                    records.append({"custom_id": request['custom_id'], "response": {
+                        "status_code": 200, "body": completion_body(reply, request['body']['model'])}})
+            if self.batch_output:
+                records = self.batch_output(records)
+            batch.output_file_id = f"file-{next(self._ids)}"
+            self._files[batch.output_file_id] = "".join(json.dumps(record) + "\n" for record in records)
+            batch.status = 'completed'
+        return SimpleNamespace(**vars(batch))
+
+    async def _batch_cancel(self, batch_id):
+        self.batches_cancelled.append(batch_id)
+        self._batches[batch_id].status = 'cancelled'
+        return SimpleNamespace(**vars(self._batches[batch_id]))
+
+
+def use_fake(fake: FakeOpenAI) -> contextlib.AbstractContextManager:
+    """Makes every AsyncLLMClient talk to `fake` instead of the shared AsyncOpenAI client."""
+    return mock.patch.object(AsyncLLMClient, 'client', new=property(lambda self: fake))
+
+
+def write_tasks(path: str, tasks: List[Dict[str, Any]]) -> str:
+    """Writes task rows as a JSONL dataset and returns its path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for task in tasks:
+            f.write(json.dumps(task) + "\n")
+    return path
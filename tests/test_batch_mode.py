@@ -0,0 +1,73 @@
+"""
+Batch API mode end to end against the in-process fake files/batches client: results
+are recorded and scored, and a provider whose batch run crashes is reported
+without losing the other providers' results.
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.WARNING)
+
+from fake_openai import FakeOpenAI, use_fake, write_tasks
+from main import DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider
+
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A" if i % 2 else "B"}
+         for i in range(6)]
+
+
+class BatchModeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), TASKS)
+
+    def run_batch(self, fake, models=("m1",)):
+        providers = [LLMProvider("Fake", model, "k", base_url="http://fake/v1") for model in models]
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), providers, Evaluator(),
+                                  output_json_path=os.path.join(self.dir.name, "results.json"),
+                                  prewarm_connections=False, batch_mode=True, batch_poll_interval=0.01)
+        with use_fake(fake):
+            accuracies, results = runner.run_evaluation()
+        return runner, accuracies, results
+
+    def test_records_and_scores_batch_output(self):
+        fake = FakeOpenAI(respond=lambda body: "A")
+        runner, accuracies, results = self.run_batch(fake, models=("m1", "m2"))
+        self.assertEqual(fake.batches_created, 2)
+        self.assertEqual(len(results), 12)
+        self.assertEqual(accuracies, {"Fake__m1": 0.5, "Fake__m2": 0.5})
+        self.assertEqual(runner.failed_count, 0)
+
+    def test_resume_skips_recorded_requests(self):
+        self.run_batch(FakeOpenAI())
+        fake = FakeOpenAI()
+        _, _, results = self.run_batch(fake)
+        self.assertEqual(fake.batches_created, 0)
+        self.assertEqual(len(results), 6)
+
+    def test_crashed_provider_run_is_reported(self):
+        def corrupt_m2(records):
+            for record in records:
+                if record["response"]["body"]["model"] == "m2":
+                    record["response"]["body"] = {"choices": "not a list"}
+            return records
+
+        fake = FakeOpenAI(batch_output=corrupt_m2)
+        logging.disable(logging.NOTSET)
+        try:
+            with self.assertLogs(level=logging.ERROR) as logs:
+                runner, accuracies, results = self.run_batch(fake, models=("m1", "m2"))
+        finally:
+            logging.disable(logging.WARNING)
+        self.assertTrue(any("Batch run for Fake__m2 failed" in line for line in logs.output))
+        self.assertEqual(accuracies, {"Fake__m1": 0.5})
+        self.assertEqual(len(results), 6)
+        self.assertEqual(runner.failed_count, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+CircuitBreaker: which errors count as failures, opening on the recent failure
+rate, half-open probes, the doubling open period, max_wait, and requests deferred
+by the client while a provider is down.
+"""
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from openai import APITimeoutError
+import httpx
+
+from fake_openai import FakeOpenAI, status_error, use_fake
+from main import CircuitBreaker, CircuitOpenError, LLMProvider, RetryPolicy, Task
+
+
+class Outage(Exception):
+    pass
+
+
+async def call(breaker, error=None):
+    """One request through the breaker, failing with `error` if given."""
+    async with breaker.guard():
+        if error is not None:
+            raise error
+
+
+async def fail(breaker, count, status=500):
+    for _ in range(count):
+        try:
+            await call(breaker, status_error(status))
+        except Exception:
+            pass
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_failures_are_server_side_errors(self):
+        timeout = APITimeoutError(request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+        for error in (status_error(500), status_error(503), timeout, asyncio.TimeoutError()):
+            self.assertTrue(CircuitBreaker.is_failure(error), error)
+        for error in (status_error(429), status_error(400), Outage()):
+            self.assertFalse(CircuitBreaker.is_failure(error), error)
+
+    def test_opens_on_failure_rate_of_recent_requests(self):
+        breaker = CircuitBreaker("p", failure_rate=0.5, window=4, min_requests=4)
+
+        async def run():
+            await call(breaker)
+            await call(breaker)
+            await fail(breaker, 1)
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED) # 3 outcomes < min_requests
+            await fail(breaker, 1)
+        asyncio.run(run())
+        self.assertEqual((breaker.state, breaker.trips), (CircuitBreaker.OPEN, 1))
+
+    def test_rate_limits_do_not_open(self):
+        breaker = CircuitBreaker("p", window=4, min_requests=2)
+        asyncio.run(fail(breaker, 6, status=429))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_probe_success_closes_and_releases_waiters(self):
+        breaker = CircuitBreaker("p", min_requests=1, window=1, open_seconds=0.05)
+
+        async def run():
+            await fail(breaker, 1)
+            started = asyncio.get_running_loop().time()
+            await asyncio.gather(*(call(breaker) for _ in range(5)))
+            return asyncio.get_running_loop().time() - started
+        waited = asyncio.run(run())
+        self.assertGreaterEqual(waited, 0.04)
+        self.assertEqual((breaker.state, breaker.deferred), (CircuitBreaker.CLOSED, 5))
+
+    def test_failed_probe_doubles_open_period(self):
+        breaker = CircuitBreaker("p", min_requests=1, window=1, open_seconds=0.02, max_open_seconds=0.05)
+
+        async def run():
+            await fail(breaker, 1)
+            periods = [breaker._open_seconds]
+            for _ in range(2):
+                await fail(breaker, 1) # Waits for half-open, then fails as the probe
+                periods.append(breaker._open_seconds)
+            return periods
+        self.assertEqual(asyncio.run(run()), [0.02, 0.04, 0.05])
+        self.assertEqual((breaker.state, breaker.trips), (CircuitBreaker.OPEN, 3))
+
+    def test_waiters_fail_after_max_wait(self):
+        breaker = CircuitBreaker("p", min_requests=1, window=1, open_seconds=10.0, max_wait=0.05)
+
+        async def run():
+            await fail(breaker, 1)
+            await call(breaker)
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(run())
+
+    def test_client_defers_requests_while_open(self):
+        # Two server errors open the circuit; the requests they belong to wait for the
+        # probe instead of using up their attempts, so both succeed with max_attempts=2.
+        outcomes = [status_error(500), status_error(500)]
+        fake = FakeOpenAI(respond=lambda body: outcomes.pop(0) if outcomes else "A")
+        breaker = CircuitBreaker("p", min_requests=2, window=2, open_seconds=0.05)
+        provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", circuit_breaker=breaker,
+                               retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01))
+        tasks = [Task(id=str(i), question="Pick one.", options={"A": "x", "B": "y"}, answer="A") for i in range(2)]
+
+        async def run():
+            return await asyncio.gather(*(provider.client.complete(task) for task in tasks))
+        with use_fake(fake):
+            completions = asyncio.run(run())
+        self.assertEqual([c.response for c in completions], ["A", "A"])
+        self.assertEqual((breaker.trips, breaker.state), (1, CircuitBreaker.CLOSED))
+        self.assertEqual(len(fake.calls), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+ClientRegistry: one AsyncOpenAI client (and connection pool) per endpoint and key,
+bound to the event loop it is used on, and the shared loop runs coroutines.
+"""
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.CRITICAL)
+
+from main import ClientRegistry
+
+
+class ClientRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(http2=False)
+
+    def test_clients_are_shared_per_endpoint_and_key(self):
+        first = self.registry.get("http://a/v1", "k1")
+        self.assertIs(self.registry.get("http://a/v1", "k1"), first)
+        self.assertIsNot(self.registry.get("http://a/v1", "k2"), first)
+        self.assertIsNot(self.registry.get("http://b/v1", "k1"), first)
+
+    def test_clients_are_private_to_their_loop(self):
+        async def client():
+            return self.registry.get("http://a/v1", "k1")
+        shared = self.registry.run(client())
+        self.assertIs(shared, self.registry.get("http://a/v1", "k1")) # Outside a loop: the shared loop's client
+        self.assertIsNot(asyncio.run(client()), shared)
+
+    def test_run_and_submit_use_the_shared_loop(self):
+        async def running_loop():
+            return asyncio.get_running_loop()
+        self.assertIs(self.registry.run(running_loop()), self.registry.loop)
+        self.assertIs(self.registry.submit(running_loop()).result(timeout=5), self.registry.loop)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+AdaptiveConcurrencyLimiter (AIMD): the limit grows with successes, is cut once per
+round on rate limits and timeouts, and caps the requests in flight.
+"""
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import status_error
+from main import AdaptiveConcurrencyLimiter
+
+
+async def use_slot(limiter, error=None, delay=0.0):
+    try:
+        async with limiter.slot():
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+    except Exception:
+        pass
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def test_additive_increase_per_round(self):
+        limiter = AdaptiveConcurrencyLimiter("p", initial_limit=4, max_limit=10)
+
+        async def run():
+            for _ in range(4): # One round at limit 4 adds about one slot
+                await use_slot(limiter)
+        asyncio.run(run())
+        self.assertEqual(limiter.current_limit, 4)
+        self.assertGreater(limiter.limit, 4.9)
+        asyncio.run(use_slot(limiter))
+        self.assertEqual(limiter.current_limit, 5)
+
+    def test_increase_is_capped(self):
+        limiter = AdaptiveConcurrencyLimiter("p", initial_limit=2, max_limit=3)
+
+        async def run():
+            for _ in range(50):
+                await use_slot(limiter)
+        asyncio.run(run())
+        self.assertEqual(limiter.current_limit, 3)
+
+    def test_rate_limit_halves_once_per_round(self):
+        limiter = AdaptiveConcurrencyLimiter("p", initial_limit=8, min_limit=1)
+
+        async def run():
+            # Eight requests in flight together all hit a 429: one cut, not eight
+            await asyncio.gather(*(use_slot(limiter, status_error(429), delay=0.01) for _ in range(8)))
+        asyncio.run(run())
+        self.assertEqual(limiter.current_limit, 4)
+        self.assertEqual(limiter.throttled, 8)
+        asyncio.run(use_slot(limiter, asyncio.TimeoutError())) # A later request cuts again
+        self.assertEqual(limiter.current_limit, 2)
+
+    def test_other_errors_do_not_cut(self):
+        limiter = AdaptiveConcurrencyLimiter("p", initial_limit=8)
+        asyncio.run(use_slot(limiter, status_error(500)))
+        self.assertEqual(limiter.current_limit, 8)
+        self.assertEqual(limiter.errors, 1)
+
+    def test_caps_requests_in_flight(self):
+        limiter = AdaptiveConcurrencyLimiter("p", initial_limit=3, max_limit=3)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(12)))
+        asyncio.run(run())
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
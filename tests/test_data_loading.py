@@ -0,0 +1,83 @@
+"""
+DataLoader behavior that task ids depend on: id prefixes of multi-file loads, and
+the same tasks (ids included) whether a file is loaded whole or streamed.
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.WARNING)
+
+import pandas as pd
+
+from fake_openai import write_tasks
+from main import DataLoader, DataTransformer
+
+ROWS = [
+    {"id": 1, "question": "Q1?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A"},
+    {"id": None, "question": "Q2?", "options": None, "answer": "True"},
+    {"id": 3, "question": "Q3?", "options": "{'A': 'x', 'B': 'y'}", "answer": "['A', 'B']"},
+    {"id": 4.5, "question": "Q4?", "options": None, "answer": 4},
+]
+
+
+class SourcePrefixTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def path(self, *parts):
+        full = os.path.join(self.dir.name, *parts)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return full
+
+    def test_files_in_one_directory_use_their_base_name(self):
+        paths = [write_tasks(self.path(name), [{"id": "t1", "question": "Q?"}]) for name in ("a.jsonl", "b.jsonl")]
+        ids = [task.id for task in DataLoader(paths, max_workers=1).load_tasks(DataTransformer())]
+        self.assertEqual(ids, ["a.jsonl:t1", "b.jsonl:t1"])
+
+    def test_same_named_files_in_different_directories_stay_distinct(self):
+        paths = [write_tasks(self.path(folder, "tasks.jsonl"), [{"id": "t1", "question": "Q?"}]) for folder in ("a", "b")]
+        transformer = DataTransformer()
+        ids = [task.id for task in DataLoader(paths, max_workers=1).load_tasks(transformer)]
+        self.assertEqual(ids, ["a/tasks.jsonl:t1", "b/tasks.jsonl:t1"])
+        self.assertEqual([task.id for task in DataLoader(paths).iter_tasks(transformer)], ids)
+
+    def test_source_listed_twice_is_rejected(self):
+        path = write_tasks(self.path("tasks.jsonl"), [{"id": "t1", "question": "Q?"}])
+        with self.assertRaises(ValueError):
+            DataLoader([path, path]).load_tasks(DataTransformer())
+
+
+class StreamingMatchesWholeFileTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def assert_same_tasks(self, path):
+        transformer = DataTransformer()
+        whole = DataLoader(path).load_tasks(transformer)
+        streamed = list(DataLoader(path, chunk_size=2).iter_tasks(transformer))
+        self.assertEqual([task.to_dict() for task in streamed], [task.to_dict() for task in whole])
+        return whole
+
+    def test_xlsx_with_blank_id(self):
+        path = os.path.join(self.dir.name, "tasks.xlsx")
+        pd.DataFrame(ROWS).to_excel(path, index=False) # The blank cell makes pandas read the id column as float
+        tasks = self.assert_same_tasks(path)
+        self.assertEqual([task.id for task in tasks], ["1", None, "3", "4.5"])
+
+    def test_csv(self):
+        path = os.path.join(self.dir.name, "tasks.csv")
+        pd.DataFrame(ROWS).to_csv(path, index=False)
+        self.assert_same_tasks(path)
+
+    def test_jsonl(self):
+        self.assert_same_tasks(write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), ROWS))
+
+
+if __name__ == '__main__':
+    unittest.main()
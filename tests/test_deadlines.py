@@ -0,0 +1,80 @@
+"""
+Per-request deadlines (request_timeout, retried like other timeouts) and the run's
+time budget: unfinished requests are cancelled, counted as cut off and left
+unrecorded for the next run.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake, write_tasks
+from main import DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider, RetryPolicy, Task
+
+TASK = Task(id="t", question="Pick one.", options={"A": "x", "B": "y"}, answer="A")
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A"} for i in range(6)]
+FAST_REPLIES = 3
+
+
+def complete(fake, request_timeout):
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", circuit_breaker=False,
+                           request_timeout=request_timeout,
+                           retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01))
+    with use_fake(fake):
+        return asyncio.run(provider.client.complete(TASK))
+
+
+class RequestTimeoutTest(unittest.TestCase):
+    def test_timed_out_request_is_retried(self):
+        fake = FakeOpenAI(respond=lambda body: "A", delay=lambda index: 5.0 if index == 0 else 0.0)
+        started = time.monotonic()
+        completion = complete(fake, request_timeout=0.05)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual((completion.response, completion.attempts), ("A", 2))
+
+    def test_gives_up_after_last_attempt(self):
+        fake = FakeOpenAI(respond=lambda body: "A", delay=5.0)
+        completion = complete(fake, request_timeout=0.05)
+        self.assertIsNone(completion.response)
+        self.assertIn("timed out", completion.error)
+        self.assertEqual(len(fake.calls), 2)
+
+
+class TimeBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), TASKS)
+
+    def run_with(self, fake, time_budget=None):
+        provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1")
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), [provider], Evaluator(),
+                                  output_json_path=os.path.join(self.dir.name, "results.json"),
+                                  prewarm_connections=False, time_budget=time_budget)
+        with use_fake(fake):
+            _, results = runner.run_evaluation()
+        return runner, results
+
+    def test_unfinished_requests_are_cut_off_and_resumed(self):
+        slow = FakeOpenAI(respond=lambda body: "A", delay=lambda index: 0.0 if index < FAST_REPLIES else 30.0)
+        started = time.monotonic()
+        runner, results = self.run_with(slow, time_budget=0.3)
+        self.assertLess(time.monotonic() - started, 5.0)
+        self.assertEqual(len(results), FAST_REPLIES)
+        self.assertEqual(runner.cut_off_count, len(TASKS) - FAST_REPLIES)
+
+        fast = FakeOpenAI(respond=lambda body: "A")
+        runner, results = self.run_with(fast)
+        self.assertEqual(len(fast.calls), len(TASKS) - FAST_REPLIES)
+        self.assertEqual(sorted(result['task_id'] for result in results), sorted(task['id'] for task in TASKS))
+        self.assertEqual(runner.cut_off_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
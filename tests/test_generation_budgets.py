@@ -0,0 +1,57 @@
+"""
+Answer-type-aware generation budgets: the max_tokens and temperature sent for each
+answer shape, per-task overrides, and turning budgets off.
+"""
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake
+from main import AsyncLLMClient, LLMProvider, Task
+
+OPTIONS = {"A": "x", "B": "y", "C": "z"}
+
+
+def sent_params(task, **provider_args):
+    """(max_tokens, temperature) of the request the client sends for task."""
+    fake = FakeOpenAI()
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", circuit_breaker=False, **provider_args)
+    with use_fake(fake):
+        asyncio.run(provider.client.complete(task))
+    return fake.calls[0]["max_tokens"], fake.calls[0]["temperature"]
+
+
+class GenerationBudgetTest(unittest.TestCase):
+    def test_budget_per_answer_shape(self):
+        closed = AsyncLLMClient.CLOSED_ANSWER_TEMPERATURE
+        cases = [
+            (Task(id="b", question="Q?", answer=True), (AsyncLLMClient.BOOL_MAX_TOKENS, closed)),
+            (Task(id="n", question="Q?", answer=4.5), (AsyncLLMClient.NUMBER_MAX_TOKENS, closed)),
+            (Task(id="o", question="Q?", options=OPTIONS, answer="B"), (AsyncLLMClient.OPTION_KEY_MAX_TOKENS + 1, closed)),
+            (Task(id="l", question="Q?", options=OPTIONS, answer=["A", "C"]),
+             (AsyncLLMClient.LIST_BASE_MAX_TOKENS + 3 * AsyncLLMClient.LIST_MAX_TOKENS_PER_OPTION, closed)),
+            (Task(id="f", question="Q?", answer="free text"),
+             (AsyncLLMClient.DEFAULT_MAX_TOKENS, AsyncLLMClient.DEFAULT_TEMPERATURE)),
+        ]
+        for task, expected in cases:
+            self.assertEqual(sent_params(task), expected, task.id)
+
+    def test_dataset_columns_override(self):
+        task = Task.from_dict({"id": "t", "question": "Q?", "answer": True, "max_tokens": "64", "temperature": 0.7})
+        self.assertEqual(sent_params(task), (64, 0.7))
+        invalid = Task.from_dict({"id": "t", "question": "Q?", "answer": True, "max_tokens": "lots"})
+        self.assertEqual(sent_params(invalid), (AsyncLLMClient.BOOL_MAX_TOKENS, AsyncLLMClient.CLOSED_ANSWER_TEMPERATURE))
+
+    def test_budgets_can_be_disabled(self):
+        task = Task(id="b", question="Q?", answer=True)
+        self.assertEqual(sent_params(task, generation_budgets=False),
+                         (AsyncLLMClient.DEFAULT_MAX_TOKENS, AsyncLLMClient.DEFAULT_TEMPERATURE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Hedged requests: a duplicate is sent once a request outlasts the latency
+percentile, the first answer wins and the other request is cancelled, within the
+hedge budget.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake
+from main import AsyncLLMClient, LLMProvider, Task
+
+TASK = Task(id="t", question="Q?", answer=True)
+WARMUP = AsyncLLMClient.HEDGE_MIN_SAMPLES
+
+
+def run_requests(fake, count, **provider_args):
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", hedge_percentile=90, circuit_breaker=False,
+                           **provider_args)
+
+    async def run():
+        return [await provider.client.complete(TASK) for _ in range(count)]
+    with use_fake(fake):
+        return provider, asyncio.run(run())
+
+
+def slow_after_warmup(index):
+    """Fast warm-up requests, then one slow request; its duplicate is fast again."""
+    return 1.0 if index == WARMUP else 0.005
+
+
+class HedgingTest(unittest.TestCase):
+    def test_slow_request_is_hedged_and_hedge_wins(self):
+        fake = FakeOpenAI(respond=lambda body: "true", delay=slow_after_warmup)
+        started = time.monotonic()
+        provider, completions = run_requests(fake, WARMUP + 1, hedge_budget=1.0)
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual([c.hedged for c in completions[:WARMUP]], [None] * WARMUP)
+        self.assertEqual(completions[-1].hedged, "hedge")
+        self.assertIs(completions[-1].response, True)
+        self.assertEqual(len(fake.calls), WARMUP + 2)
+        self.assertEqual((provider.client.hedge_stats['hedged'], provider.client.hedge_stats['won']), (1, 1))
+
+    def test_no_hedging_before_enough_samples(self):
+        fake = FakeOpenAI(respond=lambda body: "true", delay=lambda index: 0.2 if index == 0 else 0.005)
+        _, completions = run_requests(fake, 1, hedge_budget=1.0)
+        self.assertIsNone(completions[0].hedged)
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_budget_limits_hedges(self):
+        fake = FakeOpenAI(respond=lambda body: "true", delay=slow_after_warmup)
+        provider, completions = run_requests(fake, WARMUP + 1, hedge_budget=0.0)
+        self.assertIsNone(completions[-1].hedged)
+        self.assertEqual(len(fake.calls), WARMUP + 1)
+        self.assertEqual(provider.client.hedge_stats['hedged'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+fast_literal_eval must behave exactly like ast.literal_eval: same value (and type)
+on success, same exception type on failure. Checked on hand-picked edge cases and
+on a seeded random corpus of spreadsheet-cell and model-reply shapes.
+
+Run with `python -m unittest discover -s tests` (or pytest) from the repository root.
+"""
+import ast
+import logging
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING)
+
+from main import fast_literal_eval
+
+# Fragments the fuzzer combines: the shapes the fast path handles plus the ones it
+# must leave to ast.literal_eval (escapes, exponents, underscores, prefixes, nesting...)
+ATOMS = ["'A'", '"B"', "'it''s'", "'a\\nb'", "1", "-2", "0", "007", "00", "1.5", "-.5", "1.", "1e3", "1_0",
+         "0x1F", "True", "False", "None", "true", "A", "abc", "if", "match", "'中文'", "中文", "'x\"y'", '"x\'y"',
+         "''", "1j", "+1", "- 1", "'\x00'", "'\ud800'", "9" * 120, "[1]", "(1,)", "{1}", "'a' 'b'", "b'x'",
+         "f'x'", " ", "\t", ",", ":", "]", "[", "}", "{", "\n", "# c", "'\\x41'", "'A]'", "'{'"]
+
+CORPUS_SIZE = 50000
+
+
+def random_text(rnd: random.Random) -> str:
+    """One fuzz input: a scalar, a flat-ish list or a flat-ish dict, often malformed."""
+    r = rnd.random()
+    if r < 0.3:
+        return rnd.choice(ATOMS) + (rnd.choice(["", " ", "\t", "\n", " x"]) if rnd.random() < 0.2 else "")
+    if r < 0.65:
+        elements = [rnd.choice(ATOMS) for _ in range(rnd.randint(0, 5))]
+        separators = [rnd.choice([", ", ",", " , ", " ", ",\t"]) for _ in elements]
+        body = "".join(element + separator for element, separator in zip(elements, separators))
+        if rnd.random() < 0.6:
+            body = body.rstrip(", \t")
+        return (rnd.choice(["", " ", "\t"]) + "[" + body + rnd.choice(["]", "]", " ]", ""]) +
+                rnd.choice(["", " ", "\n", "x"]))
+    pairs = [rnd.choice(ATOMS) + rnd.choice([": ", ":", " : ", " "]) + rnd.choice(ATOMS)
+             for _ in range(rnd.randint(0, 4))]
+    body = rnd.choice([", ", ","]).join(pairs) + rnd.choice(["", ","])
+    return "{" + body + rnd.choice(["}", "}", ""])
+
+
+def outcome(parse, text):
+    """What parse does with text: ('ok', type, repr) or ('error', exception type)."""
+    try:
+        value = parse(text)
+    except Exception as e:
+        return ('error', type(e).__name__)
+    return ('ok', type(value).__name__, repr(value))
+
+
+class FastLiteralEvalTest(unittest.TestCase):
+    def assert_same(self, text):
+        self.assertEqual(outcome(ast.literal_eval, text), outcome(fast_literal_eval, text), msg=repr(text))
+
+    def test_common_shapes(self):
+        for text in ["'A'", "4", "-3", "3.14", "True", "None", "['A', 'C']", "[1, 2.5, None]", "[]",
+                     "{'A': 'x', 'B': 'y'}", "{}", "  [ 'A' ,'B' ]\t", "A", "Some text answer", ""]:
+            self.assert_same(text)
+
+    def test_delegated_shapes(self):
+        for text in ["'a\\nb'", "1e3", "1_000", "0x1F", "[[1], [2]]", "(1, 2)", "{1, 2}", "b'x'", "1j",
+                     "'a' 'b'", "[1,]", "{'a': [1]}", "if", "007", "9" * 120]:
+            self.assert_same(text)
+
+    def test_non_string_input(self):
+        self.assertEqual(outcome(ast.literal_eval, 5), outcome(fast_literal_eval, 5))
+        self.assertEqual(outcome(ast.literal_eval, None), outcome(fast_literal_eval, None))
+
+    def test_fuzzed_corpus(self):
+        rnd = random.Random(7)
+        for _ in range(CORPUS_SIZE):
+            self.assert_same(random_text(rnd))
+
+
+if __name__ == '__main__':
+    unittest.main()
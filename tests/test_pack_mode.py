@@ -0,0 +1,76 @@
+"""
+Multi-question packing: closed-answer tasks sharing a context go out as one request,
+answers are demultiplexed by question number, and missing answers are re-sent alone.
+"""
+import asyncio
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake
+from main import AsyncLLMClient, LLMProvider, Task
+
+OPTIONS = {"A": "x", "B": "y"}
+TASKS = [Task(id="t1", text="ctx", question="Q1?", options=OPTIONS, answer="A"),
+         Task(id="t2", text="ctx", question="Q2?", answer=True),
+         Task(id="t3", text="ctx", question="Q3?", options=OPTIONS, answer=["A", "B"])]
+
+
+def is_pack(body):
+    return "numbered questions" in body["messages"][1]["content"]
+
+
+def complete_all(fake, tasks, pack_size=3):
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", pack_size=pack_size,
+                           circuit_breaker=False)
+
+    async def run():
+        return await asyncio.gather(*(provider.client.complete(task) for task in tasks))
+    with use_fake(fake):
+        return asyncio.run(run())
+
+
+class PackModeTest(unittest.TestCase):
+    def test_one_request_answers_the_whole_pack(self):
+        fake = FakeOpenAI(respond=lambda body: 'Sure: {"1": "A", "2": true, "3": ["A", "B"]}')
+        completions = complete_all(fake, TASKS)
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual([c.response for c in completions], ["A", True, ["A", "B"]])
+        self.assertEqual({c.packed for c in completions}, {3})
+        self.assertEqual({c.tokens for c in completions}, {4}) # 12 reported tokens split three ways
+
+    def test_missing_answers_are_resent_alone(self):
+        fake = FakeOpenAI(respond=lambda body: '{"1": "A", "3": ["B"]}' if is_pack(body) else "true")
+        completions = complete_all(fake, TASKS)
+        self.assertEqual(len(fake.calls), 2)
+        self.assertEqual([c.response for c in completions], ["A", True, ["B"]])
+        self.assertEqual([c.packed for c in completions], [3, 0, 3])
+
+    def test_pack_sent_after_linger_when_not_full(self):
+        fake = FakeOpenAI(respond=lambda body: '{"1": "A", "2": true}')
+        completions = complete_all(fake, TASKS[:2], pack_size=5)
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual([c.response for c in completions], ["A", True])
+
+    def test_only_closed_answers_with_same_context_are_packed(self):
+        tasks = [Task(id="f", text="ctx", question="Explain.", answer="free text"),
+                 Task(id="o", text="other", question="Q?", answer=True),
+                 Task(id="c", text="ctx", question="Q?", answer=False)]
+        fake = FakeOpenAI(respond=lambda body: "false")
+        complete_all(fake, tasks)
+        self.assertFalse(any(is_pack(body) for body in fake.calls))
+        self.assertEqual(len(fake.calls), 3)
+
+    def test_split_packed_response(self):
+        split = AsyncLLMClient._split_packed_response
+        self.assertEqual(split('{"1": "A", "Q2": true, "3.": 4, "9": "x", "4": ""}', 4), {1: "A", 2: True, 3: 4})
+        self.assertEqual(split("{1: 'A', 2: ['B']}", 2), {1: "A", 2: ["B"]})
+        self.assertEqual(split("no json here", 2), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
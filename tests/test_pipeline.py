@@ -0,0 +1,94 @@
+"""
+The worker pipeline: requests in flight stay within each provider's concurrency
+bound, a slow provider does not hold back the others, streaming input gives the
+same results, and failed tasks are left for the next run.
+"""
+import collections
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, status_error, use_fake, write_tasks
+from main import DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider
+
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A" if i % 3 else "B"}
+         for i in range(30)]
+
+
+class CountingFake(FakeOpenAI):
+    """Also records the most requests each model had in flight at once."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = collections.Counter()
+        self.peak = collections.Counter()
+
+    async def _create(self, **body):
+        model = body['model']
+        self.in_flight[model] += 1
+        self.peak[model] = max(self.peak[model], self.in_flight[model])
+        try:
+            return await super()._create(**body)
+        finally:
+            self.in_flight[model] -= 1
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), TASKS)
+
+    def run_with(self, fake, models=("m1", "m2"), output="results.json", **runner_args):
+        providers = [LLMProvider("Fake", model, "k", base_url="http://fake/v1") for model in models]
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), providers, Evaluator(),
+                                  output_json_path=os.path.join(self.dir.name, output),
+                                  prewarm_connections=False, **runner_args)
+        with use_fake(fake):
+            accuracies, results = runner.run_evaluation()
+        return runner, accuracies, results
+
+    def test_in_flight_requests_stay_within_bound(self):
+        fake = CountingFake(respond=lambda body: "A", delay=0.005)
+        _, accuracies, results = self.run_with(fake, concurrency_limit=2, max_concurrency=3)
+        self.assertEqual(len(results), 2 * len(TASKS))
+        self.assertEqual(set(fake.peak), {"m1", "m2"})
+        self.assertLessEqual(max(fake.peak.values()), 3)
+        self.assertEqual(accuracies, {"Fake__m1": 20 / 30, "Fake__m2": 20 / 30})
+
+    def test_slow_provider_does_not_hold_back_others(self):
+        fake = FakeOpenAI(respond=lambda body: "A")
+        fake.delay = lambda index: 30.0 if fake.calls[index]['model'] == "m1" else 0.0
+        started = time.monotonic()
+        runner, _, results = self.run_with(fake, concurrency_limit=2, max_concurrency=2, time_budget=0.5)
+        self.assertLess(time.monotonic() - started, 5.0)
+        self.assertEqual(collections.Counter(result['model_name'] for result in results), {"m2": len(TASKS)})
+        self.assertEqual(runner.cut_off_count, len(TASKS))
+
+    def test_streaming_input_gives_same_results(self):
+        _, accuracies, results = self.run_with(FakeOpenAI(respond=lambda body: "A"))
+        _, streamed_accuracies, streamed = self.run_with(FakeOpenAI(respond=lambda body: "A"), output="streamed.json",
+                                                         streaming=True, stream_batch_size=4)
+        key = lambda result: (result['task_id'], result['provider_identifier'])
+        self.assertEqual(streamed_accuracies, accuracies)
+        self.assertEqual(sorted((key(r), r['is_correct']) for r in streamed),
+                         sorted((key(r), r['is_correct']) for r in results))
+
+    def test_failed_tasks_are_retried_next_run(self):
+        fake = FakeOpenAI(respond=lambda body: status_error(400) if "Q7?" in body['messages'][-1]['content'] else "A")
+        runner, _, results = self.run_with(fake, models=("m1",))
+        self.assertEqual((len(results), runner.failed_count), (len(TASKS) - 1, 1))
+
+        fake = FakeOpenAI(respond=lambda body: "A")
+        runner, _, results = self.run_with(fake, models=("m1",))
+        self.assertEqual((len(fake.calls), len(results), runner.failed_count), (1, len(TASKS), 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Prefix-cache-friendly prompts: part order, compiled prompts shared through the
+bounded LRU, and context-grouped scheduling.
+"""
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.CRITICAL)
+
+from main import AsyncLLMClient, EvaluationRunner, Task
+
+
+class PromptLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.client = AsyncLLMClient("m", "k", base_url="http://fake/v1")
+
+    def test_parts_ordered_from_most_to_least_shared(self):
+        task = Task(id="t", text="CONTEXT", instruction="INSTRUCTION", question="QUESTION", options={"A": "OPTION"})
+        system, user = self.client._format_prompt(task)
+        self.assertEqual(system, {"role": "system", "content": AsyncLLMClient.SYSTEM_MESSAGE})
+        content = user["content"]
+        positions = [content.index(part) for part in ("CONTEXT", "INSTRUCTION", "QUESTION", "OPTION")]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_tasks_with_same_context_share_a_prefix(self):
+        first = self.client._format_prompt(Task(id="1", text="Long context", instruction="Pick", question="Q1?"))
+        second = self.client._format_prompt(Task(id="2", text="Long context", instruction="Pick", question="Q2?"))
+        prefix = first[1]["content"].split("--- Question ---")[0]
+        self.assertTrue(second[1]["content"].startswith(prefix))
+
+    def test_compiled_prompts_are_shared_and_bounded(self):
+        other_client = AsyncLLMClient("m2", "k", base_url="http://fake/v1")
+        task = Task(id="t", question="Q?")
+        self.assertIs(self.client._format_prompt(task), other_client._format_prompt(task))
+        size = AsyncLLMClient.PROMPT_CACHE_SIZE
+        AsyncLLMClient._prompt_cache.clear()
+        try:
+            AsyncLLMClient.PROMPT_CACHE_SIZE = 3
+            for index in range(10):
+                self.client._format_prompt(Task(id=str(index), question="Q?"))
+            self.assertEqual(len(AsyncLLMClient._prompt_cache), 3)
+        finally:
+            AsyncLLMClient.PROMPT_CACHE_SIZE = size
+        self.assertEqual(self.client._format_prompt({"question": "Q?"}), self.client._format_prompt(task))
+
+    def test_grouped_by_context_then_instruction(self):
+        tasks = [Task(id="1", text="a", instruction="x"), Task(id="2", text="b", instruction="x"),
+                 Task(id="3", text="a", instruction="y"), Task(id="4", text="a", instruction="x"),
+                 Task(id="5", text="b", instruction="x")]
+        ordered = EvaluationRunner._group_by_context(tasks)
+        self.assertEqual([task.id for task in ordered], ["1", "4", "3", "2", "5"])
+
+
+if __name__ == '__main__':
+    unittest.main()
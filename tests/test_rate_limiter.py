@@ -0,0 +1,83 @@
+"""
+TokenBucket and RateLimiter: bursts up to the bucket size, waits at the refill rate
+beyond it, oversized charges that still respect the long-run rate, and settling
+token charges to the reported usage.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, USAGE, use_fake
+from main import LLMProvider, RateLimiter, Task, TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill_rate(self):
+        async def run():
+            bucket = TokenBucket(rate=20.0, capacity=2.0)
+            waits = [await bucket.acquire(1) for _ in range(4)]
+            return waits
+        waits = asyncio.run(run())
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertGreater(waits[2], 0.03) # ~1/20 s per unit once the burst is spent
+        self.assertLess(sum(waits), 0.3)
+
+    def test_oversized_request_drives_level_negative(self):
+        async def run():
+            bucket = TokenBucket(rate=100.0, capacity=2.0)
+            await bucket.acquire(10) # Waits only for a full bucket
+            self.assertLess(bucket.level, -7)
+            return await bucket.acquire(1) # Pays back the overdraft first
+        self.assertGreater(asyncio.run(run()), 0.07)
+
+    def test_waiters_are_served_in_order(self):
+        async def run():
+            bucket = TokenBucket(rate=50.0, capacity=1.0)
+            order = []
+
+            async def take(index):
+                await bucket.acquire(1)
+                order.append(index)
+            await asyncio.gather(*(take(index) for index in range(5)))
+            return order
+        self.assertEqual(asyncio.run(run()), [0, 1, 2, 3, 4])
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_rpm_budget(self):
+        async def run():
+            limiter = RateLimiter(rpm=1200, burst_seconds=0.1) # 20 requests/s, bursts of 2
+            started = time.monotonic()
+            for _ in range(4):
+                await limiter.acquire(0)
+            return time.monotonic() - started, limiter.wait_seconds
+        elapsed, waited = asyncio.run(run())
+        self.assertGreater(elapsed, 0.08)
+        self.assertGreater(waited, 0.08)
+
+    def test_settle_returns_unused_tokens(self):
+        async def run():
+            limiter = RateLimiter(tpm=600, burst_seconds=1.0) # 10 tokens/s, bucket of 10
+            await limiter.acquire(10)
+            limiter.settle(10, 2)
+            await limiter.acquire(8) # Fits without waiting thanks to the refund
+            return limiter.wait_seconds
+        self.assertLess(asyncio.run(run()), 0.05)
+
+    def test_client_charges_estimate_and_settles_to_usage(self):
+        provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", tpm=600, circuit_breaker=False)
+        bucket = provider.rate_limiter.tokens
+        with use_fake(FakeOpenAI()):
+            asyncio.run(provider.client.complete(Task(id="t1", question="Q?", answer="A")))
+        # Everything charged beyond the reported usage was returned
+        self.assertAlmostEqual(bucket.capacity - bucket.level, USAGE["total_tokens"], delta=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
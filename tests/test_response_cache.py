@@ -0,0 +1,93 @@
+"""
+ResponseCache: content-addressed keys, persistence across instances, the three
+modes, LRU eviction by size, and hits replacing API calls in the client.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake
+from main import LLMProvider, ResponseCache, Task
+
+MESSAGES = [{"role": "user", "content": "Q?"}]
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "cache.sqlite")
+
+    def cache(self, **kwargs):
+        cache = ResponseCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_key_covers_every_request_parameter(self):
+        base = ResponseCache.make_key("m", "http://a/v1", MESSAGES, 0.0, 5)
+        self.assertEqual(base, ResponseCache.make_key("m", "http://a/v1", [dict(MESSAGES[0])], 0.0, 5))
+        variants = [("m2", "http://a/v1", MESSAGES, 0.0, 5), ("m", "http://b/v1", MESSAGES, 0.0, 5),
+                    ("m", "http://a/v1", [{"role": "user", "content": "Q2?"}], 0.0, 5),
+                    ("m", "http://a/v1", MESSAGES, 0.5, 5), ("m", "http://a/v1", MESSAGES, 0.0, 6)]
+        self.assertEqual(len({ResponseCache.make_key(*variant) for variant in variants} | {base}), 6)
+        self.assertNotEqual(ResponseCache.early_stop_key(base), base)
+
+    def test_persists_and_counts_hits(self):
+        self.cache().put("k", "A", 1.5)
+        cache = self.cache()
+        self.assertEqual(cache.get("k"), "A")
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual((cache.hits, cache.misses, cache.saved_seconds), (1, 1, 1.5))
+
+    def test_fallback_key(self):
+        cache = self.cache()
+        cache.put("early", "4", 0.1)
+        self.assertIsNone(cache.get("full"))
+        self.assertEqual(cache.get("full", fallback="early"), "4")
+        cache.put("full", "4 apples", 0.2)
+        self.assertEqual(cache.get("full", fallback="early"), "4 apples")
+
+    def test_modes(self):
+        self.cache().put("k", "A", 0.1)
+        read_only = self.cache(mode='read-only')
+        self.assertEqual(read_only.get("k"), "A")
+        read_only.put("k2", "B", 0.1)
+        self.assertIsNone(self.cache().get("k2"))
+        bypass = self.cache(mode='bypass')
+        self.assertIsNone(bypass.get("k"))
+        with self.assertRaises(ValueError):
+            ResponseCache(self.path, mode='write-only')
+
+    def test_evicts_least_recently_used(self):
+        cache = self.cache(max_bytes=200)
+        for index in range(4):
+            cache.put(f"key{index}", "x" * 40, 0.1)
+            time.sleep(0.002)
+        cache.get("key0") # Recently used, so kept
+        time.sleep(0.002)
+        cache.put("key4", "x" * 40, 0.1)
+        self.assertEqual(cache.get("key0"), "x" * 40)
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key4"), "x" * 40)
+
+    def test_hit_replaces_the_api_call(self):
+        task = Task(id="t1", question="Pick one.", options={"A": "x", "B": "y"}, answer="A")
+        fake = FakeOpenAI()
+        for _ in range(2):
+            provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", response_cache=self.cache(),
+                                   circuit_breaker=False)
+            with use_fake(fake):
+                completion = asyncio.run(provider.client.complete(task))
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual((completion.cached, completion.attempts, completion.response), (True, 0, "A"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+ResultLog: appending and reading records, cutting off a torn last line (or only
+skipping it when reading read-only), and the runner replaying and compacting a
+log left behind by an interrupted run.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake, write_tasks
+from main import DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider, ResultLog, merge_result_files
+
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A"} for i in range(4)]
+
+
+class ResultLogTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.log = ResultLog(os.path.join(self.dir.name, "results.jsonl"))
+        self.addCleanup(self.log.clear)
+
+    def test_path_next_to_results_file(self):
+        self.assertEqual(ResultLog.path_for("out/results.json"), "out/results.jsonl")
+        self.assertEqual(ResultLog.path_for("out/results"), "out/results.jsonl")
+
+    def test_append_flush_read(self):
+        self.assertEqual(self.log.read(), [])
+        self.log.append({"n": 1})
+        self.log.append({"n": 2})
+        self.assertEqual(self.log.unflushed, 2)
+        self.log.flush()
+        self.assertEqual(self.log.unflushed, 0)
+        self.assertEqual(ResultLog(self.log.path).read(), [{"n": 1}, {"n": 2}])
+        self.log.clear()
+        self.assertFalse(self.log.exists())
+
+    def test_torn_last_line_is_truncated(self):
+        with open(self.log.path, 'w', encoding='utf-8') as f:
+            f.write('{"n": 1}\nnot json\n{"n": 2}\n{"n": 3, "tor')
+        self.assertEqual(self.log.read(), [{"n": 1}, {"n": 2}]) # Unreadable complete line skipped
+        self.log.append({"n": 4})
+        self.log.flush()
+        self.assertEqual(ResultLog(self.log.path).read(), [{"n": 1}, {"n": 2}, {"n": 4}])
+
+    def test_read_only_leaves_torn_line_in_place(self):
+        content = '{"n": 1}\n{"n": 2, "tor'
+        with open(self.log.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.assertEqual(self.log.read(truncate=False), [{"n": 1}])
+        with open(self.log.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), content)
+
+
+class ResultLogReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), TASKS)
+        self.output = os.path.join(self.dir.name, "results.json")
+
+    def run_with(self, fake):
+        provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1")
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), [provider], Evaluator(),
+                                  output_json_path=self.output, prewarm_connections=False)
+        with use_fake(fake):
+            return runner.run_evaluation()
+
+    def interrupt(self):
+        """Rewrites a finished run as one that crashed: two results compacted, the rest only logged."""
+        with open(self.output, encoding='utf-8') as f:
+            results = json.load(f)
+        with open(self.output, 'w', encoding='utf-8') as f:
+            json.dump(results[:2], f)
+        with open(ResultLog.path_for(self.output), 'w', encoding='utf-8') as f:
+            for result in results[1:]: # results[1] was logged again before the crash
+                f.write(json.dumps(result) + "\n")
+            f.write('{"task_id": "t9", "provid')
+        return results
+
+    def test_log_is_replayed_and_compacted(self):
+        self.run_with(FakeOpenAI(respond=lambda body: "A"))
+        self.assertFalse(os.path.exists(ResultLog.path_for(self.output))) # Compacted at the end of the run
+        results = self.interrupt()
+
+        fake = FakeOpenAI(respond=lambda body: "A")
+        accuracies, replayed = self.run_with(fake)
+        self.assertEqual(fake.calls, [])
+        self.assertEqual(len(replayed), len(TASKS))
+        self.assertEqual(accuracies, {"Fake__m": 1.0})
+        self.assertFalse(os.path.exists(ResultLog.path_for(self.output)))
+        with open(self.output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), results)
+
+    def test_merge_reads_logs_without_truncating(self):
+        self.run_with(FakeOpenAI(respond=lambda body: "A"))
+        self.interrupt()
+        log_size = os.path.getsize(ResultLog.path_for(self.output))
+        merged = os.path.join(self.dir.name, "merged.json")
+        self.assertEqual(merge_result_files([self.output], merged), {"Fake__m": 1.0})
+        with open(merged, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)), len(TASKS))
+        self.assertEqual(os.path.getsize(ResultLog.path_for(self.output)), log_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
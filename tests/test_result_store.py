@@ -0,0 +1,97 @@
+"""
+ResultStore: buffered adds visible to lookups before they are written, one row per
+task/provider, accuracy computed in SQL, and resuming a results_db run without
+resending finished combinations.
+"""
+import collections
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake, write_tasks
+from main import (DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider, ResultStore, Task,
+                  TaskResult)
+
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A" if i % 2 else "B"}
+         for i in range(6)]
+
+
+def result(task_id, provider_id, is_correct):
+    return TaskResult(Task(id=task_id, question="Q?", answer="A"), provider_id, "Fake", "m", "A", is_correct)
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "results.sqlite")
+        self.store = ResultStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def test_added_results_are_found_before_and_after_flush(self):
+        self.store.add(result("t1", "p", True))
+        self.assertIn(("t1", "p"), self.store)
+        self.assertNotIn(("t1", "q"), self.store)
+        self.assertEqual(len(self.store), 1)
+        self.store.flush()
+        reopened = ResultStore(self.path)
+        self.addCleanup(reopened.close)
+        self.assertIn(("t1", "p"), reopened)
+        self.assertEqual(len(reopened), 1)
+
+    def test_one_row_per_combination_first_kept(self):
+        self.store.add(result("t1", "p", True))
+        self.store.flush()
+        self.store.add(result("t1", "p", False))
+        self.store.add(result("t2", "p", None))
+        self.store.flush()
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual([(r.task_id, r.is_correct) for r in self.store.iter_results()], [("t1", True), ("t2", None)])
+
+    def test_accuracy_counts_skip_unevaluated(self):
+        for task_id, provider_id, is_correct in (("t1", "p", True), ("t2", "p", False), ("t3", "p", None),
+                                                 ("t1", "q", True), ("t1", "other", False)):
+            self.store.add(result(task_id, provider_id, is_correct))
+        self.store.flush()
+        self.assertEqual(self.store.accuracy_counts(["p", "q", "r"]), {
+            "p": {"correct": 1, "evaluated": 2}, "q": {"correct": 1, "evaluated": 1},
+            "r": {"correct": 0, "evaluated": 0}})
+
+
+class ResultStoreResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = os.path.join(self.dir.name, "tasks.jsonl")
+
+    def run_with(self, fake, tasks, models=("m1", "m2")):
+        write_tasks(self.data, tasks)
+        providers = [LLMProvider("Fake", model, "k", base_url="http://fake/v1") for model in models]
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), providers, Evaluator(),
+                                  output_json_path=os.path.join(self.dir.name, "results.json"),
+                                  prewarm_connections=False, results_db=os.path.join(self.dir.name, "results.sqlite"))
+        self.addCleanup(runner.result_store.close)
+        with use_fake(fake):
+            return runner.run_evaluation()
+
+    def test_resume_skips_finished_combinations(self):
+        first = FakeOpenAI(respond=lambda body: "A")
+        self.run_with(first, TASKS[:4], models=("m1",))
+        self.assertEqual(len(first.calls), 4)
+
+        second = FakeOpenAI(respond=lambda body: "A")
+        accuracies, results = self.run_with(second, TASKS)
+        sent = collections.Counter(body['model'] for body in second.calls)
+        self.assertEqual(sent, {"m1": 2, "m2": 6}) # t4, t5 for m1; everything for m2
+        self.assertEqual(len(results), 12)
+        self.assertEqual(accuracies, {"Fake__m1": 0.5, "Fake__m2": 0.5})
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, "results.json")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+ResultWriter: writes run in order on their own thread, failed writes are logged,
+and wait_for_room() holds coroutines back while too many are outstanding. Also
+SIGINT/SIGTERM during a run: recorded results are written before the signal takes
+its course, and the next run resumes after them.
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from fake_openai import FakeOpenAI, use_fake, write_tasks
+from main import DataLoader, DataTransformer, EvaluationRunner, Evaluator, LLMProvider, ResultLog, ResultWriter
+
+TASKS = [{"id": f"t{i}", "question": f"Q{i}?", "options": "{'A': 'x', 'B': 'y'}", "answer": "A"} for i in range(10)]
+SIGNALLED_AT = 4 # Requests answered before the signal arrives
+
+
+class Terminated(Exception):
+    pass
+
+
+class ResultWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.writer = ResultWriter(max_pending=2)
+        self.addCleanup(self.writer._executor.shutdown)
+
+    def test_jobs_run_in_order_off_the_calling_thread(self):
+        ran = []
+        for index in range(5):
+            self.writer.submit(lambda index=index: ran.append((index, threading.current_thread().name)))
+        self.writer.drain()
+        self.assertEqual([index for index, _ in ran], list(range(5)))
+        self.assertTrue(all(name.startswith('result-writer') for _, name in ran))
+
+    def test_failed_job_does_not_stop_later_ones(self):
+        ran = []
+        self.writer.submit(lambda: 1 / 0)
+        self.writer.submit(lambda: ran.append(True))
+        self.writer.drain()
+        self.assertEqual(ran, [True])
+
+    def test_wait_for_room_applies_backpressure(self):
+        release = threading.Event()
+
+        async def run():
+            for _ in range(2):
+                self.writer.submit(release.wait)
+            waiter = asyncio.ensure_future(self.writer.wait_for_room())
+            await asyncio.sleep(0.05)
+            blocked = not waiter.done()
+            release.set()
+            await asyncio.wait_for(waiter, 5.0)
+            return blocked
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(self.writer.stalls, 1)
+        asyncio.run(self.writer.wait_for_room()) # Room again: no further stall
+        self.assertEqual(self.writer.stalls, 1)
+
+
+class SignalFlushTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.data = write_tasks(os.path.join(self.dir.name, "tasks.jsonl"), TASKS)
+        self.output = os.path.join(self.dir.name, "results.json")
+
+    def run_with(self, fake):
+        # One request at a time and no checkpoint before the signal, so exactly
+        # SIGNALLED_AT results are recorded and only the signal handler writes them
+        provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1")
+        runner = EvaluationRunner(DataLoader(self.data), DataTransformer(), [provider], Evaluator(),
+                                  output_json_path=self.output, prewarm_connections=False, checkpoint_interval=1000,
+                                  concurrency_limit=1, max_concurrency=1)
+        with use_fake(fake):
+            return runner.run_evaluation()
+
+    def signalling_fake(self, signum):
+        def delay(index):
+            if index == SIGNALLED_AT:
+                os.kill(os.getpid(), signum)
+            return 30.0 if index >= SIGNALLED_AT else 0.0
+        return FakeOpenAI(respond=lambda body: "A", delay=delay)
+
+    def assert_resumes_after_flushed_results(self):
+        self.assertEqual(len(ResultLog(ResultLog.path_for(self.output)).read()), SIGNALLED_AT)
+        fake = FakeOpenAI(respond=lambda body: "A")
+        _, results = self.run_with(fake)
+        self.assertEqual((len(fake.calls), len(results)), (len(TASKS) - SIGNALLED_AT, len(TASKS)))
+
+    def test_sigint_writes_results_then_interrupts(self):
+        handler = signal.getsignal(signal.SIGINT)
+        with self.assertRaises(KeyboardInterrupt):
+            self.run_with(self.signalling_fake(signal.SIGINT))
+        self.assertIs(signal.getsignal(signal.SIGINT), handler)
+        self.assert_resumes_after_flushed_results()
+
+    def test_sigterm_writes_results_then_calls_previous_handler(self):
+        def terminate(signum, frame):
+            raise Terminated()
+        previous = signal.signal(signal.SIGTERM, terminate)
+        self.addCleanup(signal.signal, signal.SIGTERM, previous)
+        with self.assertRaises(Terminated):
+            self.run_with(self.signalling_fake(signal.SIGTERM))
+        self.assertIs(signal.getsignal(signal.SIGTERM), terminate)
+        self.assert_resumes_after_flushed_results()
+
+
+if __name__ == '__main__':
+    unittest.main()
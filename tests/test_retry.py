@@ -0,0 +1,98 @@
+"""
+RetryPolicy: which errors are retried, backoff bounds and Retry-After handling,
+and the retry loop of AsyncLLMClient driven through the fake client.
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.CRITICAL)
+
+from openai import APITimeoutError
+import httpx
+
+from fake_openai import FakeOpenAI, status_error, use_fake
+from main import LLMProvider, RetryPolicy, Task
+
+TASK = Task(id="t1", question="Pick one.", options={"A": "x", "B": "y"}, answer="A")
+
+
+def replies(*outcomes):
+    """A respond function returning the given outcomes in order, then repeating the last."""
+    outcomes = list(outcomes)
+    return lambda body: outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+
+
+def complete(fake, policy):
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", retry_policy=policy, circuit_breaker=False)
+    with use_fake(fake):
+        return asyncio.run(provider.client.complete(TASK))
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_transient_and_permanent_errors(self):
+        policy = RetryPolicy()
+        for status in (408, 409, 429, 500, 503):
+            self.assertTrue(policy.is_transient(status_error(status)), status)
+        for status in (400, 401, 404):
+            self.assertFalse(policy.is_transient(status_error(status)), status)
+        timeout = APITimeoutError(request=httpx.Request("POST", "http://fake/v1"))
+        self.assertTrue(policy.is_transient(timeout))
+        self.assertTrue(policy.is_transient(asyncio.TimeoutError()))
+        self.assertFalse(policy.is_transient(ValueError("bug")))
+
+    def test_backoff_is_capped_exponential_with_jitter(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        error = status_error(503)
+        for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)):
+            delays = [policy.delay_for(attempt, error) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays), attempt)
+            self.assertGreater(max(delays) - min(delays), 0) # Jittered, not fixed
+
+    def test_retry_after_headers_take_precedence(self):
+        policy = RetryPolicy(base_delay=0.1, max_retry_after=60.0)
+        cases = [({"retry-after": "7"}, 7.0), ({"retry-after-ms": "1500"}, 1.5),
+                 ({"retry-after": "600"}, 60.0), # Capped at max_retry_after
+                 ({"retry-after": email.utils.formatdate(time.time() + 20, usegmt=True)}, 20.0)]
+        for headers, expected in cases:
+            delay = policy.delay_for(1, status_error(429, headers))
+            self.assertGreaterEqual(delay, expected - 1.0, headers)
+            self.assertLessEqual(delay, expected + 0.1, headers)
+
+
+class RetryLoopTest(unittest.TestCase):
+    def test_transient_errors_are_retried(self):
+        fake = FakeOpenAI(respond=replies(status_error(503), status_error(429), "A"))
+        completion = complete(fake, RetryPolicy(base_delay=0.001))
+        self.assertIsNone(completion.error)
+        self.assertEqual(completion.response, "A")
+        self.assertEqual(completion.attempts, 3)
+
+    def test_permanent_error_is_not_retried(self):
+        fake = FakeOpenAI(respond=lambda body: status_error(400))
+        completion = complete(fake, RetryPolicy(base_delay=0.001))
+        self.assertIsNotNone(completion.error)
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        fake = FakeOpenAI(respond=lambda body: status_error(500))
+        completion = complete(fake, RetryPolicy(max_attempts=3, base_delay=0.001))
+        self.assertIsNotNone(completion.error)
+        self.assertIsNone(completion.response)
+        self.assertEqual(len(fake.calls), 3)
+
+    def test_waits_for_retry_after(self):
+        fake = FakeOpenAI(respond=replies(status_error(429, {"retry-after-ms": "200"}), "A"))
+        started = time.monotonic()
+        completion = complete(fake, RetryPolicy(base_delay=0.001))
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(completion.attempts, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Streamed completions with early stop, and how answers are scored with and without
+streaming: early-stop extraction only applies to streaming providers.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+logging.disable(logging.WARNING)
+
+from fake_openai import FakeOpenAI, use_fake
+from main import LLMProvider, ResponseCache, Task
+
+NUMBER_TASK = Task(id="t1", question="How many?", answer=4)
+
+
+def complete(fake, task=NUMBER_TASK, **provider_args):
+    provider = LLMProvider("Fake", "m", "k", base_url="http://fake/v1", **provider_args)
+    with use_fake(fake):
+        return asyncio.run(provider.client.complete(task))
+
+
+class StreamingTest(unittest.TestCase):
+    def test_plain_responses_are_parsed_in_full(self):
+        completion = complete(FakeOpenAI(respond=lambda body: "4 apples"))
+        self.assertEqual(completion.response, "4 apples")
+        self.assertFalse(completion.early_stop)
+
+    def test_stream_stops_at_the_answer(self):
+        fake = FakeOpenAI(respond=lambda body: "4\n\nExplanation: there are four of them.")
+        completion = complete(fake, stream_completions=True)
+        self.assertEqual(completion.response, 4)
+        self.assertTrue(completion.early_stop)
+        self.assertTrue(fake.calls[0]["stream"])
+        self.assertEqual(fake.calls[0]["stream_options"], {"include_usage": True})
+        stream = fake.streams[0]
+        self.assertTrue(stream.closed)
+        self.assertLess(stream.sent, len(stream.pieces))
+
+    def test_stream_without_early_stop_reports_usage(self):
+        completion = complete(FakeOpenAI(respond=lambda body: "maybe four"), stream_completions=True)
+        self.assertEqual(completion.response, "maybe four")
+        self.assertFalse(completion.early_stop)
+        self.assertEqual(completion.tokens, 12)
+
+    def test_cached_full_response_scores_by_transport(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "cache.sqlite")
+            complete(FakeOpenAI(respond=lambda body: "4 apples"), response_cache=ResponseCache(cache_path))
+            offline = FakeOpenAI(respond=lambda body: AssertionError("cache miss"))
+            plain = complete(offline, response_cache=ResponseCache(cache_path))
+            streamed = complete(offline, response_cache=ResponseCache(cache_path), stream_completions=True)
+        self.assertEqual((plain.cached, plain.response), (True, "4 apples"))
+        self.assertEqual((streamed.cached, streamed.response), (True, 4))
+        self.assertEqual(offline.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+DataTransformer.transform (columnar, memoized parsing) must give every row its own
+parsed containers and the same tasks as the per-row transform_stream path.
+"""
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING)
+
+import pandas as pd
+
+from main import DataTransformer
+
+FRAME = pd.DataFrame({
+    "id": ["t1", "t2", "t3"],
+    "question": ["Q1?", "Q2?", "Q3?"],
+    "options": ["{'A': 'x', 'B': 'y'}", "{'A': 'x', 'B': 'y'}", "{'A': Correct"],
+    "answer": ["['A', 'B']", "['A', 'B']", "{'k': [1, 2]}"],
+})
+
+
+class TransformTest(unittest.TestCase):
+    def test_rows_do_not_share_parsed_containers(self):
+        first, second, _ = DataTransformer().transform(FRAME)
+        first.options["C"] = "z"
+        first.answer.append("C")
+        self.assertEqual(second.options, {"A": "x", "B": "y"})
+        self.assertEqual(second.answer, ["A", "B"])
+
+    def test_nested_values_are_copied_deeply(self):
+        frame = pd.concat([FRAME.iloc[[2]], FRAME.iloc[[2]]], ignore_index=True)
+        first, second = DataTransformer().transform(frame)
+        first.answer["k"].append(3)
+        self.assertEqual(second.answer, {"k": [1, 2]})
+
+    def test_matches_per_row_path(self):
+        columnar = DataTransformer().transform(FRAME)
+        per_row = list(DataTransformer().transform_stream(FRAME.to_dict("records")))
+        self.assertEqual([task.to_dict() for task in columnar], [task.to_dict() for task in per_row])
+
+
+if __name__ == '__main__':
+    unittest.main()
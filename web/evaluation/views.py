@@ -442,9 +442,10 @@ def upload_file(request):
     
     file = request.FILES['file']
     
-    # 验证文件类型
-    if not file.name.endswith(('.xlsx', '.xls')):
-        return Response({"error": "Only Excel files are allowed"}, status=400)
+    # 验证文件类型（支持DataLoader注册的所有格式）
+    allowed_extensions = tuple(DataLoader.READERS)
+    if not file.name.lower().endswith(allowed_extensions):
+        return Response({"error": f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"}, status=400)
     
     # 生成唯一文件名
     filename = f"{uuid.uuid4()}_{file.name}"